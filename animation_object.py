@@ -1,10 +1,93 @@
+from array import array
+from bisect import bisect_left, bisect_right
 from pypovray import pdb
 from math import pi
 
 
+class Track():
+    """
+    A track holds the keyframes of one property (end position, rotation or shown) of an
+    Animation object sorted by frame. The frames are kept in an array so the keyframe
+    belonging to a step is found by a binary search.
+    """
+    __slots__ = ("frames", "values", "events", "_cumulative")
+
+    def __init__(self, keyframes=()):
+        """
+        Arguments:
+        - (iterable) keyframes: (frame, value) tuples, keyframes with the same frame keep their order
+        """
+        self.frames = array("l")
+        self.values = []
+        self.events = array("l")
+        self._cumulative = None
+        self.add(keyframes)
+
+    def add(self, keyframes):
+        """
+        Arguments:
+        - (iterable) keyframes: (frame, value) tuples
+
+        Usage:
+        Inserts the keyframes at their sorted position (after keyframes with the same frame).
+        """
+        for frame, value in keyframes:
+            index = bisect_right(self.frames, frame)
+            self.frames.insert(index, frame)
+            self.values.insert(index, value)
+
+        # Keyframes with extra data behind the xyz position (i.e. joins)
+        self.events = array("l", [index for index, value in enumerate(self.values)
+                                  if isinstance(value, list) and len(value) > 3])
+        self._cumulative = None
+
+    def index(self, step):
+        """
+        Returns the index of the first keyframe at or after the step. This is 0 before the track
+        starts, len(track) after the last keyframe and otherwise the index of the keyframe that
+        ends the segment (frames[index-1] < step <= frames[index]) the step is in.
+        """
+        return bisect_left(self.frames, step)
+
+    def value(self, step):
+        """
+        Returns the value of the last keyframe at or before the step, or the value of the
+        first keyframe if the track did not start yet.
+        """
+        return self.values[max(bisect_right(self.frames, step) - 1, 0)]
+
+    def events_before(self, index):
+        """
+        Returns the indexes of the keyframes with extra data before the given index.
+        """
+        return self.events[:bisect_left(self.events, index)]
+
+    def cumulative(self, index):
+        """
+        Returns the sum of the xyz values of the keyframes up to and including the index.
+        """
+        if self._cumulative is None:
+            total = [0, 0, 0]
+            self._cumulative = []
+            for value in self.values:
+                total = [total[axis] + value[axis] for axis in range(3)]
+                self._cumulative.append(total)
+        return self._cumulative[index]
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        return self.frames[index], self.values[index]
+
+    def __iter__(self):
+        return zip(self.frames, self.values)
+
+
 class AnimationObject():
+    __slots__ = ("name", "metadata", "molecule", "endpos", "rotation", "shown")
 
-    def __init__(self, name, metadata, endpos=(), rotation=(), shown=(), ):
+    def __init__(self, name, metadata, endpos=(), rotation=(), shown=(), load_molecule=True):
         """
         Arguments:
         - (string) name: This argument contains the name of the Animation object
@@ -22,6 +105,8 @@ class AnimationObject():
             - False:
                 - (list) vaporyObjects: A list that contains objects from the Vapory package
                     - (vaporyObject) basicObject: Is a object from the package Vapory
+        - (iterable) endpos, rotation, shown: (frame, value) tuples of the keyframes
+        - (bool) load_molecule: if false the pdb file is not opened (only the keyframe tracks are used)
         Usage:
         This module is called when the Object is created.
         """
@@ -32,13 +117,16 @@ class AnimationObject():
                          "start": None,
                          "text": None}
 
-        self.endpos = list(endpos)
+        self.endpos = Track(endpos)
+
+        self.rotation = Track(rotation)
 
-        self.rotation = list(rotation)
+        self.shown = Track(shown)
 
-        self.shown = list(shown)
+        if tuple(self.metadata[0:2]) == (True, False) and not load_molecule:
+            self.molecule["molecule"] = None
 
-        if tuple(self.metadata[0:2]) == (True, False):
+        elif tuple(self.metadata[0:2]) == (True, False):
             self.open_pdbfile(self.metadata[2])
 
         elif tuple(self.metadata[0:2]) == (True, True):
@@ -86,14 +174,14 @@ class AnimationObject():
 # ----------------------------------------------------------------------------------------------------------------------
     def add_endpos_list(self, endpos):
         if all(isinstance(x, tuple) for x in endpos):
-            self.endpos += endpos
+            self.endpos.add(endpos)
 
         else:
             raise TypeError("Some objects in the lists are not int/list")
 
     def add_endpos_single(self, endpos):
         if isinstance(endpos, tuple):
-            self.endpos.append(endpos)
+            self.endpos.add([endpos])
 
         else:
             raise TypeError("The given arguments are not int/list")
@@ -102,13 +190,13 @@ class AnimationObject():
 
     def add_rotation_list(self, rotation):
         if all(isinstance(x, tuple) for x in rotation):
-            self.rotation += rotation
+            self.rotation.add(rotation)
         else:
             raise TypeError("Some objects in the lists are not int/list")
 
     def add_rotation_single(self, rotation):
         if isinstance(rotation, tuple):
-            self.rotation.append(rotation)
+            self.rotation.add([rotation])
         else:
             raise TypeError("The given arguments are not int/list")
 
@@ -116,13 +204,13 @@ class AnimationObject():
 
     def add_shown_list(self, shown):
         if all(isinstance(x, tuple) for x in shown):
-            self.shown += shown
+            self.shown.add(shown)
         else:
             raise TypeError("Some objects in the lists are not bool")
 
     def add_shown_single(self, shown):
         if isinstance(shown, tuple):
-            self.shown.append(shown)
+            self.shown.add([shown])
         else:
             raise TypeError("The given arguments are not int/bool")
 
@@ -36,7 +36,7 @@ def get_animation_data(num=0, start_frame=0, sme_pos_ethanol=((70, 0, 0), (0, 0,
     - (Bool) Molecule
         - True (bool) part of molecule {if true keyframes end position xyz becomes offset}
             - True (string) object to split
-            - True (list) atoms to split {!!Current program only supports 1 atom split at a time!!}
+            - True (list) atoms to split (numbers of the atoms of the mother at the start of the split frame)
                 - (int) atom
             - False (file_path) pdb document
         - False (vapory components) components {!!These components are static and cant move!!}
@@ -0,0 +1,104 @@
+"""
+Stores snapshots (checkpoints) of the animation state so a frame can be made by restoring the
+nearest checkpoint before it instead of making all frames before it.
+
+A checkpoint is a dict of NumPy arrays (see AnimationEngine.snapshot in project_engine). The
+checkpoints are kept packed in one binary buffer with an index of the steps, the whole store
+can be written to a file or shared with other processes as a single byte array.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import io
+from array import array
+from bisect import bisect_right
+import numpy as np
+
+
+# Classes
+class CheckpointStore():
+    """
+    A compact store of checkpoints sorted by step.
+    """
+    def __init__(self):
+        self.steps = array("l")
+        self.offsets = array("q", [0])
+        self.data = bytearray()
+
+    def save(self, step, arrays):
+        """
+        Arguments:
+        - (int) step: the step after which the state is taken
+        - (dict) arrays: the state as NumPy arrays
+
+        Usage:
+        Adds a checkpoint, checkpoints have to be saved in order of their step.
+        """
+        if self.steps and step <= self.steps[-1]:
+            raise ValueError("checkpoint {} is not after checkpoint {}".format(step, self.steps[-1]))
+
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        self.data += buffer.getvalue()
+        self.steps.append(step)
+        self.offsets.append(len(self.data))
+
+    def load(self, index):
+        """
+        Returns the step and arrays of the checkpoint at the index.
+        """
+        start, end = self.offsets[index], self.offsets[index+1]
+        with np.load(io.BytesIO(bytes(self.data[start:end])), allow_pickle=False) as arrays:
+            return self.steps[index], {name: arrays[name] for name in arrays.files}
+
+    def nearest(self, step):
+        """
+        Returns the step and arrays of the last checkpoint at or before the step,
+        or None if there is no such checkpoint.
+        """
+        index = bisect_right(self.steps, step) - 1
+        if index < 0:
+            return None
+        return self.load(index)
+
+    def to_array(self):
+        """
+        Returns the store as a single uint8 array (i.e. to share it with pool workers).
+        """
+        header = np.array([len(self.steps)] + list(self.steps) + list(self.offsets), dtype=np.int64)
+        return np.concatenate((header.view(np.uint8), np.frombuffer(bytes(self.data), dtype=np.uint8)))
+
+    @classmethod
+    def from_array(cls, data):
+        """
+        Creates a store from an array made by to_array.
+        """
+        store = cls()
+        data = np.asarray(data, dtype=np.uint8)
+        count = int(data[:8].view(np.int64)[0])
+        header = data[:8 * (2*count + 2)].view(np.int64)
+        store.steps = array("l", header[1:count+1].tolist())
+        store.offsets = array("q", header[count+1:].tolist())
+        store.data = bytearray(data[8 * (2*count + 2):].tobytes())
+        return store
+
+    def dump(self, file_name):
+        """ Writes the store to a file """
+        with open(file_name, "wb") as store_file:
+            store_file.write(self.to_array().tobytes())
+
+    @classmethod
+    def read(cls, file_name):
+        """ Reads a store written by dump """
+        with open(file_name, "rb") as store_file:
+            return cls.from_array(np.frombuffer(store_file.read(), dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __contains__(self, step):
+        index = bisect_right(self.steps, step) - 1
+        return index >= 0 and self.steps[index] == step
@@ -0,0 +1,210 @@
+"""
+The command line of the animation (see main in project_main).
+
+The frames to render are given as ranges with a stride and can be divided in chunks, so a render
+can be split over several processes or machines. A render quality (--quality) sets the image size
+and quality, the other options override the settings of the configuration file. The command line
+never asks questions: existing images of the frames to render (or the movie) stop the render unless
+--overwrite or --resume is given, so chunks can render to the same folder.
+
+Examples:
+    project_main.py --quality preview --frames 0:700 --stride 5
+    project_main.py --frames 0:350 --workers 8 --resume --no-encode
+    project_main.py --chunk 2/4 --no-encode --images /scratch/images
+    project_main.py --encode-only --overwrite
+    project_main.py --animation animations/ethanol_2_acetic_acid.micdes --dry-run
+    project_main.py --population 500 --seed 1 --quality preview --workers 8
+    project_main.py --population 2000 --kinetics tau --dry-run
+    project_main.py --dry-run --profile-frames 88:92 --profile-memory
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import argparse
+from pypovray import DEFAULT_CONFIG
+from pypovray.config import parse_overrides
+from project_kinetics import METHODS
+
+# The settings of the render qualities
+QUALITIES = {"preview": {"ImageWidth": 400, "ImageHeight": 300, "Quality": 5, "AntiAlias": 0.3},
+            "draft": {"ImageWidth": 800, "ImageHeight": 600, "Quality": 8, "AntiAlias": 0.1},
+            "final": {"ImageWidth": 1600, "ImageHeight": 1200, "Quality": 9, "AntiAlias": 0.01},
+            }
+
+
+# Functions
+def make_parser():
+    """
+    make_parser()
+
+    Returns the ArgumentParser of the command line.
+    """
+    parser = argparse.ArgumentParser(description="Renders the animation of the metabolism of ethanol.",
+                                     epilog="Frames are given as comma separated steps and ranges "
+                                            "(start:stop or start:stop:stride, stop not included).")
+    parser.add_argument("--config", default=DEFAULT_CONFIG,
+                        help="configuration file (default: %(default)s)")
+    parser.add_argument("--animation", metavar="FILE",
+                        help="render the animation of a .micdes file (see project_micdes) instead of "
+                             "the ethanol animation")
+    parser.add_argument("--population", type=positive_int, metavar="N",
+                        help="add N reactions with random positions and timing (see project_population)")
+    parser.add_argument("--seed", type=int, help="seed of the random population")
+    parser.add_argument("--kinetics", choices=METHODS,
+                        help="time the enzymes of the population with a stochastic simulation (see project_kinetics)")
+    parser.add_argument("--frames", type=parse_frames, default=None,
+                        help="frames to render, i.e. 0:100,250:300 (default: all frames)")
+    parser.add_argument("--stride", type=positive_int, default=1,
+                        help="render every Nth of the frames")
+    parser.add_argument("--chunk", type=parse_chunk, default=None, metavar="I/N",
+                        help="render the Ith of N chunks of the frames with about the same render time")
+    parser.add_argument("--quality", choices=sorted(QUALITIES),
+                        help="image size and quality of the render")
+    parser.add_argument("--workers", type=positive_int,
+                        help="number of POV-Ray processes, 1 renders without a pool")
+    parser.add_argument("--images", metavar="DIR", help="folder of the rendered images")
+    parser.add_argument("--movies", metavar="DIR", help="folder of the movie")
+    parser.add_argument("--prefix", help="name of the images and the movie")
+
+    existing = parser.add_mutually_exclusive_group()
+    existing.add_argument("--overwrite", dest="on_existing", action="store_const", const="overwrite",
+                          help="replace existing images and movie")
+    existing.add_argument("--resume", dest="on_existing", action="store_const", const="resume",
+                          help="only render the frames without an image")
+
+    stage = parser.add_mutually_exclusive_group()
+    stage.add_argument("--no-encode", dest="encode", action="store_false",
+                       help="only render the images (i.e. of a chunk)")
+    stage.add_argument("--encode-only", action="store_true",
+                       help="only combine the rendered images into the movie")
+
+    parser.add_argument("--dry-run", action="store_true",
+                        help="check the frames without rendering them (see project_dry_run)")
+    parser.add_argument("--profile-frames", type=frames_text, metavar="FRAMES",
+                        help="profile the making of the frames (see project_profile)")
+    parser.add_argument("--profile-every", type=positive_int, metavar="N",
+                        help="profile the making of every Nth frame")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="also trace the memory allocations of the profiled frames")
+    parser.add_argument("--set", dest="settings", action="append", default=[], metavar="SETTING=VALUE",
+                        help="override a setting of the configuration file, can be repeated")
+    parser.set_defaults(on_existing="fail")
+    return parser
+
+
+def parse_arguments(arguments=None):
+    """
+    parse_arguments([arguments])
+
+    arguments:
+    - arguments: list of strings, the arguments of the program by default
+
+    Returns the parsed arguments, invalid arguments stop the program with a usage message.
+    """
+    parser = make_parser()
+    args = parser.parse_args(arguments)
+    try:
+        args.overrides = settings_overrides(args)
+    except ValueError as error:
+        parser.error(str(error))
+    return args
+
+
+def settings_overrides(args):
+    """
+    settings_overrides(args)
+
+    Returns the settings given on the command line, the quality is overridden by the other options.
+    """
+    overrides = dict(QUALITIES.get(args.quality, {}))
+    if args.workers is not None:
+        overrides.update(Workers=args.workers, UsePool=args.workers > 1)
+    for setting, value in (("OutputImageDir", args.images), ("OutputMovieDir", args.movies),
+                           ("OutputPrefix", args.prefix)):
+        if value is not None:
+            overrides[setting] = value
+    overrides["OnExisting"] = args.on_existing
+    if args.dry_run:
+        overrides["DryRun"] = True
+    for setting, value in (("ProfileFrames", args.profile_frames), ("ProfileEvery", args.profile_every),
+                           ("ProfileMemory", args.profile_memory or None)):
+        if value is not None:
+            overrides[setting] = value
+    overrides.update(parse_overrides(args.settings))
+    return overrides
+
+
+def select_frames(args, steps):
+    """
+    select_frames(args, steps)
+
+    arguments:
+    - args: Namespace (see parse_arguments)
+    - steps: range, the steps of the animation
+
+    Returns the sorted frames given by --frames and --stride, frames outside the animation raise
+    a ValueError. The chunk (--chunk) is selected by the caller.
+    """
+    frames = sorted(set(steps if args.frames is None else args.frames))
+    outside = [frame for frame in frames if frame not in steps]
+    if outside:
+        raise ValueError("frames {} are not in the animation (steps {} - {})".format(
+            ", ".join(str(frame) for frame in outside[:5]), steps[0], steps[-1]))
+    return frames[::args.stride]
+
+
+def parse_frames(text):
+    """
+    parse_frames(text)
+
+    Returns the frames of comma separated steps and ranges (start:stop[:stride]).
+    """
+    frames = []
+    try:
+        for part in text.split(","):
+            numbers = [int(number) for number in part.split(":")]
+            if len(numbers) == 1:
+                frames.append(numbers[0])
+            elif len(numbers) in (2, 3):
+                frames.extend(range(*numbers))
+            else:
+                raise ValueError(part)
+    except ValueError:
+        raise argparse.ArgumentTypeError("'{}' is not a list of frames (i.e. 0:100,150,200:300:2)".format(text))
+    return frames
+
+
+def frames_text(text):
+    """ Checks the frames of the text (see parse_frames) and returns the text """
+    parse_frames(text)
+    return text
+
+
+def parse_chunk(text):
+    """
+    parse_chunk(text)
+
+    Returns the index (from 1) and the number of chunks of the text I/N.
+    """
+    index, _, chunks = text.partition("/")
+    try:
+        index, chunks = int(index), int(chunks)
+    except ValueError:
+        raise argparse.ArgumentTypeError("'{}' is not a chunk I/N".format(text))
+    if not 1 <= index <= chunks:
+        raise argparse.ArgumentTypeError("chunk {} is not between 1 and {}".format(index, chunks))
+    return index, chunks
+
+
+def positive_int(text):
+    """ Converts the text to an integer of 1 or more """
+    try:
+        number = int(text)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError("'{}' is not a positive number".format(text))
+    return number
@@ -0,0 +1,208 @@
+"""
+Dry run of the animation: the scenes of the frames are made and measured instead of rendered
+(a null renderer), so mistakes in the keyframe data show up in seconds instead of during a render.
+
+For every frame the report holds the objects in the scene, the molecules and their atoms, the
+POV-Ray objects (spheres), the size of the POV-Ray code and the splits and joins. Anomalies such
+as lost atoms, molecules that jump or overlap or joins that never happened are collected with
+their step.
+The complexity of the frames is used to divide the frames over workers (see DryRunReport.plan).
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import os
+import numpy as np
+from pypovray import get_settings
+from project_trace import COUNTERS, Tracer
+
+# The figures of every frame
+FIELDS = ("step", "objects", "molecules", "atoms", "spheres", "pov_bytes", "split", "joined")
+
+# Maximum distance a molecule moves in one step before it is reported as a jump
+MAX_JUMP = 10.0
+
+
+# Classes
+class DryRunReport():
+    """
+    The figures and anomalies of the frames of a dry run.
+    """
+    def __init__(self, figures, anomalies, include_bytes):
+        """
+        Arguments:
+        - (array) figures: frames x FIELDS array
+        - (list) anomalies: (step, object, message) of every anomaly
+        - (int) include_bytes: size of the include file with the static objects
+        """
+        self.figures = figures
+        self.anomalies = anomalies
+        self.include_bytes = include_bytes
+
+    def column(self, field):
+        """ Returns the figures of a field (see FIELDS) of all frames """
+        return self.figures[:, FIELDS.index(field)]
+
+    @property
+    def steps(self):
+        return self.column("step")
+
+    def weights(self):
+        """
+        Returns the estimated render time of every frame relative to the mean frame.
+        POV-Ray spends its time on the objects of the scene, so the weight of a frame is the
+        number of POV-Ray objects (and one for the static scene).
+        """
+        weights = self.column("spheres") + 1.0
+        return weights / weights.mean()
+
+    def plan(self, chunks):
+        """
+        plan(chunks)
+
+        arguments:
+        - chunks: int
+
+        Divides the frames in (at most) the number of chunks of following frames with about the
+        same estimated render time, i.e. to give every worker or machine a chunk. Without frames every
+        chunk is empty.
+        """
+        if not len(self.steps):
+            return [[] for _ in range(chunks)]
+        total = np.cumsum(self.weights())
+        bounds = np.searchsorted(total, total[-1] * np.arange(1, chunks) / chunks, side="right")
+        return [chunk.tolist() for chunk in np.split(self.steps, np.unique(bounds)) if len(chunk)]
+
+    def summary(self):
+        """
+        Returns the totals of the dry run and the anomalies as text.
+        """
+        if not len(self.figures):
+            return "No frames made"
+
+        lines = ["{} frames made (steps {} - {}), include file {} bytes".format(
+            len(self.figures), self.steps.min(), self.steps.max(), self.include_bytes),
+                 "{:<10}{:>12}{:>12}{:>12}{:>10}".format("figure", "total", "mean", "max", "max step")]
+        for field in FIELDS[1:]:
+            column = self.column(field)
+            lines.append("{:<10}{:>12}{:>12.1f}{:>12}{:>10}".format(field, column.sum(), column.mean(),
+                                                                   column.max(), self.steps[column.argmax()]))
+
+        lines.append("{} anomalies".format(len(self.anomalies)))
+        for step, obj, message in self.anomalies:
+            lines.append("step {}: {} {}".format(step, obj, message))
+        return "\n".join(lines)
+
+    def write(self, file_name):
+        """ Writes the figures of every frame to a CSV file """
+        np.savetxt(file_name, self.figures, fmt="%d", delimiter=",", header=",".join(FIELDS), comments="")
+
+
+# Functions
+def dry_run(engine, frames=None, max_jump=MAX_JUMP, checkpoint_interval=None):
+    """
+    dry_run(engine, [frames], [max_jump], [checkpoint_interval])
+
+    arguments:
+    - engine: AnimationEngine
+    - frames: iterable of steps, all steps of the animation by default
+    - max_jump: float
+    - checkpoint_interval: int, the CheckpointInterval setting by default
+
+    Makes the scenes of the frames without rendering them and returns a DryRunReport.
+    Following frames are made in order, after a gap a frame is made from the checkpoints of the
+    engine (see AnimationEngine.frame_stateless), which are made first when the engine has none.
+    The frames are counted by a tracer of the dry run, not by the tracer of the engine.
+    """
+    frames = sorted(engine.steps if frames is None else frames)
+    tracer = engine.tracer
+    engine.tracer = Tracer()
+    try:
+        return _dry_run(engine, frames, max_jump, checkpoint_interval)
+    finally:
+        engine.tracer = tracer
+
+
+def _dry_run(engine, frames, max_jump, checkpoint_interval):
+    """ Makes and measures the sorted frames with the tracer of the dry run (see dry_run) """
+    if not engine.static_scene:
+        engine.make_static_scene()
+    if frames != list(range(engine.steps[0], engine.steps[0] + len(frames))) and engine.checkpoints is None:
+        engine.make_checkpoints(get_settings().CheckpointInterval if checkpoint_interval is None
+                                else checkpoint_interval)
+    engine.reset()
+
+    split, joined = COUNTERS.index("split"), COUNTERS.index("joined")
+    overlapping = set()
+    figures = np.zeros((len(frames), len(FIELDS)), dtype=np.int64)
+    anomalies = []
+    positions, empty, total_atoms = {}, set(), None
+
+    previous = engine.steps[0] - 1
+    for row, step in enumerate(frames):
+        make = engine.frame if step == previous + 1 else engine.frame_stateless
+        scene = engine.profiler.profile(step, make, step) if engine.profiler is not None else make(step)
+        counts = engine.tracer.counts[-1]
+
+        molecules = [obj for obj in engine.rendered if engine.animation_objects[obj]["molecule"][0]]
+        atoms = [len(engine.molecules[obj]["molecule"].atoms) for obj in molecules]
+        spheres = sum(len(engine.molecules[obj]["molecule"].povray_molecule) if obj in molecules
+                      else len(engine.molecules[obj]["molecule"]) for obj in engine.rendered)
+        figures[row] = (step, len(engine.rendered), len(molecules), sum(atoms), spheres,
+                        len(str(scene)), counts[split], counts[joined])
+
+        # The atoms move between molecules but are never made or lost
+        frame_atoms = sum(len(state["molecule"].atoms) for state in engine.molecules.values()
+                          if state is not None and "position" in state)
+        if total_atoms is not None and frame_atoms != total_atoms:
+            anomalies.append((step, "scene", "has {} atoms instead of {}".format(frame_atoms, total_atoms)))
+        total_atoms = frame_atoms
+
+        if not engine.rendered:
+            anomalies.append((step, "scene", "is empty"))
+
+        for obj, number in zip(molecules, atoms):
+            position = engine.molecules[obj]["position"]
+            if not number and obj not in empty:
+                empty.add(obj)
+                anomalies.append((step, obj, "is shown without atoms"))
+            if not np.all(np.isfinite(position)):
+                anomalies.append((step, obj, "has no position"))
+            elif step == previous + 1 and obj in positions and \
+                 np.linalg.norm(position - positions[obj]) > max_jump:
+                anomalies.append((step, obj, "jumps {:.1f} in one step".format(
+                    np.linalg.norm(position - positions[obj]))))
+        positions = {obj: engine.molecules[obj]["position"].copy() for obj in molecules}
+
+        # Overlapping molecules (see ProximityMonitor) are reported when they start to overlap
+        if engine.proximity is not None:
+            for obj, other in engine.proximity.overlapping:
+                if (obj, other) not in overlapping:
+                    anomalies.append((step, obj, "overlaps {}".format(other)))
+            overlapping = set(engine.proximity.overlapping)
+        previous = step
+
+    anomalies.extend(_missed_events(engine, frames[-1]) if frames else [])
+    include_bytes = os.path.getsize(engine.static_scene["include"])
+    return DryRunReport(figures, anomalies, include_bytes)
+
+
+def _missed_events(engine, last):
+    """ Returns the anomalies of the splits and joins up to the last step that did not happen """
+    anomalies = []
+    schedule = engine.split_schedule
+    for split, step in enumerate(schedule.steps):
+        if step <= last and engine.molecules[schedule.molecules[split]] is None:
+            anomalies.append((step, schedule.molecules[split], "is not split from {}".format(
+                schedule.mothers[split])))
+
+    for obj in engine.tracks:
+        endpos_track = engine.tracks[obj].endpos
+        for event in endpos_track.events:
+            if endpos_track.frames[event] <= last and not endpos_track.values[event][4]:
+                anomalies.append((endpos_track.frames[event], obj, "is not joined with {}".format(
+                    ", ".join(endpos_track.values[event][5:]))))
+    return sorted(anomalies)
@@ -0,0 +1,940 @@
+"""
+The animation engine makes the frames of one animation.
+
+An AnimationEngine owns the compiled timeline, the split schedule and the state of the molecules
+of its animation, so several engines (i.e. variants of the animation with another aldh_speed)
+can make frames side by side in one process, in threads or in pool workers.
+
+The parsed pdb files are kept in MOLECULE_TEMPLATES and shared by all engines of the process,
+a pdb file is only read once no matter how many objects or engines use it.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import threading
+from contextlib import nullcontext
+from itertools import count
+import numpy as np
+from vapory import Camera, LightSource, Scene
+from pypovray import pypovray, pdb, use_config, get_settings
+from pypovray.shared import SharedArrays
+from project_sorted_molecules import make_split_schedule
+from animation_object import AnimationObject
+from project_timeline import Timeline, compile_timeline
+from project_micdes import load_animation
+from project_proximity import make_proximity_monitor
+from project_profile import make_frame_profiler
+from project_checkpoints import CheckpointStore
+from project_trace import Tracer
+
+# Name of the camera declared in the static include file
+STATIC_CAMERA = "StaticCamera"
+
+# Number of frames of an animation if no steps are given
+ANIMATION_FRAMES = 700
+
+# Timeline of engines sent to pool workers, the worker attaches to the shared timeline (see init_worker)
+SHARED_TIMELINE = "shared"
+
+# Every change of the atoms of a molecule gets a new version (see place_molecule)
+MOLECULE_VERSIONS = count()
+
+# The centered coordinates, elements and names of the atoms of every read pdb file
+MOLECULE_TEMPLATES = {}
+TEMPLATES_LOCK = threading.Lock()
+
+
+# Classes
+class AnimationEngine():
+    """
+    Makes the frames of an animation, the state of the animation is kept in the engine.
+    An engine makes one frame at a time, use an engine per thread to make frames in parallel.
+    """
+    def __init__(self, animation_objects, steps=ANIMATION_FRAMES, tracer=None, timeline=None, proximity=None):
+        """
+        Arguments:
+        - (dict) animation_objects: the animation data (see get_animation_data in project_main)
+        - (int/range) steps: the steps of the animation
+        - (Tracer) tracer: traces and counts the frames, every engine has its own by default
+        - (Timeline) timeline: the compiled animation data (i.e. from a .micdes file), compiled by default,
+          SHARED_TIMELINE in pool workers that attach to the timeline in shared memory (see init_worker)
+        - (ProximityMonitor) proximity: the spatial hash of the molecules, by default only made for the
+          proximity joins of the animation data (see make_proximity_monitor)
+        """
+        self.animation_objects = animation_objects
+        self.steps = range(steps) if isinstance(steps, int) else steps
+        self.tracer = Tracer() if tracer is None else tracer
+
+        self.tracks = make_animation_tracks(animation_objects)
+
+        # Positions, rotations and visibility of every object for all frames
+        if timeline is None:
+            timeline = compile_timeline(animation_objects, self.steps)
+        self.timeline = None if isinstance(timeline, str) and timeline == SHARED_TIMELINE else timeline
+
+        # Order in which the molecules are split
+        self.split_schedule = make_split_schedule(animation_objects, self.steps[0])
+
+        # Proximity joins and overlaps of the molecules (see check_proximity)
+        self.proximity = make_proximity_monitor(animation_objects) if proximity is None else proximity
+
+        # The molecules are made when the first frame is made (see reset)
+        self.molecules = None
+        self.checkpoints = None
+        self.scene_cache = {}
+        self.static_scene = {}
+        self.shared_state = None
+        # The objects put in the render list of the last frame
+        self.rendered = []
+        # The step of the last frame, None if the state does not follow from a frame (see make_scene)
+        self.last_step = None
+        # Profiles the making of selected frames (see make_scene), made from the settings of the process
+        self.profiler = None
+
+    def __reduce__(self):
+        # Engines sent to another process start from the start state of the animation, a shared
+        # timeline is not sent but attached to by the worker (see init_worker)
+        timeline = self.timeline
+        if self.shared_state is not None and "timeline.names" in self.shared_state:
+            timeline = SHARED_TIMELINE
+        return (self.__class__, (self.animation_objects, self.steps, self.tracer, timeline, self.proximity))
+
+    @classmethod
+    def from_file(cls, file_name, tracer=None):
+        """
+        from_file(file_name, [tracer])
+
+        Returns an engine of the animation in a .micdes file (see project_micdes).
+        """
+        animation_objects, steps, timeline = load_animation(file_name)
+        return cls(animation_objects, steps, tracer=tracer, timeline=timeline)
+
+    def make_molecules(self):
+        """
+        make_molecules()
+
+        Returns the molecules of the animation in their start state. The pdb molecules are made
+        from MOLECULE_TEMPLATES, split molecules are None until they are split.
+        """
+        molecules = {}
+        for obj in self.animation_objects:
+            molecule_data = self.animation_objects[obj]["molecule"]
+
+            if molecule_data[0] and not molecule_data[1]:
+                # Making normal molecules from the (centered) atoms of the pdb file
+                coordinates, elements, names = molecule_template(molecule_data[2])
+                mol = pdb.PDBMolecule.from_arrays(molecule_data[2], coordinates, elements, names)
+                molecule = make_molecule_state(mol)
+
+            elif not molecule_data[0]:
+                # Making basic vapory objects
+                molecule = {"molecule": molecule_data[1:]}
+
+            else:
+                # Make the molecule a None object until it is time to split the moleucle
+                molecule = None
+
+            molecules[obj] = molecule
+        return molecules
+
+    def place_molecule(self, obj, position=None, orientation=None):
+        """
+        place_molecule(obj, [position], [orientation])
+
+        arguments:
+        - obj: string
+        - position: list
+        - orientation: array (3x3 rotation matrix)
+
+        Places the atoms of the molecule on the given pose, if no position or orientation is given the
+        current one is kept. The atoms are only placed again when the pose or the atoms (version) changed,
+        returns True if the atoms were placed again.
+        """
+        state = self.molecules[obj]
+        if position is not None:
+            state["position"] = np.array(position[:3], dtype=float)
+        if orientation is not None:
+            state["orientation"] = orientation
+
+        placed = (state["position"].tobytes(), state["orientation"].tobytes(), state["version"])
+        if placed == state["placed"]:
+            return False
+
+        coordinates = state["position"] + np.dot(state["body"], state["orientation"].T)
+        state["molecule"].set_coordinates(coordinates, center=state["position"])
+        state["placed"] = placed
+        return True
+
+    def changed_molecule(self, obj):
+        """
+        changed_molecule(obj)
+
+        Gives the molecule a new version after its atoms changed outside of place_molecule.
+        """
+        self.molecules[obj]["version"] = next(MOLECULE_VERSIONS)
+        self.molecules[obj]["placed"] = None
+
+    def set_molecule_body(self, obj):
+        """
+        set_molecule_body(obj)
+
+        Sets the body of the molecule after its atoms changed (joins), the center of the atoms becomes
+        the position of the molecule.
+        """
+        state = self.molecules[obj]
+        state["position"] = state["molecule"].center.copy()
+        state["body"] = np.dot(state["molecule"].get_coordinates() - state["position"], state["orientation"])
+        self.changed_molecule(obj)
+
+    def share_state(self):
+        """
+        share_state()
+
+        Puts the atoms of the pdb files of the animation, the arrays of the timeline (and the checkpoints
+        when made) in shared memory. Pool workers attach to these arrays (see init_worker) instead of
+        reading the pdb files and receiving a copy of the timeline.
+        """
+        self.shared_state = SharedArrays()
+        for obj in self.animation_objects:
+            molecule_data = self.animation_objects[obj]["molecule"]
+            if molecule_data[0] and not molecule_data[1] and \
+               "{}.coordinates".format(molecule_data[2]) not in self.shared_state:
+                template = molecule_template(molecule_data[2])
+                for key, array in zip(("coordinates", "elements", "names"), template):
+                    self.shared_state.publish("{}.{}".format(molecule_data[2], key), array)
+        for name, array in self.timeline.to_arrays().items():
+            self.shared_state.publish("timeline.{}".format(name), array)
+        if self.checkpoints:
+            self.shared_state.publish("checkpoints", self.checkpoints.to_array())
+        return self.shared_state
+
+    def init_worker(self, manifest):
+        """
+        init_worker(manifest)
+
+        arguments:
+        - manifest: dict
+
+        Runs once in every pool worker. Attaches to the shared state, adds the shared pdb files
+        to the MOLECULE_TEMPLATES of the worker and uses the shared timeline when the engine was sent
+        without it. Without shared state (manifest None) the worker reads the pdb files itself.
+        The frames of the worker are profiled with the profile settings (see make_frame_profiler).
+        """
+        self.profiler = make_frame_profiler(get_settings())
+        if manifest is None:
+            return
+        self.shared_state = SharedArrays.attach(manifest)
+        with TEMPLATES_LOCK:
+            for name in manifest:
+                file_name, _, key = name.rpartition(".")
+                if key == "coordinates" and file_name not in MOLECULE_TEMPLATES:
+                    MOLECULE_TEMPLATES[file_name] = tuple(self.shared_state["{}.{}".format(file_name, key)]
+                                                          for key in ("coordinates", "elements", "names"))
+        if self.timeline is None:
+            self.timeline = Timeline.from_arrays({name.partition(".")[2]: self.shared_state[name]
+                                                  for name in manifest if name.startswith("timeline.")})
+        if self.checkpoints is None and "checkpoints" in self.shared_state:
+            self.checkpoints = CheckpointStore.from_array(self.shared_state["checkpoints"])
+
+    def move_objects(self, obj, step, mother=False):
+        """
+        move_objects(obj, step, [mother])
+
+        arguments:
+        - obj: string
+        - step: int
+        - mother: bool
+
+        Move the object to the right position based on the step. If no mother is given the default is False
+        """
+        molecule_data = self.animation_objects[obj]["molecule"]
+        endpos_track = self.tracks[obj].endpos
+        keyframe_frames_data = endpos_track.frames
+        keyframe_endpos_data = endpos_track.values
+
+        # Keyframe that ends the segment the step is in (0 before the first, len after the last keyframe)
+        frame = endpos_track.index(step)
+
+        # if molecules need to be joined at a keyframe before the step
+        if molecule_data[0] and not molecule_data[1] and not mother:
+            for passed in endpos_track.events_before(frame):
+                if try_dict_keys(keyframe_endpos_data[passed], 3) and not keyframe_endpos_data[passed][4]:
+                    self.place_molecule(obj, position=keyframe_endpos_data[passed][:3])
+                    self.join_molecules(obj, passed, keyframe_frames_data[passed])
+
+        self.tracer.trace("move", "%s at step %d (keyframe %d of %d)", obj, step, frame, len(endpos_track))
+
+        # if object is a molecule and a split molecule move the object with a offset
+        if molecule_data[0] and molecule_data[1]:
+            if frame > 0:
+                distance = self.molecules[obj]["start"] + self.timeline.position_at(obj, step)
+                if self.place_molecule(obj, position=distance):
+                    self.tracer.count("moved")
+
+        # if object is mother move the object to previous frame
+        elif mother and 0 < frame < len(endpos_track) and step != keyframe_frames_data[frame]:
+            if self.place_molecule(obj, position=keyframe_endpos_data[frame-1]):
+                self.tracer.count("moved")
+
+        # if object is a molecule move the object to the position of the step
+        elif molecule_data[0]:
+            if self.place_molecule(obj, position=self.timeline.position_at(obj, step)):
+                self.tracer.count("moved")
+
+        elif obj == "camera":
+            self.molecules[obj]["molecule"] = self.timeline.camera_at(step)
+            self.tracer.count("moved")
+
+        # if molecules need to be joined
+        if 0 < frame < len(endpos_track) and step == keyframe_frames_data[frame] and \
+           try_dict_keys(keyframe_endpos_data[frame], 3) and not mother and not keyframe_endpos_data[frame][4]:
+            self.join_molecules(obj, frame, step)
+
+    def join_molecules(self, obj, frame, step):
+        """
+        join_molecules(obj, frame, step)
+
+        Arguments:
+        - obj: string
+        - frame: int
+        - step: int
+
+        Joins the molecules of the join keyframe (frame) with the object and marks the join as done.
+        """
+        keyframe_endpos_data = self.tracks[obj].endpos.values
+
+        for mol in range(5, 5+len(keyframe_endpos_data[frame][5:])):
+            partner = keyframe_endpos_data[frame][mol]
+            self.tracer.trace("join", "%s and %s at step %d", obj, partner, step)
+            self.tracer.count("joined")
+            # Set the molecules that is
+            self.move_objects(partner, step)
+            self.molecules[obj]["molecule"] = molecule_maker(self.molecules[obj]["molecule"],
+                                                             self.molecules[partner]["molecule"], obj)
+            self.set_molecule_body(obj)
+            # The atoms of the other molecule are moved to the joined molecule
+            self.changed_molecule(partner)
+        keyframe_endpos_data[frame][4] = True
+
+    def rotate_objects(self, obj, step, mother=False):
+        """
+        rotate_objects(obj, step, [mother])
+
+        arguments:
+        - obj: string
+        - step: int
+        - mother: True
+
+        Rotate the objects to the orientation of the step.
+        If mother is True the object is rotated back to the orientation of the previous step.
+        If no mother is given default is False
+        """
+        if mother:
+            step -= 1
+
+        # Before the timeline the objects are not rotated
+        if step < self.timeline.steps[0]:
+            orientation = np.eye(3)
+        else:
+            orientation = self.timeline.orientation_at(obj, step)
+
+        if np.array_equal(orientation, self.molecules[obj]["orientation"]):
+            return
+
+        self.tracer.trace("rotate", "%s at step %d", obj, step)
+        self.tracer.count("rotated")
+        self.place_molecule(obj, orientation=orientation)
+
+    def shown_objects(self, obj, step, render_list):
+        """
+        shown_objects(obj, step, render_list)
+
+        arguments:
+        - obj: String
+        - step: int
+        - render_list: list
+
+        Move/rotate the objects and put them in the render_list
+        """
+        # Rotate object when possible
+        if len(self.tracks[obj].rotation):
+            self.rotate_objects(obj, step)
+
+        if self.timeline.visible_at(obj, step):
+            self.tracer.trace("shown", "%s at step %d", obj, step)
+            # Move object to the correct posision based on the step
+            self.move_objects(obj, step)
+
+            # Put object in render_list
+            if self.animation_objects[obj]["show_name"]:
+                render_list = self.put_object_in_render_list(obj, render_list, text=True)
+
+            render_list = self.put_object_in_render_list(obj, render_list)
+
+        else:
+            self.tracer.trace("shown", "%s at step %d (object not shown)", obj, step)
+            self.tracer.count("culled")
+
+        return render_list
+
+    def put_object_in_render_list(self, obj, render_list, text=False):
+        """
+        Puts the POV-Ray code of the object in the render_list so it will be renderd.
+        """
+        if text:
+            render_list.append(str(self.molecules[obj]["text"]))
+        elif not obj == "camera":
+            self.rendered.append(obj)
+            fragment = self.object_text(obj)
+            if fragment:
+                render_list.append(fragment)
+
+        return render_list
+
+    def object_text(self, obj):
+        """
+        object_text(obj)
+
+        Returns the POV-Ray code of the object. The code is kept in the scene_cache and only made again
+        when the object is placed on another pose or its atoms changed.
+        """
+        molecule_data = self.animation_objects[obj]["molecule"]
+        if molecule_data[0]:
+            key = self.molecules[obj]["placed"]
+            objects = self.molecules[obj]["molecule"].povray_molecule
+        else:
+            # Vapory objects do not move
+            key = "static"
+            objects = self.molecules[obj]["molecule"]
+
+        cached = self.scene_cache.get(obj)
+        if key is not None and cached is not None and cached[0] == key:
+            return cached[1]
+
+        fragment = "\n".join(str(part) for part in objects)
+        self.scene_cache[obj] = (key, fragment)
+        return fragment
+
+    def is_static_object(self, obj):
+        """
+        is_static_object(obj)
+
+        arguments:
+        - obj: string
+
+        Returns True if the object looks the same in every frame of the animation.
+        These are the vapory objects (that can not move) that are always shown.
+        """
+        molecule_data = self.animation_objects[obj]["molecule"]
+        if molecule_data[0] or obj == "camera":
+            return False
+
+        if try_dict_keys(self.animation_objects[obj], "keyframe_shown"):
+            return all(self.animation_objects[obj]["keyframe_shown"])
+        return True
+
+    def is_static_camera(self):
+        """
+        Returns True if the camera does not move during the animation.
+        """
+        if not try_dict_keys(self.animation_objects, "camera"):
+            return True
+        return len(self.animation_objects["camera"]["keyframe_endpos"]) == 1
+
+    def make_static_scene(self):
+        """
+        make_static_scene()
+
+        Writes the objects that are the same in every frame (light, static vapory objects and a
+        camera that does not move) once to an include file that is included by every frame.
+        """
+        if self.molecules is None:
+            self.reset()
+
+        static_list = [LightSource([0, 0, 100], 1)]
+        static_objects = [obj for obj in self.animation_objects if self.is_static_object(obj)]
+        for obj in static_objects:
+            static_list = self.put_object_in_render_list(obj, static_list)
+
+        declares = {}
+        if self.is_static_camera():
+            if try_dict_keys(self.animation_objects, "camera"):
+                location, look_at = self.animation_objects["camera"]["keyframe_endpos"][0]
+            else:
+                location, look_at = [0, 0, 100], [0, 0, 0]
+            declares[STATIC_CAMERA] = Camera("location", location, "look_at", look_at)
+
+        self.static_scene = {"objects": set(static_objects),
+                             "camera": bool(declares),
+                             "include": pypovray.create_include_file(static_list, declares),
+                             }
+        return self.static_scene
+
+    def check_proximity(self, step):
+        """
+        check_proximity(step)
+
+        arguments:
+        - step: int
+
+        Updates the spatial hash with the shown molecules, joins the molecules of the proximity joins
+        that came close and counts (and traces) the overlapping molecules.
+        """
+        monitor = self.proximity
+        monitor.update({obj: self.molecules[obj] for obj in self.rendered
+                        if self.animation_objects[obj]["molecule"][0]})
+
+        for rule in monitor.triggered():
+            self.proximity_join(rule, step)
+
+        for obj, other in monitor.overlaps():
+            self.tracer.trace("proximity", "%s overlaps %s at step %d", obj, other, step)
+        self.tracer.count("overlaps", len(monitor.overlapping))
+
+    def proximity_join(self, rule, step):
+        """
+        proximity_join(rule, step)
+
+        arguments:
+        - rule: int, the proximity join (see ProximityMonitor.rules)
+        - step: int
+
+        Joins the partner with the object, the partner is no longer shown after the join.
+        """
+        obj, partner, _ = self.proximity.rules[rule]
+        self.tracer.trace("join", "%s and %s at step %d (proximity)", obj, partner, step)
+        self.tracer.count("joined")
+        self.molecules[obj]["molecule"] = molecule_maker(self.molecules[obj]["molecule"],
+                                                         self.molecules[partner]["molecule"], obj)
+        self.set_molecule_body(obj)
+        self.molecules[partner] = None
+        self.proximity.grid.remove(partner)
+        self.proximity.done[rule] = True
+        self.proximity.steps[rule] = step
+
+    def frame(self, step):
+        """
+        frame(step)
+
+        arguments:
+        - step: int
+
+        Create the scene that coresponds to the step. The frames have to be made in order,
+        use frame_stateless to make a frame in any order.
+        """
+        if self.molecules is None:
+            self.reset()
+
+        # The light and static objects are in the include file of the static scene
+        if not self.static_scene:
+            self.make_static_scene()
+
+        # Basic objects for the scene
+        cam = Camera(STATIC_CAMERA) if self.static_scene["camera"] else None
+        render_list = []
+        self.rendered = []
+
+        self.tracer.begin_frame(step)
+        self.tracer.trace("frame", "step %d", step)
+
+        # Split the molecules that need to be created in this step (see make_split_schedule)
+        schedule = self.split_schedule
+        for split in schedule.due(step, lambda obj: self.molecules[obj] is not None):
+            obj = schedule.molecules[split]
+            split_atoms = schedule.atoms[split]
+            mother_name = schedule.mothers[split]
+
+            # Set the mother molecule on the start position of split.
+            self.move_objects(mother_name, self.tracks[obj].endpos.frames[0], True)
+
+            # Set the mother molecule on the start rotation of split.
+            if len(self.tracks[mother_name].rotation):
+                self.rotate_objects(mother_name, step)
+            self.tracer.trace("split", "%s from %s at step %d (atoms %s)", obj, mother_name, step, split_atoms)
+            self.tracer.count("split")
+            # Call make molecules to split the molecule
+            split_molecule = self.molecules[mother_name]["molecule"].divide(split_atoms,
+                                                                            obj,
+                                                                            offset=[0, 0, 0]
+                                                                            )
+
+            self.molecules[obj] = make_molecule_state(split_molecule)
+
+            # The split atoms are no longer part of the mother
+            mother_state = self.molecules[mother_name]
+            mother_state["body"] = np.delete(mother_state["body"], split_atoms, axis=0)
+            self.changed_molecule(mother_name)
+
+            # Set the mother molecule on the start rotation back before the split.
+            if len(self.tracks[mother_name].rotation):
+                self.rotate_objects(mother_name, step, True)
+
+        # Move, Rotate and join objects
+        for obj in self.animation_objects:
+            if obj in self.static_scene["objects"]:
+                continue
+
+            if not self.molecules[obj] is None:
+                # Put the different objects in the render list
+                if len(self.tracks[obj].shown):
+
+                    # Move, rotate the objects and put them in the render_list
+                    render_list = self.shown_objects(obj, step, render_list)
+                else:
+                    # Move object to the correct posision based on the step
+                    self.move_objects(obj, step)
+
+                    # Rotate object when possible
+                    if len(self.tracks[obj].rotation):
+                        self.rotate_objects(obj, step)
+
+                    #Put object in render_list
+                    render_list = self.put_object_in_render_list(obj, render_list)
+
+                if obj == "camera" and not self.static_scene["camera"]:
+                    cam = Camera("location", self.molecules[obj]["molecule"][0],
+                                 "look_at", self.molecules[obj]["molecule"][1])
+
+        if self.proximity is not None:
+            self.check_proximity(step)
+        self.tracer.end_frame()
+        self.last_step = step
+
+        # The render_list holds the POV-Ray code of the objects (see object_text)
+        objects = ["\n".join(render_list)] if render_list else []
+        return Scene(cam, objects=objects, included=[self.static_scene["include"]])
+
+    def reset(self):
+        """
+        reset()
+
+        Puts the animation back in its start state: new molecules are made from MOLECULE_TEMPLATES
+        and the joins are marked as not done.
+        """
+        self.molecules = self.make_molecules()
+        self.last_step = self.steps[0] - 1
+        if self.proximity is not None:
+            self.proximity.reset()
+        for obj in self.tracks:
+            endpos_track = self.tracks[obj].endpos
+            for event in endpos_track.events:
+                endpos_track.values[event][4] = False
+
+    def event_frames(self):
+        """
+        event_frames()
+
+        Returns the sorted frames at which molecules are split or joined.
+        """
+        events = set(self.split_schedule.steps)
+        for obj in self.animation_objects:
+            endpos_track = self.tracks[obj].endpos
+            for event in endpos_track.events:
+                events.add(endpos_track.frames[event])
+        if self.proximity is not None:
+            events.update(self.proximity.event_steps())
+        return sorted(events)
+
+    def snapshot(self):
+        """
+        snapshot()
+
+        Returns the state of the molecules and joins as a dict of arrays (see restore).
+        The arrays of all molecules are put after each other, "atoms" and "bodies" hold the number of
+        rows of every molecule.
+        """
+        objects = [obj for obj in self.animation_objects
+                   if self.animation_objects[obj]["molecule"][0] and self.molecules[obj] is not None]
+        states = [self.molecules[obj] for obj in objects]
+        molecules = [state["molecule"] for state in states]
+        atoms = [atom for mol in molecules for atom in mol.atoms]
+
+        return {"joins": np.array([self.tracks[obj].endpos.values[event][4]
+                                   for obj in self.tracks
+                                   for event in self.tracks[obj].endpos.events] +
+                                  (self.proximity.done if self.proximity is not None else []), dtype=bool),
+                "objects": np.array(objects, dtype=str),
+                "molecules": np.array([mol.molecule for mol in molecules], dtype=str),
+                "atoms": np.array([len(mol.atoms) for mol in molecules], dtype=int),
+                "bodies": np.array([len(state["body"]) for state in states], dtype=int),
+                "coordinates": np.array([[atom.x, atom.y, atom.z] for atom in atoms], dtype=float).reshape(-1, 3),
+                "elements": np.array([atom.element for atom in atoms], dtype=str),
+                "names": np.array([atom.name for atom in atoms], dtype=str),
+                "body": np.concatenate([state["body"] for state in states]).reshape(-1, 3),
+                # center, start, position and orientation of every molecule
+                "poses": np.array([np.concatenate((mol.center, state["start"], state["position"],
+                                                   state["orientation"].ravel()))
+                                   for state, mol in zip(states, molecules)], dtype=float).reshape(-1, 18)}
+
+    def restore(self, arrays):
+        """
+        restore(arrays)
+
+        arguments:
+        - arrays: dict
+
+        Makes the molecules and joins as they were when the snapshot (see snapshot) was taken.
+        """
+        self.molecules = {}
+        self.last_step = None
+        for obj in self.animation_objects:
+            molecule_data = self.animation_objects[obj]["molecule"]
+            # Molecules that are not split yet are None
+            self.molecules[obj] = None if molecule_data[0] else {"molecule": molecule_data[1:]}
+
+        atom_ends = np.cumsum(arrays["atoms"])
+        body_ends = np.cumsum(arrays["bodies"])
+        for index, obj in enumerate(arrays["objects"].tolist()):
+            atoms = slice(atom_ends[index] - arrays["atoms"][index], atom_ends[index])
+            body = slice(body_ends[index] - arrays["bodies"][index], body_ends[index])
+            pose = arrays["poses"][index]
+
+            mol = pdb.PDBMolecule.from_arrays(str(arrays["molecules"][index]),
+                                              arrays["coordinates"][atoms],
+                                              arrays["elements"][atoms],
+                                              arrays["names"][atoms])
+            mol.center = pose[0:3].copy()
+            self.molecules[obj] = {"molecule": mol,
+                                   "start": pose[3:6].copy(),
+                                   "position": pose[6:9].copy(),
+                                   "orientation": pose[9:18].reshape(3, 3).copy(),
+                                   "body": arrays["body"][body].copy(),
+                                   "version": next(MOLECULE_VERSIONS),
+                                   "placed": None,
+                                   "text": None
+                                   }
+
+        joins = iter(arrays["joins"].tolist())
+        for obj in self.tracks:
+            endpos_track = self.tracks[obj].endpos
+            for event in endpos_track.events:
+                endpos_track.values[event][4] = next(joins)
+
+        # The proximity joins follow the keyframe joins, the grid is made again by the next frame
+        if self.proximity is not None:
+            self.proximity.reset()
+            self.proximity.done = list(joins)
+
+    def replay_frames(self, start, step):
+        """
+        replay_frames(start, step)
+
+        arguments:
+        - start: int
+        - step: int
+
+        Returns the frames from start up to the step that have to be made before the step: the frames
+        with splits or joins and the frames before them (these set the orientations the join or split
+        starts from).
+        """
+        replay = set()
+        for event in self.event_frames():
+            if event > step:
+                break
+            replay.update(frame for frame in (event - 1, event) if start <= frame < step)
+        return sorted(replay)
+
+    def make_checkpoints(self, interval):
+        """
+        make_checkpoints(interval)
+
+        arguments:
+        - interval: int
+
+        Returns a CheckpointStore with the state after every interval frames and after every frame with
+        a split or join.
+        """
+        first, last = self.timeline.steps[0], self.timeline.steps[-1]
+        events = [event for event in self.event_frames() if event <= last]
+        checkpoint_frames = set(events)
+        if interval:
+            checkpoint_frames.update(range(first + interval - 1, last + 1, interval))
+
+        # Proximity joins are only found by making all frames in order
+        frames = checkpoint_frames.union(self.replay_frames(first, last + 1))
+        if self.proximity is not None and self.proximity.rules:
+            frames = range(first, last + 1)
+
+        self.checkpoints = None
+        self.reset()
+        store = CheckpointStore()
+        with self.tracer.paused():
+            for frame in sorted(frames):
+                self.frame(frame)
+                if frame in checkpoint_frames:
+                    store.save(frame, self.snapshot())
+
+        self.checkpoints = store
+        return store
+
+    def frame_stateless(self, step):
+        """
+        frame_stateless(step)
+
+        arguments:
+        - step: int
+
+        Create the scene that coresponds to the step without depending on the frames made before.
+        The state is restored from the last checkpoint before the step (or reset without checkpoints)
+        and only the frames with splits or joins (and the frames before them) are made before the step,
+        so any step can be made in any order or worker with the same result as making all frames in order.
+        """
+        checkpoint = self.checkpoints.nearest(step - 1) if self.checkpoints else None
+        if checkpoint is None:
+            self.reset()
+            start = self.timeline.steps[0]
+        else:
+            checkpoint_step, arrays = checkpoint
+            self.restore(arrays)
+            self.last_step = checkpoint_step
+            start = checkpoint_step + 1
+
+        # The replayed frames are not counted, only the frame of the step
+        with self.tracer.paused():
+            for frame in self.replay_frames(start, step):
+                self.frame(frame)
+        return self.frame(step)
+
+    def make_scene(self, step):
+        """
+        make_scene(step)
+
+        arguments:
+        - step: int
+
+        Create the scene that coresponds to the step in any order. A step that follows the last
+        made frame is made from the current state, other steps start from the checkpoints.
+        The selected frames are profiled when the engine has a profiler (see project_profile).
+        """
+        make = self.frame if self.last_step is not None and step == self.last_step + 1 else self.frame_stateless
+        if self.profiler is not None:
+            return self.profiler.profile(step, make, step)
+        return make(step)
+
+    def render(self, frames=None, settings=None, encode=True):
+        """
+        render([frames], [settings], [encode])
+
+        arguments:
+        - frames: iterable of steps, all steps of the animation by default
+        - settings: Settings, the active settings (see use_config) by default
+        - encode: bool, False only renders the images (see pypovray.render_scene_to_mp4)
+
+        Renders the frames to a movie, returns False if existing output stopped the render.
+        Frames rendered by a pool of workers or frames that do not follow each other start from
+        the checkpoints (see make_scene).
+        The render settings (i.e. the output paths) are the settings of the process, engines rendering
+        with other settings at the same time have to render in their own process.
+        """
+        settings = get_settings() if settings is None else use_config(settings)
+        frames = list(self.steps if frames is None else frames)
+
+        if not self.static_scene:
+            self.make_static_scene()
+        if self.profiler is None:
+            self.profiler = make_frame_profiler(settings)
+
+        in_order = frames == list(range(frames[0], frames[0] + len(frames))) if frames else True
+        proximity_joins = self.proximity is not None and bool(self.proximity.rules)
+        # Proximity joins before the first frame are only found by the checkpoints (see frame_stateless)
+        next_step = self.steps[0] if self.last_step is None else self.last_step + 1
+        starts_later = bool(frames) and frames[0] != next_step
+        needs_checkpoints = settings.CheckpointInterval or proximity_joins
+        if needs_checkpoints and self.checkpoints is None and \
+           (settings.UsePool or not in_order or (proximity_joins and starts_later)):
+            self.make_checkpoints(settings.CheckpointInterval)
+
+        # Only pool workers attach to the shared state, other renders make the frames in this process
+        with self.share_state() if pypovray.renders_with_pool(encode) else nullcontext() as shared_state:
+            manifest = None if shared_state is None else shared_state.manifest
+            rendered = pypovray.render_scene_to_mp4(self.make_scene, frames, worker_init=self.init_worker,
+                                                    worker_args=(manifest,), encode=encode)
+        self.shared_state = None
+        return rendered
+
+
+# Functions
+def make_animation_tracks(animation_objects):
+    """
+    make_animation_tracks(animation_objects)
+
+    Returns an AnimationObject with sorted keyframe tracks for every object of the animation.
+    The position keyframes are copied, so the join flags set by an engine (see join_molecules) do not
+    change the animation data or the other engines made from it.
+    """
+    tracks = {}
+    for obj in animation_objects:
+        data = animation_objects[obj]
+        tracks[obj] = AnimationObject(obj, data["molecule"],
+                                      endpos=zip(data["keyframe_endpos_frames"],
+                                                 [list(value) for value in data["keyframe_endpos"]]),
+                                      rotation=zip(data.get("keyframe_rotation_frames", []),
+                                                   data.get("keyframe_rotation", [])),
+                                      shown=zip(data.get("keyframe_shown_frames", []),
+                                                data.get("keyframe_shown", [])),
+                                      load_molecule=False)
+    return tracks
+
+
+def molecule_template(file_name):
+    """
+    molecule_template(file_name)
+
+    Returns the centered coordinates, elements and names of the atoms of the pdb file,
+    the file is only read the first time (see MOLECULE_TEMPLATES).
+    """
+    with TEMPLATES_LOCK:
+        if file_name not in MOLECULE_TEMPLATES:
+            mol = pdb.PDBMolecule(file_name, center=True)
+            MOLECULE_TEMPLATES[file_name] = (mol.get_coordinates(),
+                                             np.array([atom.element for atom in mol.atoms]),
+                                             np.array([atom.name for atom in mol.atoms]))
+        return MOLECULE_TEMPLATES[file_name]
+
+
+def make_molecule_state(mol):
+    """
+    make_molecule_state(mol)
+
+    arguments:
+    - mol: PDBMolecule
+
+    Returns the state of a molecule. The pose of a molecule is its position and orientation,
+    the atoms are placed from their coordinates (body) relative to the position in the start
+    orientation so the placement does not depend on earlier frames.
+    """
+    position = mol.center.copy()
+    return {"molecule": mol,
+            "start": position.copy(),
+            "position": position,
+            "orientation": np.eye(3),
+            "body": mol.get_coordinates() - position,
+            "version": next(MOLECULE_VERSIONS),
+            "placed": None,
+            "text": None
+            }
+
+
+def molecule_maker(mol1, mol2, name):
+    """Combines two molecules into one"""
+    combo = mol1.atoms
+    while len(mol2.atoms) > 0:
+        combo += [mol2.atoms.pop(0)]
+    final_combo = pdb.PDBMolecule(name, atoms=combo, center=False)
+    final_combo.render_molecule()
+    return final_combo
+
+
+def try_dict_keys(dictionary, key):
+    """
+    This function trys a dict and key together to see if it returns a key/slice error and
+    returns a bool based on that.
+    """
+    try:
+        dictionary[key]
+        return True
+    except:
+        return False
@@ -0,0 +1,144 @@
+"""
+Stochastic timing of the reactions of a population (see project_population).
+
+The ethanol molecules arrive at alcohol dehydrogenase (ADH) at their start frame, the ethanal made
+by ADH arrives at ethanal dehydrogenase (ALDH) when the animation has moved it there. Both enzymes
+turn their waiting substrate over with the Michaelis-Menten rate vmax * S / (km + S), in molecules per
+frame. The turnovers are simulated stochastically:
+- gillespie: exact, every turnover is drawn with an exponential waiting time
+- tau: tau-leaping, the turnovers of a leap of tau frames are drawn at once from a Poisson distribution
+
+The substrate is served in order of arrival, so the turnovers are filled in the arrival order. The rate
+only changes when a molecule arrives or is turned over, so between two arrivals the rate of every next
+turnover is known: the gillespie method draws the waiting times of all turnovers up to the next arrival
+at once and the tau method fills a slice of the arrival order per leap. Both take a step per arrival
+(or leap), not per molecule. The turnover frames become the timing arguments of the reactions: the
+join at ADH and the join at ALDH happen at the frames of the turnovers.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import numpy as np
+from project_animation_data_ethanol_2_acetic_acid import get_animation_data as ethanol_2_acetic_acid
+from project_population import ReactionTemplate, random_population
+
+# Frames of the reaction template (see project_animation_data_ethanol_2_acetic_acid): the join at
+# ADH and the join at ALDH
+ADH_FRAME = 90
+ALDH_FRAME = 205
+
+# Rates of the enzymes: maximum turnovers per frame and the substrate at half the maximum rate
+ADH_RATE = (0.5, 20.0)
+ALDH_RATE = (1.0, 10.0)
+
+METHODS = ("gillespie", "tau")
+
+# Turnovers drawn at once by the gillespie method on top of twice the expected turnovers
+GILLESPIE_BLOCK = 16
+
+
+# Functions
+def simulate_enzyme(arrivals, vmax, km, method="gillespie", tau=1.0, generator=None):
+    """
+    simulate_enzyme(arrivals, vmax, km, [method], [tau], [generator])
+
+    arguments:
+    - arrivals: array, the frame every substrate molecule arrives at the enzyme
+    - vmax: float, the maximum turnovers per frame
+    - km: float, the waiting substrate at half the maximum rate
+    - method: string, gillespie or tau (see METHODS)
+    - tau: float, the frames of a leap
+    - generator: numpy Generator
+
+    Returns the frame (float) of the turnover of every molecule.
+    """
+    if method not in METHODS:
+        raise ValueError("unknown method '{}', expected one of: {}".format(method, ", ".join(METHODS)))
+    generator = np.random.default_rng() if generator is None else generator
+    arrivals = np.asarray(arrivals, dtype=float)
+    order = np.argsort(arrivals, kind="stable")
+    arrived = arrivals[order]
+    turnovers = np.empty(len(arrived))
+
+    served, time = 0, arrived[0] if len(arrived) else 0.0
+    while served < len(arrived):
+        waiting = np.searchsorted(arrived, time, side="right") - served
+        if not waiting:
+            # No substrate, the enzyme waits for the next molecule
+            time = arrived[served]
+            continue
+        rate = vmax * waiting / (km + waiting)
+        next_arrival = arrived[served + waiting] if served + waiting < len(arrived) else np.inf
+
+        if method == "gillespie":
+            # The turnovers of (a block of about twice the expected turnovers before the next arrival of)
+            # the waiting substrate, the rate drops with every turnover
+            block = waiting if np.isinf(next_arrival) else \
+                min(waiting, int(rate * (next_arrival - time) * 2) + GILLESPIE_BLOCK)
+            left = np.arange(waiting, waiting - block, -1)
+            times = time + np.cumsum(generator.exponential(1.0, block) / (vmax * left / (km + left)))
+            count = int(np.searchsorted(times, next_arrival, side="right"))
+            turnovers[served:served + count] = times[:count]
+            served += count
+            # The rate changes when a molecule arrives, the waiting time starts again (memoryless)
+            time = next_arrival if count < block else times[-1]
+        else:
+            # Leaps end at an arrival, so the rate of a leap is constant
+            leap = min(tau, next_arrival - time)
+            count = min(generator.poisson(rate * leap), waiting)
+            time += leap
+            turnovers[served:served + count] = time
+            served += count
+
+    events = np.empty(len(arrived))
+    events[order] = turnovers
+    return events
+
+
+def schedule_reactions(start_frames, adh_rate=ADH_RATE, aldh_rate=ALDH_RATE, method="gillespie", tau=1.0,
+                       seed=None):
+    """
+    schedule_reactions(start_frames, [adh_rate], [aldh_rate], [method], [tau], [seed])
+
+    arguments:
+    - start_frames: array, the start frame of every reaction
+    - adh_rate: list, vmax and km of ADH
+    - aldh_rate: list, vmax and km of ALDH
+    - method: string, gillespie or tau (see simulate_enzyme)
+    - tau: float, the frames of a leap
+    - seed: int, the seed of the random numbers
+
+    Returns the timing arguments of the reactions (see project_population.TIMING): the ethanol waits
+    for ADH and the ethanal waits for ALDH.
+    """
+    generator = np.random.default_rng(seed)
+    start_frames = np.asarray(start_frames, dtype=np.int64)
+
+    # The first frame a reaction can join each enzyme without waiting
+    adh = simulate_enzyme(start_frames + ADH_FRAME, *adh_rate, method=method, tau=tau, generator=generator)
+    adh_frames = np.maximum(np.ceil(adh).astype(np.int64), start_frames + ADH_FRAME)
+    aldh_arrivals = adh_frames + ALDH_FRAME - ADH_FRAME
+    aldh = simulate_enzyme(aldh_arrivals, *aldh_rate, method=method, tau=tau, generator=generator)
+    aldh_frames = np.maximum(np.ceil(aldh).astype(np.int64), aldh_arrivals)
+
+    return np.column_stack((start_frames, adh_frames - start_frames - ADH_FRAME,
+                            aldh_frames - aldh_arrivals, np.zeros(len(start_frames), dtype=np.int64)))
+
+
+def get_kinetics_data(count, seed=None, show_name=False, method="gillespie", **population):
+    """
+    get_kinetics_data(count, [seed], [show_name], [method], [population])
+
+    Returns the animation data of the first reaction of the animation and a population of count
+    reactions with random positions and start frames (see random_population) of which the enzymes
+    are timed by schedule_reactions.
+    """
+    animation_objects = ethanol_2_acetic_acid(show_name=show_name)
+    template = ReactionTemplate(show_name=show_name)
+    offsets, timing = random_population(count, seed=seed, **population)
+    timing = schedule_reactions(timing[:, 0], method=method, seed=seed)
+    animation_objects.update(template.make_reactions(range(1, count + 1), offsets, timing))
+    return animation_objects
@@ -11,14 +11,21 @@ Current functions:
 - Move the atoms to offset
 - Create basic vapory objects
 - Joining multiple molecules together into one molecule
-- Rotation of molecules (only with single core renders)
+- Rotation of molecules
 - Start and stop showing objects (default is always shown)
 - Added support for moving Camera objects.
+- Frames can be made in any order (AnimationEngine.frame_stateless) for multi core renders.
+- Several animations or variants (i.e. another aldh_speed) can be made in one process.
+- Dry run (DryRun setting) that checks all frames without rendering them.
+- Command line with frame ranges, chunks, render qualities, workers and output paths.
+- Splits with multiple atoms at a time and splits of split molecules.
+- Reading the animation data from a .micdes animation file (--animation, see project_micdes).
+- Populations of hundreds or thousands of reactions from a reaction template (--population).
+- Stochastic (Gillespie or tau-leaping) timing of the enzymes of a population (--kinetics).
+- Joins triggered by the proximity of molecules and overlap warnings (see project_proximity).
+- Profiling (cProfile and tracemalloc) of selected frames, also in pool workers (see project_profile).
 
 Upcomming functions:
-- Rotation of molecules with multi core render support
-- Reading the animation data from a .micdes animation file
-- Add support for splits with multiple atoms at a time
 - Add support for moving vapory objects.
 - Showing labels
 
@@ -32,30 +39,52 @@ __author__ = "Micha Beens"
 __version__ = "1.0.0"
 
 # Imports
+import os
 import sys
-from vapory import Camera, LightSource, Scene
-from pypovray import pypovray, pdb
+import logging
+from pypovray import pypovray, load_config, use_config
 from project_animation_data_ethanol_2_acetic_acid import get_animation_data as ethanol_2_acetic_acid
-from project_sorted_molecules import sort_molecules
-from animation_object import AnimationObject
-
-
-# Globals
-MOLECULES = {}
-ANIMATION_OBJECTS = {}
+from project_engine import AnimationEngine, ANIMATION_FRAMES
+from project_dry_run import dry_run
+from project_micdes import MicdesError
+from project_population import get_population_data
+from project_kinetics import get_kinetics_data
+from project_proximity import make_proximity_monitor
+from project_profile import make_frame_profiler
+from project_cli import parse_arguments, select_frames
+from project_trace import TRACER
+
+
+# Arguments of the reactions of the animation (see project_animation_data_ethanol_2_acetic_acid),
+# the first reaction uses the default arguments
+REACTIONS = [{},
+             {"num": 1, "start_frame": 270, "sme_pos_ethanol": [[60, 20, 0], [0, 0, 0], [-60, 10, 0]],
+              "ethanol_start_wacht": 80, "ethanol_mid_wacht": 0, "aldh_speed": 15},
+             {"num": 2, "start_frame": 270, "sme_pos_ethanol": [[60, 10, 0], [0, 20, 0], [-60, 10, 0]],
+              "ethanol_start_wacht": 160, "ethanol_mid_wacht": 400, "aldh_speed": 15},
+             {"num": 3, "start_frame": 270, "sme_pos_ethanol": [[60, 00, 0], [0, 0, 0], [-60, 0, 0]],
+              "ethanol_start_wacht": 0, "ethanol_mid_wacht": 0, "aldh_speed": 15},
+             {"num": 4, "start_frame": 270, "sme_pos_ethanol": [[60, -10, 0], [0, -10, 0], [-60, -10, 0]],
+              "ethanol_start_wacht": 120, "ethanol_mid_wacht": 30, "aldh_speed": 15},
+             {"num": 5, "start_frame": 270, "sme_pos_ethanol": [[60, -20, 0], [0, -20, 0], [-60, -20, 0]],
+              "ethanol_start_wacht": 40, "ethanol_mid_wacht": 400, "aldh_speed": 15},
+             ]
 
 
 # Functions
-def get_animation_data(show_name):
+def get_animation_data(show_name=False, **variant):
     """
-    Gets the data for the animation
+    get_animation_data([show_name], [variant])
+
+    Returns the data for the animation. The keyword arguments of a variant (i.e. aldh_speed=30)
+    replace the arguments of all reactions (see REACTIONS).
 
     Needed data per object:
     - (String) Name object
     - (Bool) Molecule
         - True (bool) part of molecule {if true keyframes end position xyz becomes offset}
             - True (string) object to split
-            - True (list) atoms to split {!!Current program only supports 1 atom split at a time!!}
+            - True (list) atoms to split (numbers of the atoms of the mother at the start of the split frame)
                 - (int) atom
             - False (file_path) pdb document
         - False (vapory components) components {!!These components are static and cant move!!}
@@ -84,443 +113,93 @@ def get_animation_data(show_name):
         - (int) frame
     - (list) shown or not for the the complement frame
         - (bool) Should the object be shown
+    - (list) Proximity joins, the molecule joins a partner when their atoms come within the distance
+        - (list) partner and distance
+            - (string) partner molecule {the partner is not shown after the join}
+            - (int/float) distance
     """
 
-    global ANIMATION_OBJECTS
-
-    animatie_data_0 = ethanol_2_acetic_acid(show_name=show_name)
-    animatie_data_1 = ethanol_2_acetic_acid(1, 270, [[60, 20, 0], [0, 0, 0], [-60, 10, 0]], 80, 0, 15, show_name)
-    animatie_data_2 = ethanol_2_acetic_acid(2, 270, [[60, 10, 0], [0, 20, 0], [-60, 10, 0]], 160, 400, 15, show_name)
-    animatie_data_3 = ethanol_2_acetic_acid(3, 270, [[60, 00, 0], [0, 0, 0], [-60, 0, 0]], 0, 0, 15, show_name)
-    animatie_data_4 = ethanol_2_acetic_acid(4, 270, [[60, -10, 0], [0, -10, 0], [-60, -10, 0]], 120, 30, 15, show_name)
-    animatie_data_5 = ethanol_2_acetic_acid(5, 270, [[60, -20, 0], [0, -20, 0], [-60, -20, 0]], 40, 400, 15, show_name)
-    animation_data = [animatie_data_0,
-                      animatie_data_1,
-                      animatie_data_2,
-                      animatie_data_3,
-                      animatie_data_4,
-                      animatie_data_5,]
-
-    for animation_dict in animation_data:
-        for obj in animation_dict:
-            ANIMATION_OBJECTS[obj] = animation_dict[obj]
-
-def make_molecules(molecules):
-    """
-    make_molecules([frame, molecules])
-    """
-    for obj in ANIMATION_OBJECTS:
-        molecule_data = ANIMATION_OBJECTS[obj]["molecule"]
-
-        if molecule_data[0] and not molecule_data[1]:
-            # Making normal molecules from pdb file
-            mol = pdb.PDBMolecule(molecule_data[2], center=True)
-            molecule = {"molecule": mol,
-                        "reset": [0, mol.atoms.copy()],
-                        "text": None
-                        }
-
-        elif not molecule_data[0]:
-            # Making basic vapory objects
-            molecule = {"molecule": molecule_data[1:]}
-
-        else:
-            # Make the molecule a None object until it is time to split the moleucle
-            molecule = None
-
-        molecules[obj] = molecule
-    return molecules
-
-
-def calculate_distance(frames, ends, step, molecule_start, offset=False):
-    """Calculates the step size for the movement"""
+    animation_objects = {}
+    for reaction in REACTIONS:
+        arguments = dict(reaction, **variant)
+        animation_objects.update(ethanol_2_acetic_acid(show_name=show_name, **arguments))
+    return animation_objects
 
-    distance_list = []
 
-    time = frames[1] - frames[0]
-
-    for index, start in enumerate(molecule_start):
-        if offset:
-            end = ends[index]
-        else:
-            end = ends[index] - start
-        distance = start + end / time * (step - frames[0])
-        distance_list.append(distance)
-
-    return distance_list
-
-
-def calculate_radians(frames, ends):
-    """Calculates how many radians must be moved per step"""
-    time = frames[1] - frames[0]
-    radians_list = []
-    for end in ends:
-        radians = end / time
-        radians_list.append(radians)
-    return radians_list
-
-
-def molecule_maker(mol1, mol2, name):
-    """Combines two molecules into one"""
-    combo = mol1.atoms
-    while len(mol2.atoms) > 0:
-        combo += [mol2.atoms.pop(0)]
-    final_combo = pdb.PDBMolecule(name, atoms=combo, center=False)
-    final_combo.render_molecule()
-    return final_combo
-
-
-def move_objects(obj, step, mother=False):
+# Main
+def main(arguments=None):
     """
-    move_objects(obj, step, [mother])
-
-    arguments:
-    - obj: string
-    - step: int
-    - mother: bool
+    main([arguments])
 
-    Move the object to the right position based on the step. If no mother is given the default is False
+    Main activates the program and renders the animation, see project_cli for the arguments.
+    Returns 1 if existing output stopped the render.
     """
-    global MOLECULES
-
-    molecule_data = ANIMATION_OBJECTS[obj]["molecule"]
-    keyframe_frames_data = ANIMATION_OBJECTS[obj]["keyframe_endpos_frames"]
-    keyframe_endpos_data = ANIMATION_OBJECTS[obj]["keyframe_endpos"]
-
-    for frame in range(len(keyframe_frames_data)):
-        #Move object if step is in range
-        if frame != 0 and step in [val for val in range(keyframe_frames_data[frame-1]+1,
-                                                        keyframe_frames_data[frame]+1)]:
-            move_object_in_range(step, frame, obj, mother)
-            break
-
-        # if step is lower than the keyframe move object to that position
-        elif frame == 0 and step <= keyframe_frames_data[frame]:
-            # if true move objects to start position and go to the next molecule
-            print("(move) elif1:", obj)
-            if molecule_data[0] and not molecule_data[1]:
-                MOLECULES[obj]["molecule"].move_to(keyframe_endpos_data[frame])
-            elif obj == "camera":
-                MOLECULES[obj]["molecule"] = [keyframe_endpos_data[frame][0], keyframe_endpos_data[frame][1]]
-
-            break
-
-        # if object is a molecule and a split molecule move the object with a offset
-        elif molecule_data[0] and molecule_data[1]:
-            # If the other statment are false do this
-            if keyframe_frames_data[-1] == keyframe_frames_data[frame]:
-                print("(move) elif2:", obj)
-            distance = MOLECULES[obj]["start"].copy()
-            for index in range(frame+1):
-                distance += keyframe_endpos_data[index]
-            MOLECULES[obj]["molecule"].move_to(distance)
-
-        # if object is a molecule move object to the position of frame
-        elif molecule_data[0]:
-            if keyframe_frames_data[-1] == keyframe_frames_data[frame]:
-                print("(move) elif3:", obj)
-            MOLECULES[obj]["molecule"].move_to(keyframe_endpos_data[frame][:3])
+    args = parse_arguments(arguments)
+    try:
+        settings = use_config(load_config(args.config, args.overrides))
+    except (KeyError, ValueError, FileNotFoundError) as error:
+        logging.error("%s", error)
+        return 2
+    logging.basicConfig(level=settings.LogLevel)
+    TRACER.configure(settings.TraceCategories)
 
-            # if molecules need to be joined
-            if step >= keyframe_frames_data[frame] and try_dict_keys(keyframe_endpos_data[frame], 3) and not mother and not keyframe_endpos_data[frame][4]:
-                for mol in range(5, 5+len(keyframe_endpos_data[frame][5:])):
-                    print("join {} and {} at frame {}".format(obj, keyframe_endpos_data[frame][mol], keyframe_frames_data[frame]))
-                    # Set the molecules that is
-                    move_objects(keyframe_endpos_data[frame][mol], keyframe_frames_data[frame])
-                    MOLECULES[obj]["molecule"] = molecule_maker(MOLECULES[obj]["molecule"], MOLECULES[keyframe_endpos_data[frame][mol]]["molecule"], obj)
-                keyframe_endpos_data[frame][4] = True
+    if args.encode_only:
+        return 0 if pypovray.encode_mp4() else 1
 
+    try:
+        if args.animation:
+            engine = AnimationEngine.from_file(args.animation, tracer=TRACER)
+        elif args.population and args.kinetics:
+            engine = AnimationEngine(get_kinetics_data(args.population, seed=args.seed, method=args.kinetics),
+                                     ANIMATION_FRAMES, tracer=TRACER)
+        elif args.population:
+            engine = AnimationEngine(get_population_data(args.population, seed=args.seed),
+                                     ANIMATION_FRAMES, tracer=TRACER)
         else:
-            if keyframe_frames_data[-1] == keyframe_frames_data[frame] and not obj == "camera":
-                print("(move) else: {}".format(obj))
-            if obj == "camera":
-                MOLECULES[obj]["molecule"] = [keyframe_endpos_data[frame][0], keyframe_endpos_data[frame][1]]
-
-
-def move_object_in_range(step, frame, obj, mother):
-    """
-    move_object_in_range(step, frame, obj, mother)
-
-    Arguments:
-    - step: int
-    - frame: int
-    - obj: string
-    - mother: bool
-
-    Moves the object to the place equevelent to the step
-    """
-    # move the object to the place equevelent to the step
-
-    molecule_data = ANIMATION_OBJECTS[obj]["molecule"]
-    keyframe_frames_data = ANIMATION_OBJECTS[obj]["keyframe_endpos_frames"]
-    keyframe_endpos_data = ANIMATION_OBJECTS[obj]["keyframe_endpos"]
-
-    print("(move) if:", obj)
-    if molecule_data[0] and molecule_data[1]:
-
-        start_pos = MOLECULES[obj]["start"].copy()
-        for index in range(frame):
-            start_pos[0] += keyframe_endpos_data[index][0]
-            start_pos[1] += keyframe_endpos_data[index][1]
-            start_pos[2] += keyframe_endpos_data[index][2]
-
-        distance = calculate_distance([keyframe_frames_data[frame-1], keyframe_frames_data[frame]],
-                                      keyframe_endpos_data[frame],
-                                      step,
-                                      start_pos,
-                                      True)
-
-        MOLECULES[obj]["molecule"].move_to(list(distance))
-
-    #if object is mother move the object to previous frame
-    elif mother and step != keyframe_frames_data[frame]:
-        MOLECULES[obj]["molecule"].move_to(keyframe_endpos_data[frame-1])
-
-    # if object is a molecule move it as a molecule
-    elif molecule_data[0]:
-        distance = calculate_distance([keyframe_frames_data[frame-1], keyframe_frames_data[frame]],
-                                      keyframe_endpos_data[frame][:3],
-                                      step,
-                                      keyframe_endpos_data[frame-1][:3])
-
-        MOLECULES[obj]["molecule"].move_to(list(distance))
-
-    # if object is a vapory object
-    elif not molecule_data[0]:
-        # move the camera
-        if obj == "camera":
-            location = calculate_distance([keyframe_frames_data[frame-1], keyframe_frames_data[frame]],
-                                          keyframe_endpos_data[frame][0][:3],
-                                          step,
-                                          keyframe_endpos_data[frame-1][0][:3])
-
-            look_at = calculate_distance([keyframe_frames_data[frame-1], keyframe_frames_data[frame]],
-                                         keyframe_endpos_data[frame][1][:3],
-                                         step,
-                                         keyframe_endpos_data[frame-1][1][:3])
-
-            MOLECULES[obj]["molecule"] = [location, look_at]
-
-    # if molecules need to be joined
-    if step == keyframe_frames_data[frame] and try_dict_keys(keyframe_endpos_data[frame], 3) and not mother and not keyframe_endpos_data[frame][4]:
-        for mol in range(5, 5+len(keyframe_endpos_data[frame][5:])):
-            print("join {} and {} at frame {}".format(obj, keyframe_endpos_data[frame][mol], step))
-            # Set the molecules that is
-            move_objects(keyframe_endpos_data[frame][mol], step)
-            MOLECULES[obj]["molecule"] = molecule_maker(MOLECULES[obj]["molecule"], MOLECULES[keyframe_endpos_data[frame][mol]]["molecule"], obj)
-
-            keyframe_endpos_data[frame][4] = True
-
-def rotate_objects(obj, step, mother=False):
-    """
-    rotate_objects(obj, step, [mother])
-
-    arguments:
-    - obj: string
-    - step: int
-    - mother: True
-
-    Rotate the objects for the right value not based on the step.
-    If no mother is given default is False
-    """
-    rotate_frames_data = ANIMATION_OBJECTS[obj]["keyframe_rotation_frames"]
-    rotate_endpos_data = ANIMATION_OBJECTS[obj]["keyframe_rotation"]
-
-    for frame in range(len(rotate_frames_data)):
-        # Calculate the start rotation of the molecule
-
-        if frame != 0 and step in [val for val in range(rotate_frames_data[frame-1]+1,
-                                                        rotate_frames_data[frame]+1)]:
-
-            print("(rotate) if: {}".format(obj))
-            # rotate the object to the place equevelent to the step
-            if mother:
-                radians = calculate_radians([rotate_frames_data[frame-1], rotate_frames_data[frame]],
-                                            rotate_endpos_data[frame][1],
-                                            )
-
-                MOLECULES[obj]["molecule"].rotate([1, 1, 1], [radians[0]*-1, radians[1]*-1, radians[2]*-1])
-
-            else:
-                radians = calculate_radians([rotate_frames_data[frame-1], rotate_frames_data[frame]],
-                                            rotate_endpos_data[frame][1],
-                                            )
-
-                MOLECULES[obj]["molecule"].rotate([1, 1, 1], radians)
-            break
-
-
-def shown_objects(obj, step, render_list):
-    """
-    shown_objects(obj, step, render_list)
-
-    arguments:
-    - obj: String
-    - step: int
-    - render_list: list
-
-    Move/rotate the objects and put them in the render_list
-    """
-    shown_frames_data = ANIMATION_OBJECTS[obj]["keyframe_shown_frames"]
-    shown_bool_data = ANIMATION_OBJECTS[obj]["keyframe_shown"]
-
-    # Rotate object when possible
-    if try_dict_keys(ANIMATION_OBJECTS[obj], "keyframe_rotation_frames") and\
-       try_dict_keys(ANIMATION_OBJECTS[obj], "keyframe_rotation"):
-        rotate_objects(obj, step)
-
-    for frame in range(len(shown_frames_data)):
-        if frame != 0 and step in [val for val in range(shown_frames_data[frame-1], shown_frames_data[frame])] and shown_bool_data[frame-1] or \
-           frame == 0 and step <= shown_frames_data[frame]:
-            print("(shown): {}".format(obj))
-            # Move object to the correct posision based on the step
-            move_objects(obj, step)
-
-            # Put object in render_list
-            if ANIMATION_OBJECTS[obj]["show_name"]:
-                render_list = put_object_in_render_list(obj, render_list, text=True)
-
-            render_list = put_object_in_render_list(obj, render_list)
-            break
-
-        if shown_bool_data[frame] or \
-           shown_frames_data[frame] == shown_frames_data[-1] and step > shown_frames_data[frame] and shown_bool_data[frame]:
-            print("(shown): {}".format(obj))
-            # Move object to the correct posision based on the step
-            move_objects(obj, step)
-
-            # Put object in render_list
-            if ANIMATION_OBJECTS[obj]["show_name"]:
-                render_list = put_object_in_render_list(obj, render_list, text=True)
-
-            render_list = put_object_in_render_list(obj, render_list)
-            break
-
-        elif shown_frames_data[frame] == shown_frames_data[-1]:
-            print("(shown) elif: {} (object not shown)".format(obj))
-
-    return render_list
-
-
-def put_object_in_render_list(obj, render_list, text=False):
-    """
-    Puts the object in the render_list so it will be renderd.
-    """
-    molecule_data = ANIMATION_OBJECTS[obj]["molecule"]
-    if molecule_data[0]:
-        render_list = render_list + MOLECULES[obj]["molecule"].povray_molecule
-    elif not obj == "camera":
-        render_list = render_list + MOLECULES[obj]["molecule"]
-
-    if text:
-        render_list = render_list + [MOLECULES[obj]["text"]]
-
-    return render_list
-
-
-def try_dict_keys(dictionary, key):
-    """
-    This function trys a dict and key together to see if it returns a key/slice error and
-    returns a bool based on that.
-    """
+            engine = AnimationEngine(get_animation_data(False), ANIMATION_FRAMES, tracer=TRACER)
+        # The spatial hash of the molecules for the overlaps (or another cell size)
+        if settings.OverlapDistance or settings.ProximityCellSize:
+            engine.proximity = make_proximity_monitor(engine.animation_objects, settings.ProximityCellSize,
+                                                      settings.OverlapDistance)
+        engine.profiler = make_frame_profiler(settings)
+    except (MicdesError, OSError, ValueError) as error:
+        logging.error("%s", error)
+        return 2
     try:
-        dictionary[key]
-        return True
-    except:
-        return False
-
-
-def make_frame(step):
-    """
-    meke_frame(step)
-
-    arguments:
-    - step: int
-
-    Create the scene that coresponds to the step.
-    """
-    global MOLECULES
-
-    # Basic objects for the scene
-    cam = Camera("location", [0, 0, 100], "look_at", [0, 0, 0])
-    light = LightSource([0, 0, 100], 1)
-    render_list = [light]
-
-    print("frame:{}----------------------------------------------------------------".format(step))
-
-    sorted_animation_objects = sort_molecules(ANIMATION_OBJECTS)
-
-    # Is there another None molecule that needs to be created.
-    for obj in sorted_animation_objects:
-        molecule_data = ANIMATION_OBJECTS[obj]["molecule"]
-        keyframe_frames_data = ANIMATION_OBJECTS[obj]["keyframe_endpos_frames"]
-        if MOLECULES[obj] is None and step >= keyframe_frames_data[0]:
-            mother_name = ANIMATION_OBJECTS[molecule_data[2]]["name"]
-
-            # Set the mother molecule on the start position of split.
-            move_objects(mother_name, keyframe_frames_data[0], True)
-
-            # Set the mother molecule on the start rotation of split.
-            if try_dict_keys(ANIMATION_OBJECTS[mother_name], "keyframe_rotation_frames") and\
-               try_dict_keys(ANIMATION_OBJECTS[mother_name], "keyframe_rotation"):
-                rotate_objects(mother_name, step)
-            print(obj)
-            # Call make molecules to split the molecule
-            split_molecule = MOLECULES[molecule_data[2]]["molecule"].divide(molecule_data[3],
-                                                                            obj,
-                                                                            offset=[0, 0, 0]
-                                                                            )
-
-            MOLECULES[obj] = {"molecule": split_molecule,
-                              "start": split_molecule.center.copy(),
-                              "reset": split_molecule.atoms,
-                              "text": None
-                              }
-
-            # Set the mother molecule on the start rotation back before the split.
-            if try_dict_keys(ANIMATION_OBJECTS[mother_name], "keyframe_rotation_frames") and\
-               try_dict_keys(ANIMATION_OBJECTS[mother_name], "keyframe_rotation"):
-                rotate_objects(mother_name, step, True)
-
-    # Move, Rotate and join objects
-    for obj in ANIMATION_OBJECTS:
-        molecule_data = ANIMATION_OBJECTS[obj]["molecule"]
-
-        if not MOLECULES[obj] is None:
-            # Put the different objects in the render list
-            if try_dict_keys(ANIMATION_OBJECTS[obj], "keyframe_shown_frames") and\
-               try_dict_keys(ANIMATION_OBJECTS[obj], "keyframe_shown"):
-
-                # Move, rotate the objects and put them in the render_list
-                render_list = shown_objects(obj, step, render_list)
-            else:
-                # Move object to the correct posision based on the step
-                move_objects(obj, step)
-
-                # Rotate object when possible
-                if try_dict_keys(ANIMATION_OBJECTS[obj], "keyframe_rotation_frames") and\
-                   try_dict_keys(ANIMATION_OBJECTS[obj], "keyframe_rotation"):
-                    rotate_objects(obj, step)
-
-                #Put object in render_list
-                render_list = put_object_in_render_list(obj, render_list)
-
-            if obj == "camera":
-                cam = Camera("location", MOLECULES[obj]["molecule"][0], "look_at", MOLECULES[obj]["molecule"][1])
-    return Scene(cam, objects=render_list)
-
-
-# Main
-def main():
-    """
-    main()
-
-    Main activates the program and renders the animation
-    """
-    global MOLECULES
-    get_animation_data(False)
-    MOLECULES = make_molecules(molecules={})
-    pypovray.render_scene_to_mp4(make_frame, range(700))
+        frames = select_frames(args, engine.steps)
+    except ValueError as error:
+        logging.error("%s", error)
+        return 2
+
+    # Chunks of the frames with about the same render time (see DryRunReport.plan)
+    report = None
+    if args.chunk or settings.DryRun:
+        report = dry_run(engine, frames)
+    if args.chunk:
+        index, chunks = args.chunk
+        plan = report.plan(chunks)
+        frames = plan[index - 1] if index <= len(plan) else []
+        logging.info("Chunk %d of %d: %d frames", index, chunks, len(frames))
+
+    # Check the animation without rendering it, the figures of every frame are written to a CSV file
+    if settings.DryRun:
+        logging.log(logging.WARNING if report.anomalies else logging.INFO, "Dry run:\n%s", report.summary())
+        os.makedirs(settings.OutputMovieDir, exist_ok=True)
+        report.write(os.path.join(settings.OutputMovieDir, "{}_dry_run.csv".format(settings.OutputPrefix)))
+        return 0
+
+    if not frames:
+        logging.warning("No frames to render")
+        return 0
+
+    os.makedirs(settings.OutputImageDir, exist_ok=True)
+    os.makedirs(settings.OutputMovieDir, exist_ok=True)
+    if not engine.render(frames, settings, encode=args.encode):
+        return 1
+
+    # Frames made by pool workers are counted in the workers
+    if not settings.UsePool:
+        logging.info("Animation report:\n%s", TRACER.report())
     return 0
 
 
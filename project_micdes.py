@@ -0,0 +1,368 @@
+"""
+Reads animations from .micdes animation files.
+
+A .micdes file describes an animation without Python: the objects with their pdb file, split or
+POV-Ray code, the keyframes of their path, rotation and visibility and the joins. The file is a
+JSON document:
+
+    {"format": "micdes", "version": 1, "frames": 700,
+     "objects": {
+        "camera": {"camera": {"location": [0, 0, 100], "look_at": [0, 0, 0]},
+                   "path": [[0, 0, 0, 100, 0, 0, 0], [30, 30, 0, 50, 30, 0, -10]]},
+        "enzyme": {"povray": ["sphere { <30,0,-10>, 4 }"]},
+        "ethanol": {"pdb": "pdb/ethanol2.pdb",
+                    "path": [[20, 80, 0, 0], [75, 30, 0, 0], [90, 30, 0, 0]],
+                    "rotation": [[29, 0, 0, 0, 0, 0, 0], [30, 1, 1, 1, 6.28, 6.28, 6.28]],
+                    "shown": [[0, true], [250, false]],
+                    "joins": [[90, "hydrogen"]]},
+        "hydrogen": {"split": {"from": "ethanol", "atoms": [3]},
+                     "path": [[75, 0, 0, 0], [90, -0.3, -5.5, -0.2]]}}}
+
+Keyframes are lists of the frame followed by the values: x, y, z of a path (the offsets from the
+split position for split molecules), the location and look_at of the camera path and the axis and
+radians of a rotation. A join happens at a frame of the path of the object it joins into. The
+proximity joins of a molecule ([[partner, distance], ...]) happen when the atoms of the molecules
+come within the distance (see project_proximity).
+
+The file is validated when it is read and compiled into the animation data and the timeline of
+the engine. The compiled animation (the document and the keyframe arrays of the timeline) is cached
+compressed next to the file (in __micdes_cache__) under the hash of the file, an unchanged file is
+loaded from the cache without validating and compiling it again.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import os
+import json
+import hashlib
+import numpy as np
+from project_timeline import Timeline, compile_timeline
+
+# Version of the file format and of the compiled cache files
+FORMAT_VERSION = 1
+CACHE_VERSION = 2
+
+# Folder of the compiled animations, next to the animation file
+CACHE_FOLDER = "__micdes_cache__"
+
+# The kinds of objects, every object has exactly one
+OBJECT_KINDS = ("pdb", "split", "povray", "camera")
+
+# The fields of an object and the number of values of their keyframes (after the frame)
+KEYFRAME_FIELDS = {"path": 3, "rotation": 6, "shown": 1, "joins": None}
+OBJECT_FIELDS = set(OBJECT_KINDS) | set(KEYFRAME_FIELDS) | {"show_name", "proximity_joins"}
+
+
+# Classes
+class MicdesError(ValueError):
+    """
+    An error in an animation file.
+    """
+
+
+# Functions
+def load_animation(file_name, cache=True):
+    """
+    load_animation(file_name, [cache])
+
+    arguments:
+    - file_name: string, the .micdes file
+    - cache: bool, use and write the compiled cache
+
+    Returns the animation data (see get_animation_data in project_main), the steps and the
+    compiled Timeline of the animation file, raises a MicdesError if the file is not valid.
+    """
+    with open(file_name, "rb") as animation_file:
+        source = animation_file.read()
+    cache_file = _cache_file_name(file_name, source)
+
+    if cache and os.path.exists(cache_file):
+        try:
+            with np.load(cache_file, allow_pickle=False) as arrays:
+                document = json.loads(arrays["document"].tobytes().decode("utf-8"))
+                timeline = Timeline.from_arrays({name: arrays[name] for name in arrays.files})
+            return compile_objects(document), range(document["frames"]), timeline
+        except (OSError, ValueError, KeyError):
+            # A damaged cache is compiled again
+            pass
+
+    try:
+        document = json.loads(source.decode("utf-8"))
+    except ValueError as error:
+        raise MicdesError("{}: not a valid animation file: {}".format(file_name, error))
+    validate_document(document, file_name)
+
+    animation_objects = compile_objects(document)
+    steps = range(document["frames"])
+    timeline = compile_timeline(animation_objects, steps)
+
+    if cache:
+        _write_cache(cache_file, document, timeline)
+    return animation_objects, steps, timeline
+
+
+def validate_document(document, file_name="animation"):
+    """
+    validate_document(document, [file_name])
+
+    Checks the parsed animation file, raises a MicdesError with the object and field of the
+    first error found.
+    """
+    def error(message, *args):
+        raise MicdesError("{}: {}".format(file_name, message.format(*args)))
+
+    if not isinstance(document, dict) or document.get("format") != "micdes":
+        error("not a micdes animation file")
+    if document.get("version") != FORMAT_VERSION:
+        error("version {} is not supported (only version {})", document.get("version"), FORMAT_VERSION)
+    unknown = set(document) - {"format", "version", "frames", "objects"}
+    if unknown:
+        error("unknown fields: {}", ", ".join(sorted(unknown)))
+    if not _is_int(document.get("frames")) or document["frames"] < 1:
+        error("frames should be a positive number")
+    objects = document.get("objects")
+    if not isinstance(objects, dict) or not objects:
+        error("objects should be a mapping of names to objects")
+
+    molecules = {name for name, obj in objects.items()
+                 if isinstance(obj, dict) and ("pdb" in obj or "split" in obj)}
+    # Molecules that are still needed later, these can not be the partner of a proximity join
+    mothers = {obj["split"].get("from") for obj in objects.values()
+               if isinstance(obj, dict) and isinstance(obj.get("split"), dict)}
+    split_products = {name for name, obj in objects.items() if isinstance(obj, dict) and "split" in obj}
+    join_partners = {partner for obj in objects.values() if isinstance(obj, dict) and isinstance(obj.get("joins"), list)
+                     for keyframe in obj["joins"] if isinstance(keyframe, list) for partner in keyframe[1:]
+                     if isinstance(partner, str)}
+    for name, obj in objects.items():
+        if not isinstance(obj, dict):
+            error("object '{}' is not a mapping", name)
+        unknown = set(obj) - OBJECT_FIELDS
+        if unknown:
+            error("object '{}' has unknown fields: {}", name, ", ".join(sorted(unknown)))
+        kinds = [kind for kind in OBJECT_KINDS if kind in obj]
+        if len(kinds) != 1:
+            error("object '{}' should have one of: {}", name, ", ".join(OBJECT_KINDS))
+        kind = kinds[0]
+
+        if kind == "pdb" and (not isinstance(obj["pdb"], str) or not os.path.isfile(obj["pdb"])):
+            error("object '{}': pdb file '{}' not found", name, obj["pdb"])
+        if kind == "split":
+            split = obj["split"]
+            if not isinstance(split, dict) or set(split) != {"from", "atoms"}:
+                error("object '{}': split should have 'from' and 'atoms'", name)
+            if split["from"] not in molecules or split["from"] == name:
+                error("object '{}': split from unknown molecule '{}'", name, split["from"])
+            if not isinstance(split["atoms"], list) or not split["atoms"] or \
+               not all(_is_int(atom) and atom >= 0 for atom in split["atoms"]):
+                error("object '{}': split atoms should be a list of atom numbers", name)
+        if kind == "povray" and (not isinstance(obj["povray"], list) or
+                                 not all(isinstance(code, str) for code in obj["povray"])):
+            error("object '{}': povray should be a list of POV-Ray code", name)
+        if kind == "camera":
+            camera = obj["camera"]
+            if name != "camera":
+                error("object '{}': the camera should be named 'camera'", name)
+            if not isinstance(camera, dict) or set(camera) != {"location", "look_at"} or \
+               not all(_is_vector(camera[key], 3) for key in camera):
+                error("object '{}': camera should have a 'location' and 'look_at' vector", name)
+        if kind in ("pdb", "split", "camera") and not obj.get("path"):
+            error("object '{}' has no path", name)
+
+        for field, length in KEYFRAME_FIELDS.items():
+            if field not in obj:
+                continue
+            keyframes = obj[field]
+            if not isinstance(keyframes, list):
+                error("object '{}': {} should be a list of keyframes", name, field)
+            if field == "path" and kind == "camera":
+                length = 6
+            for keyframe in keyframes:
+                if not isinstance(keyframe, list) or not keyframe or not _is_int(keyframe[0]):
+                    error("object '{}': {} keyframe {} should start with a frame", name, field, keyframe)
+                if field == "shown":
+                    valid = len(keyframe) == 2 and isinstance(keyframe[1], bool)
+                elif field == "joins":
+                    valid = len(keyframe) > 1 and all(partner in molecules and partner != name
+                                                      for partner in keyframe[1:])
+                else:
+                    valid = _is_vector(keyframe[1:], length)
+                if not valid:
+                    error("object '{}': {} keyframe {} is not valid", name, field, keyframe)
+
+        for proximity_join in obj.get("proximity_joins", []):
+            if not isinstance(proximity_join, list) or len(proximity_join) != 2 or \
+               proximity_join[0] not in molecules or proximity_join[0] == name or \
+               not _is_vector(proximity_join[1:], 1) or proximity_join[1] <= 0:
+                error("object '{}': proximity join {} should be a molecule and a distance", name, proximity_join)
+            if proximity_join[0] in mothers or proximity_join[0] in join_partners:
+                error("object '{}': proximity join {} is with a molecule that splits or joins later",
+                      name, proximity_join)
+            if proximity_join[0] in split_products:
+                error("object '{}': proximity join {} is with a molecule split from another molecule",
+                      name, proximity_join)
+        if "proximity_joins" in obj and kind not in ("pdb", "split"):
+            error("object '{}': only molecules can join", name)
+
+        if "joins" in obj:
+            if kind != "pdb":
+                error("object '{}': only molecules from a pdb file can join", name)
+            path_frames = [keyframe[0] for keyframe in obj.get("path", [])]
+            for keyframe in obj["joins"]:
+                if keyframe[0] not in path_frames:
+                    error("object '{}': join at frame {} is not a frame of the path", name, keyframe[0])
+            join_frames = [keyframe[0] for keyframe in obj["joins"]]
+            if len(set(join_frames)) != len(join_frames):
+                error("object '{}': more than one join at the same frame", name)
+
+
+def compile_objects(document):
+    """
+    compile_objects(document)
+
+    Returns the animation data (see get_animation_data in project_main) of a validated animation file.
+    """
+    animation_objects = {}
+    for name, obj in document["objects"].items():
+        if "pdb" in obj:
+            molecule = [True, False, obj["pdb"]]
+        elif "split" in obj:
+            molecule = [True, True, obj["split"]["from"], list(obj["split"]["atoms"])]
+        elif "povray" in obj:
+            molecule = [False] + list(obj["povray"])
+        else:
+            molecule = [False, list(obj["camera"]["location"]), list(obj["camera"]["look_at"])]
+
+        joins = {keyframe[0]: keyframe[1:] for keyframe in obj.get("joins", [])}
+        path = obj.get("path", [])
+        if "camera" in obj:
+            endpos = [[keyframe[1:4], keyframe[4:7]] for keyframe in path]
+        else:
+            # The first keyframe of the path at the frame of a join is the join keyframe
+            endpos = []
+            for keyframe in path:
+                value = keyframe[1:4]
+                if keyframe[0] in joins:
+                    value += ["join", False] + joins.pop(keyframe[0])
+                endpos.append(value)
+
+        data = {"name": name,
+                "molecule": molecule,
+                "keyframe_endpos_frames": [keyframe[0] for keyframe in path],
+                "keyframe_endpos": endpos,
+                "show_name": bool(obj.get("show_name", False)),
+                }
+        if "rotation" in obj:
+            data["keyframe_rotation_frames"] = [keyframe[0] for keyframe in obj["rotation"]]
+            data["keyframe_rotation"] = [[keyframe[1:4], keyframe[4:7]] for keyframe in obj["rotation"]]
+        if "proximity_joins" in obj:
+            data["proximity_joins"] = [list(proximity_join) for proximity_join in obj["proximity_joins"]]
+        if "shown" in obj:
+            data["keyframe_shown_frames"] = [keyframe[0] for keyframe in obj["shown"]]
+            data["keyframe_shown"] = [keyframe[1] for keyframe in obj["shown"]]
+        animation_objects[name] = data
+    return animation_objects
+
+
+def make_document(animation_objects, frames):
+    """
+    make_document(animation_objects, frames)
+
+    Returns the animation file document of animation data (i.e. to write the animations made in
+    Python to a .micdes file). Vapory objects are written as their POV-Ray code.
+    """
+    objects = {}
+    for name, data in animation_objects.items():
+        molecule_data = data["molecule"]
+        obj = {}
+        if name == "camera":
+            obj["camera"] = {"location": list(molecule_data[1]), "look_at": list(molecule_data[2])}
+        elif not molecule_data[0]:
+            obj["povray"] = [str(component) for component in molecule_data[1:]]
+        elif molecule_data[1]:
+            obj["split"] = {"from": molecule_data[2], "atoms": list(molecule_data[3])}
+        else:
+            obj["pdb"] = molecule_data[2]
+
+        path, joins = [], []
+        for frame, value in zip(data["keyframe_endpos_frames"], data["keyframe_endpos"]):
+            if name == "camera":
+                path.append([frame] + list(value[0]) + list(value[1]))
+            else:
+                path.append([frame] + list(value[:3]))
+                if len(value) > 3:
+                    joins.append([frame] + list(value[5:]))
+        if path:
+            obj["path"] = path
+        if joins:
+            obj["joins"] = joins
+        if data.get("keyframe_rotation_frames"):
+            obj["rotation"] = [[frame] + list(axis) + list(radians) for frame, (axis, radians)
+                               in zip(data["keyframe_rotation_frames"], data["keyframe_rotation"])]
+        if data.get("keyframe_shown_frames"):
+            obj["shown"] = [[frame, bool(shown)] for frame, shown
+                            in zip(data["keyframe_shown_frames"], data["keyframe_shown"])]
+        if data.get("proximity_joins"):
+            obj["proximity_joins"] = [[partner, distance] for partner, distance in data["proximity_joins"]]
+        if data.get("show_name"):
+            obj["show_name"] = True
+        objects[name] = obj
+
+    return {"format": "micdes", "version": FORMAT_VERSION, "frames": frames, "objects": objects}
+
+
+def write_animation(file_name, animation_objects, frames):
+    """
+    write_animation(file_name, animation_objects, frames)
+
+    Writes animation data to a .micdes file, one line per object.
+    """
+    document = make_document(animation_objects, frames)
+    lines = ['{{"format": "micdes", "version": {}, "frames": {},'.format(FORMAT_VERSION, frames),
+             ' "objects": {']
+    names = list(document["objects"])
+    for name in names:
+        lines.append("  {}: {}{}".format(json.dumps(name), json.dumps(document["objects"][name]),
+                                          "," if name != names[-1] else ""))
+    lines.append("}}")
+    with open(file_name, "w") as animation_file:
+        animation_file.write("\n".join(lines) + "\n")
+
+
+def _cache_file_name(file_name, source):
+    """ Returns the name of the cache file of the animation file with the source """
+    digest = hashlib.sha1(source + str(CACHE_VERSION).encode()).hexdigest()[:16]
+    folder = os.path.join(os.path.dirname(os.path.abspath(file_name)), CACHE_FOLDER)
+    return os.path.join(folder, "{}.{}.npz".format(os.path.basename(file_name), digest))
+
+
+def _write_cache(cache_file, document, timeline):
+    """ Writes the compiled animation and removes the caches of older versions of the file """
+    folder = os.path.dirname(cache_file)
+    prefix = os.path.basename(cache_file).rsplit(".", 2)[0] + "."
+    try:
+        os.makedirs(folder, exist_ok=True)
+        for old_file in os.listdir(folder):
+            if old_file.startswith(prefix) and old_file.endswith(".npz"):
+                os.remove(os.path.join(folder, old_file))
+
+        # Write to a temporary file first so that other processes never read a partial cache
+        tmp_file = "{}.{}.tmp".format(cache_file, os.getpid())
+        with open(tmp_file, "wb") as cache:
+            np.savez_compressed(cache, document=np.frombuffer(json.dumps(document).encode("utf-8"), dtype=np.uint8),
+                                **timeline.to_arrays())
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # The animation works without a cache (i.e. in a read-only folder)
+        pass
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_vector(values, length):
+    return isinstance(values, list) and len(values) == length and \
+        all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values)
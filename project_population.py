@@ -0,0 +1,146 @@
+"""
+Generates populations of reactions: hundreds or thousands of ethanol -> ethanal -> acetic acid
+reactions made from one reaction template.
+
+The reaction function (see project_animation_data_ethanol_2_acetic_acid) is only called to make the
+template. The frames of a reaction depend linearly on its timing arguments (add_multipliers adds them
+to the frames after a threshold), so the template holds the frames of every keyframe and the timing
+argument each keyframe moves with. The frames of all reactions are then one matrix product of the
+timing of the reactions and the template, the positions of the whole molecules are moved by the
+offset of the reaction. The pdb molecules, rotations and visibility of the template are shared by all
+reactions, only the frames and positions are made per reaction.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import numpy as np
+from project_animation_data_ethanol_2_acetic_acid import get_animation_data as ethanol_2_acetic_acid
+
+# The timing arguments of a reaction, in the column order of the timing arrays
+TIMING = ("start_frame", "ethanol_start_wacht", "ethanol_mid_wacht", "aldh_speed")
+
+# The keyframe frames moved by the timing of a reaction
+FRAME_KEYS = ("keyframe_endpos_frames", "keyframe_rotation_frames", "keyframe_shown_frames")
+
+# Placeholder of the reaction number in the names of the template
+NUMBER = "{num}"
+
+# Frames a timing argument is moved in the template to find the keyframes it moves
+PROBE = 1000
+
+
+# Classes
+class ReactionTemplate():
+    """
+    A reaction of which any number of copies with their own offset and timing can be made.
+    """
+    def __init__(self, reaction=ethanol_2_acetic_acid, **arguments):
+        """
+        Arguments:
+        - (function) reaction: returns the animation data of a reaction, with the arguments
+          num and TIMING (see get_animation_data in project_animation_data_ethanol_2_acetic_acid)
+        - (dict) arguments: the other arguments of the reaction (i.e. sme_pos_ethanol)
+        """
+        timing = dict.fromkeys(TIMING, 0)
+        self.objects = reaction(num=NUMBER, **dict(arguments, **timing))
+
+        # The frames with all timing at 0 and the frames moved by each timing argument
+        probes = [reaction(num=NUMBER, **dict(arguments, **dict(timing, **{argument: PROBE})))
+                  for argument in TIMING]
+        self.keys = [(obj, key) for obj in self.objects for key in FRAME_KEYS if self.objects[obj].get(key)]
+        self.frames = np.concatenate([self.objects[obj][key] for obj, key in self.keys]).astype(np.int64)
+        self.slices = np.cumsum([0] + [len(self.objects[obj][key]) for obj, key in self.keys])
+        moved = [np.concatenate([probe[obj][key] for obj, key in self.keys]) for probe in probes]
+        self.weights = np.array([(frames - self.frames) // PROBE for frames in moved], dtype=np.int64)
+
+        # Whole molecules are moved by the offset of the reaction, split molecules move with their mother
+        self.moved = [obj for obj in self.objects if self.objects[obj]["molecule"][0] and
+                      not self.objects[obj]["molecule"][1]]
+
+    def make_reactions(self, numbers, offsets=None, timing=None):
+        """
+        make_reactions(numbers, [offsets], [timing])
+
+        arguments:
+        - numbers: list of ints, the numbers of the reactions (used in the object names)
+        - offsets: reactions x 3 array, the offset of the positions of every reaction
+        - timing: reactions x TIMING array, the timing arguments of every reaction
+
+        Returns the animation data of the reactions.
+        """
+        count = len(numbers)
+        offsets = np.zeros((count, 3)) if offsets is None else np.asarray(offsets, dtype=float)
+        timing = np.zeros((count, len(TIMING)), dtype=np.int64) if timing is None else \
+            np.asarray(timing, dtype=np.int64)
+        if offsets.shape != (count, 3) or timing.shape != (count, len(TIMING)):
+            raise ValueError("expected {} offsets and timings, got {} and {}".format(
+                count, offsets.shape, timing.shape))
+
+        frames = (self.frames + np.dot(timing, self.weights)).tolist()
+        animation_objects = {}
+        for row, num in enumerate(numbers):
+            names = {}
+            for obj, data in self.objects.items():
+                name = obj.replace(NUMBER, str(num))
+                names[obj] = name
+                animation_objects[name] = dict(data, name=name)
+
+            for index, (obj, key) in enumerate(self.keys):
+                animation_objects[names[obj]][key] = frames[row][self.slices[index]:self.slices[index + 1]]
+
+            offset = offsets[row].tolist()
+            for obj, data in self.objects.items():
+                reaction_object = animation_objects[names[obj]]
+                molecule_data = data["molecule"]
+                if molecule_data[0] and molecule_data[1]:
+                    reaction_object["molecule"] = [True, True, names[molecule_data[2]], molecule_data[3]]
+
+                # Every reaction has its own keyframes with the positions and join partners of the reaction
+                endpos = []
+                for value in data["keyframe_endpos"]:
+                    if obj in self.moved:
+                        value = [value[0] + offset[0], value[1] + offset[1], value[2] + offset[2]] + \
+                                [names.get(partner, partner) for partner in value[3:]]
+                    else:
+                        value = list(value)
+                    endpos.append(value)
+                reaction_object["keyframe_endpos"] = endpos
+        return animation_objects
+
+
+# Functions
+def random_population(count, spread=(40, 50, 30), start_frames=(0, 300), waits=(0, 120), seed=None):
+    """
+    random_population(count, [spread], [start_frames], [waits], [seed])
+
+    arguments:
+    - count: int, the number of reactions
+    - spread: list, the maximum offset of a reaction along x, y and z
+    - start_frames: list, the first and last start frame
+    - waits: list, the minimum and maximum waits of the reactions
+    - seed: int, the seed of the random numbers
+
+    Returns random offsets and timing (see ReactionTemplate.make_reactions) of the reactions.
+    """
+    generator = np.random.default_rng(seed)
+    offsets = generator.uniform(-1, 1, (count, 3)) * np.asarray(spread, dtype=float)
+    timing = np.column_stack((generator.integers(start_frames[0], start_frames[1] + 1, count),
+                              generator.integers(waits[0], waits[1] + 1, (count, len(TIMING) - 1))))
+    return offsets, timing
+
+
+def get_population_data(count, seed=None, show_name=False, **population):
+    """
+    get_population_data(count, [seed], [show_name], [population])
+
+    Returns the animation data of the first reaction of the animation (with the camera and enzymes)
+    and a random population of count reactions, the keyword arguments are given to random_population.
+    """
+    animation_objects = ethanol_2_acetic_acid(show_name=show_name)
+    template = ReactionTemplate(show_name=show_name)
+    offsets, timing = random_population(count, seed=seed, **population)
+    animation_objects.update(template.make_reactions(range(1, count + 1), offsets, timing))
+    return animation_objects
@@ -0,0 +1,202 @@
+"""
+Profiling of the making of frames (not the rendering by POV-Ray).
+
+A FrameProfiler runs the making of selected frames (a list of frames and/or every Nth frame) under
+cProfile and, optionally, tracemalloc. For every profiled frame it writes to the profile folder:
+- <prefix>_frame<step>.prof: the cProfile statistics (i.e. for pstats or snakeviz)
+- <prefix>_frame<step>.collapsed: collapsed stacks for flame graphs (i.e. flamegraph.pl, speedscope)
+- <prefix>_frame<step>.alloc.txt: the lines that allocated the most memory and the peak memory
+
+The profiler is made from the settings in every process that makes frames, so frames made by pool
+workers are profiled in the worker (see AnimationEngine.init_worker).
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import os
+import time
+import argparse
+import logging
+import cProfile
+import pstats
+import tracemalloc
+from pypovray.pypovray import FRAME_DIGITS
+from project_cli import parse_frames
+
+# Number of allocation sites written per frame
+TOP_ALLOCATIONS = 25
+
+# Maximum depth of the collapsed stacks
+MAX_DEPTH = 64
+
+logger = logging.getLogger("profile")
+
+
+# Classes
+class FrameProfiler():
+    """
+    Profiles the making of the selected frames.
+    """
+    def __init__(self, folder, prefix, frames=(), every=0, memory=False, top=TOP_ALLOCATIONS):
+        """
+        Arguments:
+        - (string) folder: the folder of the profiles
+        - (string) prefix: the start of the file names
+        - (iterable) frames: the frames to profile
+        - (int) every: also profile every Nth frame, 0 for none
+        - (bool) memory: trace the memory allocations with tracemalloc
+        - (int) top: the number of allocation sites written per frame
+        """
+        self.folder = folder
+        self.prefix = prefix
+        self.frames = set(frames)
+        self.every = every
+        self.memory = memory
+        self.top = top
+
+    def selects(self, step):
+        """ Returns True if the step is profiled """
+        return step in self.frames or bool(self.every and step % self.every == 0)
+
+    def profile(self, step, function, *args):
+        """
+        profile(step, function, *args)
+
+        arguments:
+        - step: int
+        - function: function, makes the frame
+        - args: the arguments of the function
+
+        Returns the result of the function, the call is profiled if the step is selected.
+        """
+        if not self.selects(step):
+            return function(*args)
+
+        started_tracing = self.memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            result = function(*args)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+
+            os.makedirs(self.folder, exist_ok=True)
+            base = os.path.join(self.folder, "{}_frame{}".format(self.prefix, str(step).zfill(FRAME_DIGITS)))
+            profiler.dump_stats(base + ".prof")
+            write_collapsed(pstats.Stats(profiler), base + ".collapsed")
+
+            peak = 0
+            if self.memory:
+                after = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                write_allocations(before, after, base + ".alloc.txt", peak, self.top)
+                if started_tracing:
+                    tracemalloc.stop()
+
+            logger.info("Profiled step %d in process %d: %.3f s, peak memory %d KiB (%s.*)",
+                        step, os.getpid(), elapsed, peak // 1024, base)
+        return result
+
+
+# Functions
+def make_frame_profiler(settings):
+    """
+    make_frame_profiler(settings)
+
+    Returns the FrameProfiler of the profile settings (ProfileFrames, ProfileEvery, ProfileMemory and
+    ProfileDir) or None if no frames are profiled. Invalid frames raise a ValueError.
+    """
+    try:
+        frames = parse_frames(settings.ProfileFrames) if settings.ProfileFrames.strip() else []
+    except argparse.ArgumentTypeError as error:
+        raise ValueError("ProfileFrames: {}".format(error))
+    if not frames and not settings.ProfileEvery:
+        return None
+    return FrameProfiler(settings.ProfileDir, settings.OutputPrefix, frames, settings.ProfileEvery,
+                         settings.ProfileMemory)
+
+
+def write_collapsed(stats, file_name):
+    """
+    write_collapsed(stats, file_name)
+
+    arguments:
+    - stats: pstats.Stats
+    - file_name: string
+
+    Writes the collapsed stacks ("caller;callee;... microseconds") of the profile. cProfile only keeps
+    the calls between two functions, the time of a function is divided over its callers in
+    proportion to the time spent in the function for each caller.
+    """
+    callees = {}
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((function, cumulative))
+
+    lines = {}
+
+    def walk(function, path, fraction):
+        own_time = stats.stats[function][2]
+        path = path + [_frame_name(function)]
+        stack = ";".join(path)
+        lines[stack] = lines.get(stack, 0) + own_time * fraction
+        if len(path) >= MAX_DEPTH:
+            return
+        for callee, edge_time in callees.get(function, ()):
+            # Recursive calls are counted in the caller
+            if _frame_name(callee) in path or not stats.stats[callee][3]:
+                continue
+            walk(callee, path, fraction * min(edge_time / stats.stats[callee][3], 1.0))
+
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        if not callers:
+            walk(function, [], 1.0)
+
+    with open(file_name, "w") as collapsed:
+        for stack, seconds in sorted(lines.items()):
+            microseconds = int(round(seconds * 1e6))
+            if microseconds:
+                collapsed.write("{} {}\n".format(stack, microseconds))
+
+
+def write_allocations(before, after, file_name, peak, top=TOP_ALLOCATIONS):
+    """
+    write_allocations(before, after, file_name, peak, [top])
+
+    arguments:
+    - before: tracemalloc.Snapshot, taken before the frame
+    - after: tracemalloc.Snapshot, taken after the frame
+    - file_name: string
+    - peak: int, the peak traced memory during the frame
+    - top: int
+
+    Writes the lines that allocated the most memory during the frame.
+    """
+    ignored = [tracemalloc.Filter(False, tracemalloc.__file__),
+               tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+    differences = after.filter_traces(ignored).compare_to(before.filter_traces(ignored), "lineno")
+    with open(file_name, "w") as allocations:
+        allocations.write("peak traced memory: {} KiB\n".format(peak // 1024))
+        allocations.write("top {} allocation sites (size difference, count difference):\n".format(top))
+        for difference in differences[:top]:
+            allocations.write("{}\n".format(difference))
+
+
+def _frame_name(function):
+    """ Returns the name of a pstats function (file, line, name) in a collapsed stack """
+    file_name, line, name = function
+    if file_name == "~":
+        # Built-in functions
+        return name
+    return "{}:{}:{}".format(os.path.basename(file_name), name, line)
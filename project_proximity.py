@@ -0,0 +1,250 @@
+"""
+Proximity of the molecules: a spatial hash (uniform grid) over the atoms of the shown molecules.
+
+Every atom is put in the cell of the grid it is in, a query only compares the atoms in the cells
+around the searched atoms, so finding the neighbours of a molecule does not depend on the number of
+molecules in the scene. The grid is updated incrementally: only molecules that were placed again
+(see AnimationEngine.place_molecule) since the last frame are hashed again.
+
+A ProximityMonitor keeps the grid of an engine (see AnimationEngine.check_proximity) and finds:
+- proximity joins: a molecule joins a partner the first frame their atoms come within the join
+  distance, instead of at a keyframe ("proximity_joins" in the animation data)
+- overlaps: molecules of which atoms are closer than the overlap distance (OverlapDistance setting)
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import numpy as np
+
+# Cells are packed in an int64 key of 21 bits per axis, the offset makes negative cells positive
+CELL_BITS = 21
+CELL_OFFSET = 1 << (CELL_BITS - 1)
+
+# Cell size of a monitor without a cell size: the largest join or overlap distance, at least
+MIN_CELL_SIZE = 1.0
+
+
+# Classes
+class SpatialHash():
+    """
+    A uniform grid of the atoms of named molecules.
+    """
+    def __init__(self, cell_size):
+        """
+        Arguments:
+        - (float) cell_size: the size of the cells, about the distance of the queries
+        """
+        if cell_size <= 0:
+            raise ValueError("the cell size should be positive, not {}".format(cell_size))
+        self.cell_size = float(cell_size)
+        # Names of the molecules with atoms in every (packed) cell
+        self.cells = {}
+        # Cells, coordinates and placement (token) of every molecule
+        self.keys = {}
+        self.coordinates = {}
+        self.tokens = {}
+
+    def __contains__(self, name):
+        return name in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def cell_keys(self, coordinates):
+        """ Returns the packed cell of every coordinate """
+        cells = np.floor(np.asarray(coordinates, dtype=float) / self.cell_size).astype(np.int64) + CELL_OFFSET
+        return (cells[:, 0] << (2 * CELL_BITS)) | (cells[:, 1] << CELL_BITS) | cells[:, 2]
+
+    def update(self, name, coordinates, token=None):
+        """
+        update(name, coordinates, [token])
+
+        arguments:
+        - name: string
+        - coordinates: atoms x 3 array
+        - token: the placement of the molecule, molecules with the same token are not hashed again
+
+        Puts the atoms of the molecule in the grid, returns True if the molecule was hashed again.
+        """
+        if token is not None and self.tokens.get(name) == token:
+            return False
+        self.remove(name)
+
+        coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 3)
+        keys = np.unique(self.cell_keys(coordinates))
+        for key in keys.tolist():
+            self.cells.setdefault(key, set()).add(name)
+        self.keys[name] = keys
+        self.coordinates[name] = coordinates
+        self.tokens[name] = token
+        return True
+
+    def remove(self, name):
+        """ Removes the molecule from the grid """
+        keys = self.keys.pop(name, None)
+        if keys is None:
+            return
+        for key in keys.tolist():
+            names = self.cells[key]
+            names.discard(name)
+            if not names:
+                del self.cells[key]
+        del self.coordinates[name]
+        del self.tokens[name]
+
+    def clear(self):
+        """ Removes all molecules """
+        for name in list(self.keys):
+            self.remove(name)
+
+    def query(self, coordinates, radius):
+        """
+        query(coordinates, radius)
+
+        arguments:
+        - coordinates: points x 3 array
+        - radius: float
+
+        Returns the names of the molecules with an atom within the radius of any of the points.
+        """
+        coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 3)
+        if not len(coordinates):
+            return set()
+
+        # All cells within the radius of the cells of the points
+        ring = np.arange(-int(np.ceil(radius / self.cell_size)), int(np.ceil(radius / self.cell_size)) + 1)
+        offsets = (ring[:, None, None] << (2 * CELL_BITS)) + (ring[None, :, None] << CELL_BITS) + ring[None, None, :]
+        keys = np.unique(np.unique(self.cell_keys(coordinates))[:, None] + offsets.ravel())
+
+        candidates = set()
+        for key in keys.tolist():
+            candidates.update(self.cells.get(key, ()))
+
+        found = set()
+        for name in candidates:
+            distances = np.linalg.norm(coordinates[:, None] - self.coordinates[name][None], axis=-1)
+            if distances.min() <= radius:
+                found.add(name)
+        return found
+
+    def neighbors(self, name, radius):
+        """ Returns the names of the other molecules with an atom within the radius of the molecule """
+        return self.query(self.coordinates[name], radius) - {name}
+
+    def contacts(self, radius):
+        """ Returns the sorted pairs of molecules with atoms within the radius of each other """
+        return sorted((name, other) for name in self.keys for other in self.neighbors(name, radius)
+                      if name < other)
+
+
+class ProximityMonitor():
+    """
+    The spatial hash of the shown molecules of an engine with the proximity joins and overlaps.
+    """
+    def __init__(self, rules=(), cell_size=0, overlap_distance=0):
+        """
+        Arguments:
+        - (list) rules: (object, partner, distance) of every proximity join
+        - (float) cell_size: the size of the cells, by default the largest distance
+        - (float) overlap_distance: atoms of different molecules closer than the distance overlap,
+          0 does not look for overlaps
+        """
+        self.rules = [(obj, partner, float(distance)) for obj, partner, distance in rules]
+        self.overlap_distance = float(overlap_distance)
+        if not cell_size:
+            cell_size = max([MIN_CELL_SIZE, self.overlap_distance] + [rule[2] for rule in self.rules])
+        self.grid = SpatialHash(cell_size)
+        # The joins done and the step of every join once it has been found
+        self.done = [False] * len(self.rules)
+        self.steps = [None] * len(self.rules)
+        self.overlapping = []
+
+    def __getstate__(self):
+        # The grid is made again from the molecules of the engine
+        state = self.__dict__.copy()
+        state["grid"] = SpatialHash(self.grid.cell_size)
+        return state
+
+    def reset(self):
+        """ Empties the grid and marks the joins as not done, the found steps are kept """
+        self.grid.clear()
+        self.done = [False] * len(self.rules)
+        self.overlapping = []
+
+    def update(self, states):
+        """
+        update(states)
+
+        arguments:
+        - states: dict, the molecule state (see make_molecule_state) of every shown molecule
+
+        Puts the molecules in the grid and removes the molecules that are no longer shown. Molecules
+        that were not placed again since the last update are skipped without getting their coordinates.
+        """
+        for name in [name for name in self.grid.keys if name not in states]:
+            self.grid.remove(name)
+        for name, state in states.items():
+            if state["placed"] is not None and self.grid.tokens.get(name) == state["placed"]:
+                continue
+            self.grid.update(name, state["molecule"].get_coordinates(), state["placed"])
+
+    def triggered(self):
+        """ Returns the rules (index) of the joins that are not done and of which the molecules are close """
+        return [index for index, (obj, partner, distance) in enumerate(self.rules)
+                if not self.done[index] and obj in self.grid and partner in self.grid and
+                partner in self.grid.neighbors(obj, distance)]
+
+    def overlaps(self):
+        """ Returns the pairs of overlapping molecules, none if the overlap distance is 0 """
+        self.overlapping = self.grid.contacts(self.overlap_distance) if self.overlap_distance else []
+        return self.overlapping
+
+    def event_steps(self):
+        """ Returns the steps of the joins found so far """
+        return [step for step in self.steps if step is not None]
+
+
+# Functions
+def make_proximity_monitor(animation_objects, cell_size=0, overlap_distance=0):
+    """
+    make_proximity_monitor(animation_objects, [cell_size], [overlap_distance])
+
+    arguments:
+    - animation_objects: dict (see get_animation_data in project_main)
+    - cell_size: float, the size of the cells, by default the largest distance
+    - overlap_distance: float, 0 does not look for overlaps
+
+    Returns a ProximityMonitor of the proximity joins of the animation data, or None if there are no
+    proximity joins and no overlap distance. Raises a ValueError if a join is not between molecules or
+    if the partner is still needed after it joined: the mother of a split, the partner of a keyframe
+    join or a molecule split from another molecule (the split schedule would split it again).
+    """
+    # The partner is removed by the join, so it can not split, be split or join at a keyframe later
+    mothers = {data["molecule"][2] for data in animation_objects.values()
+               if data["molecule"][0] and data["molecule"][1]}
+    split_products = {obj for obj, data in animation_objects.items()
+                      if data["molecule"][0] and data["molecule"][1]}
+    join_partners = {partner for data in animation_objects.values() for value in data.get("keyframe_endpos", ())
+                     if len(value) > 3 and value[3] for partner in value[5:]}
+
+    rules = []
+    for obj, data in animation_objects.items():
+        for partner, distance in data.get("proximity_joins", ()):
+            for name in (obj, partner):
+                if name not in animation_objects or not animation_objects[name]["molecule"][0]:
+                    raise ValueError("proximity join of {} and {}: {} is not a molecule".format(obj, partner, name))
+            if partner in mothers:
+                raise ValueError("proximity join of {} and {}: {} is split later".format(obj, partner, partner))
+            if partner in join_partners:
+                raise ValueError("proximity join of {} and {}: {} joins at a keyframe".format(obj, partner, partner))
+            if partner in split_products:
+                raise ValueError("proximity join of {} and {}: {} is split from a molecule".format(
+                    obj, partner, partner))
+            rules.append((obj, partner, distance))
+
+    if not rules and not overlap_distance:
+        return None
+    return ProximityMonitor(rules, cell_size, overlap_distance)
@@ -1,79 +1,110 @@
-"""
-Sorts the aninimation_data with the split molecule data sorted so there will be no errors.
-This module sorts the split molecule atom number in order for the split ca. high to low.
-
-This module only supports only single atom splits
-"""
-
-__author__ = "Micha Beens, Des Beekhuis"
-
-__version__ = "1.0.0"
-
-# Imports
-
-# Funtions
-def sort_molecules(animation_objects):
-    """
-    Sorts the animaion objects so that there are no split errors happen
-    """
-    sorted_animation_objects = []
-
-    special_object_list = []
-
-    for obj in animation_objects:
-        molecule_data = animation_objects[obj]["molecule"]
-        if molecule_data[0] and molecule_data[1]:
-            # Molecuels that have to be created bij spliting bigger molecules
-            molecule_name = obj
-            mother_molecule = animation_objects[obj]["molecule"][2]
-            split_atom = animation_objects[obj]["molecule"][3]
-            special_object_list.append([molecule_name, mother_molecule, split_atom])
-        else:
-            # Objects that do not need to be split
-            sorted_animation_objects.append(obj)
-
-    # Get a list of mother molecules from the special object list
-    mother_list = list({special_object_list[index][1]
-                        for index in range(len(special_object_list))})
-
-    for mother in mother_list:
-        high_2_low = get_highest(mother, special_object_list, [])
-        print("SORTED {}: {}".format(mother, high_2_low))
-        for obj in high_2_low:
-            if not obj in sorted_animation_objects:
-                sorted_animation_objects.append(obj)
-
-    # Print objects in sorter for debugging
-    for obj in sorted_animation_objects:
-        #print("DEBUG:", obj)
-        pass
-
-    return sorted_animation_objects
-
-
-def get_highest(mother, object_list, high_2_low):
-    """outputs a list from high to low"""
-    highest = -1
-    highest_molecule = ""
-    for obj in object_list:
-        if obj[1] == mother and obj[2][0] > highest:
-            highest = obj[2][0]
-            highest_molecule = obj[0]
-
-    high_2_low.append(highest_molecule)
-    object_list.pop(object_list.index([highest_molecule, mother, [highest]]))
-
-    if is_mother_in_list(mother, object_list):
-        get_highest(mother, object_list, high_2_low)
-
-    return  high_2_low
-
-
-def is_mother_in_list(mother, object_list):
-    """Outputs a bool to see if there are objects with te same mother"""
-    output = False
-    for obj in object_list:
-        if mother in obj:
-            output = True
-            break
-    return output
+"""
+Orders the splits of the molecules so there will be no errors: the molecules split from a mother
+molecule are split from the highest atom number to the lowest (make_split_graph). The split schedule
+(make_split_schedule) supports splits of multiple atoms and splits of split molecules.
+"""
+
+__author__ = "Micha Beens, Des Beekhuis"
+
+__version__ = "1.0.0"
+
+# Imports
+from bisect import bisect_right
+
+# Funtions
+def make_split_graph(animation_objects):
+    """
+    Returns a dict with for every mother molecule the molecules split from it,
+    the molecule with the highest atom number first.
+    """
+    split_graph = {}
+    for obj in animation_objects:
+        molecule_data = animation_objects[obj]["molecule"]
+        if molecule_data[0] and molecule_data[1]:
+            split_graph.setdefault(molecule_data[2], []).append(obj)
+
+    for mother in split_graph:
+        split_graph[mother].sort(key=lambda obj: max(animation_objects[obj]["molecule"][3]), reverse=True)
+    return split_graph
+
+
+def make_split_schedule(animation_objects, first_step=0):
+    """
+    Returns the split events as a SplitSchedule. A molecule is split in the first step at or after
+    its first keyframe (but not before first_step).
+
+    The splits are ordered by step, split molecules are split after their mother is split and the
+    splits of a mother in the same step go from the highest to the lowest atom number. The atom
+    numbers are corrected for the atoms split off before in the same step, so the atom numbers
+    of every split refer to the mother at the start of the step.
+    """
+    split_graph = make_split_graph(animation_objects)
+
+    def split_step(obj):
+        return max(animation_objects[obj]["keyframe_endpos_frames"][0], first_step)
+
+    # Depth of a split molecule in the graph (molecules split from a pdb molecule have depth 1)
+    depth = {}
+
+    def get_depth(obj, path=()):
+        if obj in path:
+            raise ValueError("the split molecules {} split from each other".format(", ".join(path)))
+        if obj not in depth:
+            molecule_data = animation_objects[obj]["molecule"]
+            depth[obj] = get_depth(molecule_data[2], path + (obj,)) + 1 if molecule_data[1] else 0
+        return depth[obj]
+
+    events = []
+    for mother in split_graph:
+        for rank, obj in enumerate(split_graph[mother]):
+            mother_data = animation_objects[mother]["molecule"]
+            if mother_data[1] and split_step(mother) > split_step(obj):
+                raise ValueError("{} is split from {} before {} exists".format(obj, mother, mother))
+            events.append((split_step(obj), get_depth(obj), mother, rank, obj))
+    events.sort()
+
+    schedule = SplitSchedule()
+    removed = {}
+    for step, _, mother, _, obj in events:
+        atoms = animation_objects[obj]["molecule"][3]
+        done = removed.setdefault((step, mother), [])
+        if set(atoms) & set(done):
+            raise ValueError("{} splits atoms from {} that are already split".format(obj, mother))
+        # Atom numbers after removing the atoms split before in the same step
+        schedule.add(step, obj, mother, [atom - sum(1 for other in done if other < atom) for atom in atoms])
+        done.extend(atoms)
+    return schedule
+
+
+class SplitSchedule():
+    """
+    The split events in the order they have to happen.
+    """
+    __slots__ = ("steps", "molecules", "mothers", "atoms")
+
+    def __init__(self):
+        self.steps = []
+        self.molecules = []
+        self.mothers = []
+        self.atoms = []
+
+    def add(self, step, obj, mother, atoms):
+        self.steps.append(step)
+        self.molecules.append(obj)
+        self.mothers.append(mother)
+        self.atoms.append(atoms)
+
+    def due(self, step, is_split):
+        """
+        Returns the indexes of the splits at or before the step that did not happen yet.
+        is_split(obj) tells if a molecule is already split, as splits happen in order only the
+        splits after the last split that happened are checked.
+        """
+        end = bisect_right(self.steps, step)
+        start = end
+        while start > 0 and not is_split(self.molecules[start-1]):
+            start -= 1
+        return range(start, end)
+
+    def __len__(self):
+        return len(self.steps)
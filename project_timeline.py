@@ -0,0 +1,407 @@
+"""
+Compiles the keyframes of the animation objects into a Timeline that gives the state of every object
+at any step of the animation.
+
+The keyframe tracks of all objects are sorted and searched together with NumPy. The Timeline keeps
+the keyframes of:
+- positions (molecules, split molecules as offset from their split position)
+- rotations, with the orientation at the start of every rotation keyframe
+- the location and look_at of the camera
+and the steps every object is visible. The positions and orientations of all objects at a step (a
+row) are evaluated from the keyframes when the step is made, so the memory of a Timeline grows with
+the number of keyframes and not with the number of frames times the number of objects.
+
+Building a frame then only needs a row, the last evaluated row is kept.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import numpy as np
+
+# Rotations are done around the axis [1, 1, 1] (see rotate_objects) so the rotation vector of a
+# step is the radians divided by the length of that axis
+AXIS_LENGTH = np.sqrt(3)
+
+# The keyframe tracks of a Timeline (see KeyframeTracks) and the arrays saved of every group
+TRACK_GROUPS = ("positions", "offsets", "rotations", "camera")
+TRACK_ARRAYS = ("columns", "frames", "lengths", "values")
+
+
+# Classes
+class KeyframeTracks():
+    """
+    The sorted keyframes of a group of objects, searched for all objects at once.
+    """
+    def __init__(self, columns, frames, lengths, values, steps):
+        """
+        Arguments:
+        - (array) columns: the timeline column of every track
+        - (array) frames: the sorted keyframe frames of all tracks after each other
+        - (array) lengths: the number of keyframes of every track
+        - (array) values: the value of every keyframe, in the order of the frames
+        - (array) steps: the steps of the timeline
+        """
+        self.columns = np.asarray(columns, dtype=np.int64)
+        self.frames = np.asarray(frames, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.values = np.asarray(values, dtype=float)
+        self.starts = np.concatenate(([0], np.cumsum(self.lengths)[:-1])).astype(np.int64)
+        # Sum of the values up to every keyframe, for tracks of offsets (see _interpolate)
+        self.total = np.cumsum(self.values, axis=0)
+
+        # Shift every track to its own range, so a single sorted search finds the keyframes of all tracks
+        self.low = min(self.frames.min(), steps[0])
+        self.span = max(self.frames.max(), steps[-1]) - self.low + 1
+        self.keys = np.repeat(np.arange(len(self.lengths)) * self.span, self.lengths) + self.frames - self.low
+
+    def __len__(self):
+        return len(self.lengths)
+
+    @classmethod
+    def from_tracks(cls, columns, tracks, values, steps):
+        """
+        Returns the KeyframeTracks of a list with the sorted keyframe frames of every track.
+        """
+        lengths = [len(frames) for frames in tracks]
+        frames = np.concatenate([np.asarray(frames, dtype=np.int64) for frames in tracks])
+        return cls(columns, frames, lengths, values, steps)
+
+    def segments(self, steps):
+        """
+        segments(steps)
+
+        arguments:
+        - steps: array
+
+        Returns a steps x tracks array with for every step the index of the first keyframe at or after
+        the step (0 before the track starts and the number of keyframes after the last keyframe).
+        """
+        queries = np.arange(len(self.lengths)) * self.span + (np.asarray(steps)[:, None] - self.low)
+        return np.searchsorted(self.keys, queries, side="left") - self.starts
+
+    def to_arrays(self, group):
+        """ Returns the arrays of the tracks, named after the group """
+        return {"{}_{}".format(group, name): getattr(self, name) for name in TRACK_ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays, group, steps):
+        """ Returns the tracks of the group in the arrays made by to_arrays, None without the group """
+        if "{}_frames".format(group) not in arrays:
+            return None
+        return cls(*[arrays["{}_{}".format(group, name)] for name in TRACK_ARRAYS], steps=steps)
+
+
+class Timeline():
+    """
+    The compiled animation for a range of steps.
+    """
+    def __init__(self, names, steps):
+        """
+        Arguments:
+        - (list) names: the names of the animation objects, in column order
+        - (array) steps: the steps of the rows
+        """
+        self.names = list(names)
+        self.steps = steps
+        self.columns = {name: column for column, name in enumerate(self.names)}
+
+        # The keyframe tracks of the positions, the offsets of split molecules, the rotations and
+        # the camera, None if no object has the keyframes
+        self.positions = None
+        self.offsets = None
+        self.rotations = None
+        self.camera = None
+        # Split molecules are positioned relative to the center they had when split
+        self.relative = np.zeros(len(self.names), dtype=bool)
+        # The orientation at the start of every rotation keyframe and after the last keyframe of
+        # every rotation track
+        self.segment_orientation = np.zeros((0, 3, 3))
+        self.final_orientation = np.zeros((0, 3, 3))
+        # The first and last step every object is visible
+        self.shown_from = np.full(len(self.names), np.iinfo(np.int64).min, dtype=np.int64)
+        self.shown_until = np.full(len(self.names), np.iinfo(np.int64).max, dtype=np.int64)
+        # The step and the positions, orientations and camera of the last evaluated row
+        self.cached_row = None
+
+    def __getstate__(self):
+        # The evaluated row is made again when needed
+        state = self.__dict__.copy()
+        state["cached_row"] = None
+        return state
+
+    def row(self, step):
+        """
+        Returns the row of the step, raises an IndexError if the step is not in the timeline.
+        """
+        row = step - self.steps[0]
+        if not 0 <= row < len(self.steps):
+            raise IndexError("step {} is not in the timeline".format(step))
+        return row
+
+    def evaluate(self, step):
+        """
+        evaluate(step)
+
+        arguments:
+        - step: int
+
+        Returns the positions (NaN for objects that are not moved), orientations and camera (location
+        and look_at, None without a camera) of all objects at the step. The last row is kept, the
+        returned arrays should not be changed.
+        """
+        cached_row = self.cached_row
+        if cached_row is not None and cached_row[0] == step:
+            return cached_row[1]
+        self.row(step)
+        steps = np.array([step], dtype=np.int64)
+
+        position = np.full((len(self.names), 3), np.nan)
+        for tracks, offsets in ((self.positions, False), (self.offsets, True)):
+            if tracks is not None:
+                position[tracks.columns] = _interpolate(tracks, tracks.segments(steps), steps, offsets)[0]
+
+        orientation = np.tile(np.eye(3), (len(self.names), 1, 1))
+        if self.rotations is not None:
+            orientation[self.rotations.columns] = self._orientations(steps)[0]
+
+        camera = None
+        if self.camera is not None:
+            values = _interpolate(self.camera, self.camera.segments(steps), steps)[0, 0]
+            camera = [values[:3], values[3:]]
+
+        evaluated = (position, orientation, camera)
+        self.cached_row = (step, evaluated)
+        return evaluated
+
+    def _orientations(self, steps):
+        """
+        Returns a steps x rotation tracks array of the orientations of the rotating objects.
+        An object rotates with a constant speed between two rotation keyframes.
+        """
+        tracks = self.rotations
+        index = tracks.segments(steps)
+        end = tracks.starts + np.clip(index, 0, tracks.lengths - 1)
+        begin = tracks.starts + np.clip(index - 1, 0, tracks.lengths - 1)
+        in_range = (index > 0) & (index < tracks.lengths)
+
+        time = np.where(in_range, tracks.frames[end] - tracks.frames[begin], 1)[..., None]
+        rotation = np.where(in_range[..., None], tracks.values[end] / time, 0)
+
+        # Steps rotated so far in the segment of each step
+        count = steps[:, None] - np.maximum(tracks.frames[begin], self.steps[0] - 1)
+        inside = _rodrigues(rotation / AXIS_LENGTH * count[..., None])
+        oriented = np.matmul(inside, self.segment_orientation[end])
+
+        # Not rotated before the first keyframe and the final orientation after the last keyframe
+        orientation = np.tile(np.eye(3), index.shape + (1, 1))
+        after = index == tracks.lengths
+        orientation[after] = np.broadcast_to(self.final_orientation, orientation.shape)[after]
+        orientation[in_range] = oriented[in_range]
+        return orientation
+
+    def position_at(self, obj, step):
+        return self.evaluate(step)[0][self.columns[obj]]
+
+    def orientation_at(self, obj, step):
+        return self.evaluate(step)[1][self.columns[obj]]
+
+    def visible_at(self, obj, step):
+        self.row(step)
+        column = self.columns[obj]
+        return self.shown_from[column] <= step <= self.shown_until[column]
+
+    def camera_at(self, step):
+        return self.evaluate(step)[2]
+
+    def __len__(self):
+        return len(self.steps)
+
+    def to_arrays(self):
+        """
+        Returns the timeline as a dict of arrays (i.e. to save it with numpy.savez).
+        """
+        arrays = {"names": np.array(self.names), "steps": np.asarray(self.steps), "relative": self.relative,
+                  "segment_orientation": self.segment_orientation, "final_orientation": self.final_orientation,
+                  "shown_from": self.shown_from, "shown_until": self.shown_until}
+        for group in TRACK_GROUPS:
+            tracks = getattr(self, group)
+            if tracks is not None:
+                arrays.update(tracks.to_arrays(group))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Returns the timeline of the arrays made by to_arrays.
+        """
+        timeline = cls([str(name) for name in arrays["names"]], arrays["steps"])
+        for attribute in ("relative", "segment_orientation", "final_orientation", "shown_from", "shown_until"):
+            setattr(timeline, attribute, arrays[attribute])
+        for group in TRACK_GROUPS:
+            setattr(timeline, group, KeyframeTracks.from_arrays(arrays, group, timeline.steps))
+        return timeline
+
+
+# Functions
+def compile_timeline(animation_objects, steps):
+    """
+    compile_timeline(animation_objects, steps)
+
+    arguments:
+    - animation_objects: dict (see get_animation_data in project_main)
+    - steps: int or range, the steps of the animation (a range with step size 1)
+
+    Sorts the keyframes of all objects and returns a Timeline that evaluates them for the steps.
+    """
+    if isinstance(steps, int):
+        steps = range(steps)
+    steps = np.arange(steps.start, steps.stop)
+    timeline = Timeline(animation_objects, steps)
+
+    molecules = [obj for obj in timeline.names if animation_objects[obj]["molecule"][0]]
+    split = [obj for obj in molecules if animation_objects[obj]["molecule"][1]]
+    whole = [obj for obj in molecules if not animation_objects[obj]["molecule"][1]]
+
+    # Positions of whole molecules are interpolated between the keyframe positions
+    timeline.positions = _compile_positions(timeline, animation_objects, whole)
+
+    # Split molecules have keyframes with offsets that add up
+    timeline.offsets = _compile_positions(timeline, animation_objects, split)
+    timeline.relative[[timeline.columns[obj] for obj in split]] = True
+
+    _compile_rotations(timeline, animation_objects,
+                       [obj for obj in timeline.names
+                        if animation_objects[obj].get("keyframe_rotation_frames")])
+
+    _compile_visibility(timeline, animation_objects, split)
+
+    if "camera" in animation_objects:
+        _compile_camera(timeline, animation_objects["camera"])
+
+    return timeline
+
+
+def _keyframes(data, frames_key, values_key):
+    """ Returns the keyframe frames and values of an object sorted by frame """
+    keyframes = sorted(zip(data[frames_key], data[values_key]), key=lambda keyframe: keyframe[0])
+    return [frame for frame, _ in keyframes], [value for _, value in keyframes]
+
+
+def _interpolate(tracks, index, steps, offsets=False):
+    """
+    Linear interpolation of the values of the tracks (KeyframeTracks) between the keyframes, index
+    is the steps x tracks array of the segments of the steps (see KeyframeTracks.segments).
+    If offsets is true the values are relative to the previous keyframe.
+    """
+    frames, starts, lengths, values = tracks.frames, tracks.starts, tracks.lengths, tracks.values
+    # Indexes of the keyframes that start and end the segment of every step
+    end = starts + np.clip(index, 0, lengths - 1)
+    begin = starts + np.clip(index - 1, 0, lengths - 1)
+    in_range = (index > 0) & (index < lengths)
+
+    time = np.where(in_range, frames[end] - frames[begin], 1)[..., None]
+    passed = (steps[:, None] - frames[begin])[..., None]
+
+    if offsets:
+        # Sum of the offsets of all keyframes before the segment
+        prefix = np.concatenate((np.zeros((1, values.shape[1])), tracks.total))[starts]
+        before = tracks.total[begin] - prefix
+        result = before + values[end] / time * passed
+        # No movement before the track starts and all offsets after the last keyframe
+        result = np.where((index == 0)[..., None], 0, result)
+        return np.where((index == lengths)[..., None], before, result)
+
+    start = values[begin]
+    result = start + (values[end] - start) / time * passed
+    return np.where(in_range[..., None], result, values[end])
+
+
+def _compile_positions(timeline, animation_objects, objects):
+    """ Returns the tracks of the positions of the molecules (the offsets of split molecules), None without molecules """
+    if not objects:
+        return None
+    keyframes = [_keyframes(animation_objects[obj], "keyframe_endpos_frames", "keyframe_endpos")
+                 for obj in objects]
+    tracks = [frames for frames, _ in keyframes]
+    values = np.array([value[:3] for _, track in keyframes for value in track], dtype=float)
+    return KeyframeTracks.from_tracks([timeline.columns[obj] for obj in objects], tracks, values, timeline.steps)
+
+
+def _compile_rotations(timeline, animation_objects, objects):
+    """
+    Makes the tracks of the rotating objects and the orientation at the start of every rotation
+    keyframe. An object rotates with a constant speed between two rotation keyframes.
+    """
+    if not objects:
+        return
+    keyframes = [_keyframes(animation_objects[obj], "keyframe_rotation_frames", "keyframe_rotation")
+                 for obj in objects]
+    values = np.array([value[1] for _, track in keyframes for value in track], dtype=float)
+    tracks = KeyframeTracks.from_tracks([timeline.columns[obj] for obj in objects],
+                                        [frames for frames, _ in keyframes], values, timeline.steps)
+    frames, starts, lengths = tracks.frames, tracks.starts, tracks.lengths
+    steps = timeline.steps
+
+    # The rotation of every complete segment (keyframe - 1, keyframe] within the timeline
+    previous = np.concatenate(([0], frames[:-1]))
+    count = np.clip(np.minimum(frames, steps[-1]) - np.maximum(previous, steps[0] - 1), 0, None)
+    count[starts] = 0
+    duration = np.where(count > 0, frames - previous, 1)[:, None]
+    segments = _rodrigues(values / duration / AXIS_LENGTH * count[:, None])
+
+    # The orientation at the start of every segment, the (few) segments are combined in order
+    segment_start = np.tile(np.eye(3), (len(frames), 1, 1))
+    final = np.tile(np.eye(3), (len(tracks), 1, 1))
+    for track, (start, length) in enumerate(zip(starts, lengths)):
+        orientation = np.eye(3)
+        for keyframe in range(start + 1, start + length):
+            segment_start[keyframe] = orientation
+            orientation = np.dot(segments[keyframe], orientation)
+        # Orientation after the last keyframe
+        final[track] = orientation
+
+    timeline.rotations = tracks
+    timeline.segment_orientation = segment_start
+    timeline.final_orientation = final
+
+
+def _rodrigues(vectors):
+    """ Returns the rotation matrices of an array of rotation vectors (Rodrigues' formula) """
+    vectors = np.asarray(vectors, dtype=float)
+    angle = np.linalg.norm(vectors, axis=-1)
+    axis = vectors / np.where(angle == 0, 1, angle)[..., None]
+
+    # Cross product matrices of the axes
+    K = np.zeros(vectors.shape[:-1] + (3, 3))
+    K[..., 0, 1], K[..., 0, 2] = -axis[..., 2], axis[..., 1]
+    K[..., 1, 0], K[..., 1, 2] = axis[..., 2], -axis[..., 0]
+    K[..., 2, 0], K[..., 2, 1] = -axis[..., 1], axis[..., 0]
+
+    sin = np.sin(angle)[..., None, None]
+    cos = (1 - np.cos(angle))[..., None, None]
+    return np.eye(3) + sin * K + cos * np.matmul(K, K)
+
+
+def _compile_visibility(timeline, animation_objects, split):
+    """
+    Objects are shown up to their first shown keyframe and afterwards when any keyframe shows them.
+    Split molecules only exist from their first keyframe on.
+    """
+    for obj in timeline.names:
+        column = timeline.columns[obj]
+        shown_frames = animation_objects[obj].get("keyframe_shown_frames")
+        if shown_frames:
+            if not any(animation_objects[obj]["keyframe_shown"]):
+                timeline.shown_until[column] = min(shown_frames)
+        if obj in split:
+            timeline.shown_from[column] = min(animation_objects[obj]["keyframe_endpos_frames"])
+
+
+def _compile_camera(timeline, camera):
+    """ Makes the track of the location and look_at of the camera """
+    frames, keyframes = _keyframes(camera, "keyframe_endpos_frames", "keyframe_endpos")
+    values = np.array([value[0][:3] + value[1][:3] for value in keyframes], dtype=float)
+    timeline.camera = KeyframeTracks.from_tracks([timeline.columns["camera"]], [frames], values, timeline.steps)
@@ -0,0 +1,145 @@
+"""
+Tracing of the animation: messages per category (frame, move, rotate, shown, join, split, proximity)
+that are only formatted when the category is turned on and its level is logged, and counters per frame
+of the objects moved, rotated, joined, split and culled (not shown) and the overlapping molecules
+that are reported at the end.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import logging
+from contextlib import contextmanager
+import numpy as np
+
+# The categories that can be traced
+CATEGORIES = ("frame", "move", "rotate", "shown", "join", "split", "proximity")
+
+# The counters kept per frame
+COUNTERS = ("moved", "rotated", "joined", "split", "culled", "overlaps")
+
+logger = logging.getLogger("animation")
+
+
+# Classes
+class Tracer():
+    """
+    Traces the animation per category and counts the events of every frame.
+    """
+    __slots__ = ("active", "steps", "counts", "frame_counts", "pauses")
+
+    def __init__(self, categories=()):
+        """
+        Arguments:
+        - (iterable) categories: the categories to trace (see CATEGORIES)
+        """
+        self.active = {}
+        self.configure(categories)
+        self.steps = []
+        self.counts = []
+        self.frame_counts = None
+        # Frames are not counted while paused (see paused)
+        self.pauses = 0
+
+    def configure(self, categories, level=logging.DEBUG):
+        """
+        Arguments:
+        - (iterable/string) categories: the categories to trace, a string is split on commas
+        - (int) level: the level the messages are logged at
+
+        Usage:
+        Turns the categories on, a category is only traced when the logger logs the level.
+        """
+        if isinstance(categories, str):
+            categories = [category.strip() for category in categories.split(",") if category.strip()]
+
+        unknown = set(categories) - set(CATEGORIES)
+        if unknown:
+            raise ValueError("Unknown trace categories: {}".format(", ".join(sorted(unknown))))
+
+        self.active = {category: level if category in categories and logger.isEnabledFor(level) else None
+                       for category in CATEGORIES}
+
+    def trace(self, category, message, *args):
+        """
+        Logs the message (formatted with args) if the category is turned on.
+        """
+        level = self.active[category]
+        if level is not None:
+            logger.log(level, "[%s] " + message, category, *args)
+
+    def begin_frame(self, step):
+        """ Starts counting the events of the step, unless counting is paused """
+        if self.pauses:
+            self.frame_counts = None
+            return
+        self.frame_counts = dict.fromkeys(COUNTERS, 0)
+        self.steps.append(step)
+
+    @contextmanager
+    def paused(self):
+        """
+        Usage:
+        with tracer.paused():
+            ...
+
+        The frames made in the block are not counted, i.e. frames replayed to restore the state of the
+        animation before another frame (see AnimationEngine.frame_stateless).
+        """
+        self.pauses += 1
+        try:
+            yield self
+        finally:
+            self.pauses -= 1
+
+    def count(self, counter, number=1):
+        """ Adds to a counter of the current frame """
+        if self.frame_counts is not None:
+            self.frame_counts[counter] += number
+
+    def end_frame(self):
+        """ Stores the counters of the current frame """
+        if self.frame_counts is not None:
+            self.counts.append([self.frame_counts[counter] for counter in COUNTERS])
+            self.frame_counts = None
+
+    def counters(self):
+        """
+        Returns the steps and a (frames x COUNTERS) array with the counts of every made frame.
+        """
+        return np.array(self.steps[:len(self.counts)], dtype=int), \
+            np.array(self.counts, dtype=int).reshape(-1, len(COUNTERS))
+
+    def report(self):
+        """
+        Returns the counters of all made frames as an aggregated report.
+        """
+        steps, counts = self.counters()
+        if not len(steps):
+            return "No frames made"
+
+        lines = ["{} frames made (steps {} - {})".format(len(steps), steps.min(), steps.max()),
+                 "{:<10}{:>10}{:>10}{:>10}{:>12}".format("counter", "total", "mean", "max", "max step")]
+        for index, counter in enumerate(COUNTERS):
+            column = counts[:, index]
+            lines.append("{:<10}{:>10}{:>10.1f}{:>10}{:>12}".format(counter, column.sum(), column.mean(),
+                                                                   column.max(), steps[column.argmax()]))
+
+        # The steps with joins or splits
+        for counter in ("joined", "split"):
+            column = counts[:, COUNTERS.index(counter)]
+            if column.any():
+                lines.append("{} at steps: {}".format(counter, ", ".join(str(step) for step in steps[column > 0])))
+        return "\n".join(lines)
+
+    def reset(self):
+        """ Removes the counters of all frames """
+        self.steps = []
+        self.counts = []
+        self.frame_counts = None
+
+
+# The tracer of the animation
+TRACER = Tracer()
@@ -3,17 +3,46 @@ from pypovray import config
 
 # Default configuration file located in the project root
 DEFAULT_CONFIG = 'default.ini'
-# Create a SETTINGS object containing all the settings as attributes.
-# Use as SETTINGS.Quality, SETTINGS.MovieFPS, etc.
-SETTINGS = config.Config(DEFAULT_CONFIG)
 
-# Setup logging, reading log-level from the configuration file
-logging.basicConfig(level=logging._nameToLevel[SETTINGS.LogLevel])
 logger = logging.getLogger(__name__)
 
-logger.info(' Using config file "%s"', DEFAULT_CONFIG)
+# The active settings, loaded from DEFAULT_CONFIG on first use unless
+# set before with use_config()
+_ACTIVE_SETTINGS = None
 
 
-def load_config(config_file):
+class _SettingsProxy():
+    """ Forwards attribute access to the active settings, which are only loaded on
+        first use. Use as SETTINGS.Quality, SETTINGS.MovieFPS, etc. """
+
+    def __getattr__(self, key):
+        return getattr(get_settings(), key)
+
+    def __str__(self):
+        return str(get_settings())
+
+
+# A SETTINGS object containing all the settings as attributes.
+SETTINGS = _SettingsProxy()
+
+
+def load_config(config_file, overrides=None):
     logger.info(' Loading config file "%s"', config_file)
-    return config.Config(config_file)
+    return config.load_settings(config_file, overrides)
+
+
+def use_config(settings):
+    """ Makes the given Settings object the active settings of the package and
+        applies its log-level to the package logger """
+    global _ACTIVE_SETTINGS
+    _ACTIVE_SETTINGS = settings
+    logger.setLevel(logging._nameToLevel[settings.LogLevel])
+    return settings
+
+
+def get_settings():
+    """ Returns the active settings, reading DEFAULT_CONFIG if none are set """
+    if _ACTIVE_SETTINGS is None:
+        use_config(load_config(DEFAULT_CONFIG))
+        logger.info(' Using config file "%s"', DEFAULT_CONFIG)
+    return _ACTIVE_SETTINGS
@@ -1,7 +1,10 @@
 """
 Reads a configuration file containing settings for the package
 """
+import ast
 import configparser
+import operator
+import os
 
 class Config():
     """ Exposes all settings listed in a valid configuration file (*.ini) as
@@ -48,3 +51,225 @@ class Config():
         except IndexError:
             return setting_value
         return setting_value
+
+
+# Types of the known settings, all other settings are kept as strings
+SETTING_TYPES = {
+    # GENERAL
+    'AppLocation': str,
+    'OutputPrefix': str,
+    'OutputImageDir': str,
+    'OutputMovieDir': str,
+    'OnExisting': str,
+    'LogLevel': str,
+    'TraceCategories': str,
+    'ProfileFrames': str,
+    'ProfileEvery': int,
+    'ProfileMemory': bool,
+    'ProfileDir': str,
+    # RENDER
+    'ImageWidth': int,
+    'ImageHeight': int,
+    'Quality': int,
+    'AntiAlias': float,
+    'UsePool': bool,
+    'Workers': int,
+    'UsePipeline': bool,
+    'QueueSize': int,
+    'DryRun': bool,
+    # SCENE
+    'Duration': float,
+    'RenderFPS': float,
+    'FrameTime': float,
+    'NumberFrames': float,
+    'MovieFPS': float,
+    'CheckpointInterval': int,
+    'ProximityCellSize': float,
+    'OverlapDistance': float,
+    # ENCODE
+    'GOPSize': int,
+    'EncodeWorkers': int,
+    # OTHER
+    'ShowWindow': bool,
+    'RemoveTempFiles': bool,
+}
+
+# Values of the settings added after the first version of the configuration file, so
+# configuration files without them keep working. All other known settings are required.
+SETTING_DEFAULTS = {
+    'OnExisting': 'ask',
+    'TraceCategories': '',
+    'ProfileFrames': '',
+    'ProfileEvery': '0',
+    'ProfileMemory': 'False',
+    'ProfileDir': '%(AppLocation)s/profiles',
+    'UsePipeline': 'False',
+    'QueueSize': '16',
+    'DryRun': 'False',
+    'CheckpointInterval': '50',
+    'ProximityCellSize': '0',
+    'OverlapDistance': '0',
+    'GOPSize': '20',
+    'EncodeWorkers': '0',
+}
+
+# What to do with existing output (OnExisting setting): ask, overwrite it, render the
+# missing frames only (resume) or stop rendering (fail)
+ON_EXISTING = ('ask', 'overwrite', 'resume', 'fail')
+
+# The allowed values of settings with a fixed set of values
+SETTING_CHOICES = {
+    'OnExisting': ON_EXISTING,
+}
+
+# Prefix of the environment variables overriding settings, i.e. PYPOVRAY_WORKERS=4
+ENV_PREFIX = 'PYPOVRAY_'
+
+# Operators allowed in arithmetic setting values such as '1 / %(RenderFPS)s'
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+_BOOLEANS = {'true': True, 'yes': True, 'on': True, '1': True,
+             'false': False, 'no': False, 'off': False, '0': False}
+
+
+class Settings():
+    """ Immutable, typed settings parsed once from a configuration file (*.ini).
+        Use as Settings.setting, i.e. Settings.Quality; every value already has
+        its final type (numbers, booleans and evaluated expressions). """
+
+    def __init__(self, config_file, values):
+        object.__setattr__(self, 'config_file', config_file)
+        object.__setattr__(self, '_values', dict(values))
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Settings are read-only, use load_settings() with overrides instead")
+
+    def __delattr__(self, key):
+        raise AttributeError("Settings are read-only")
+
+    def __getattr__(self, key):
+        # Only called for settings that are not defined
+        raise AttributeError("Setting '{}' is not defined in '{}'".format(key, self.__dict__.get('config_file')))
+
+    def as_dict(self):
+        """ Returns a copy of all settings """
+        return dict(self._values)
+
+    def __str__(self):
+        options = ["Settings loaded from '{}':".format(self.config_file)]
+        for key, value in self._values.items():
+            options.append("\t{}: {!r}".format(key, value))
+        return '\n'.join(options)
+
+
+def load_settings(config_file, overrides=None, environ=None):
+    """ Parses and validates the configuration file once into a Settings object.
+        Settings are overridden by environment variables (PYPOVRAY_<SETTING>) and
+        then by the `overrides` dictionary (i.e. from the command line, see
+        parse_overrides). Derived settings are recalculated with the overridden values.
+        Settings missing from the file get their default (see SETTING_DEFAULTS). """
+    parser = configparser.ConfigParser()
+    # Keep the case of the setting names
+    parser.optionxform = str
+    if not parser.read(config_file):
+        raise FileNotFoundError("Configuration file '{}' not found".format(config_file))
+
+    # Section of every setting, the first definition wins (like Config does)
+    sections = {}
+    for section in parser.sections():
+        for key in parser.options(section):
+            sections.setdefault(key, section)
+
+    # Missing settings with a default are added to the section of AppLocation, so their
+    # default can refer to it (i.e. ProfileDir)
+    default_section = sections.get('AppLocation', parser.sections()[0] if parser.sections() else None)
+    for key, value in SETTING_DEFAULTS.items():
+        if key not in sections and default_section is not None:
+            parser.set(default_section, key, value)
+            sections[key] = default_section
+
+    environ = os.environ if environ is None else environ
+    env_overrides = {key: environ[ENV_PREFIX + key.upper()]
+                     for key in sections if ENV_PREFIX + key.upper() in environ}
+    for key, value in list(env_overrides.items()) + list((overrides or {}).items()):
+        if key not in sections:
+            raise KeyError("Can not override unknown setting '{}'".format(key))
+        # Escape the % so the value is not interpolated
+        parser.set(sections[key], key, str(value).replace('%', '%%'))
+
+    values = {}
+    for key, section in sections.items():
+        raw_value = parser.get(section, key).split(';')[0].strip()
+        try:
+            values[key] = _convert(raw_value, SETTING_TYPES.get(key, str))
+        except ValueError as error:
+            raise ValueError("Invalid value for setting '{}' in '{}': {}".format(key, config_file, error))
+        if key in SETTING_CHOICES and values[key] not in SETTING_CHOICES[key]:
+            raise ValueError("Invalid value for setting '{}' in '{}': '{}' is not one of: {}".format(
+                key, config_file, values[key], ', '.join(SETTING_CHOICES[key])))
+
+    missing = [key for key in SETTING_TYPES if key not in values]
+    if missing:
+        raise KeyError("Missing settings in '{}': {}".format(config_file, ', '.join(missing)))
+
+    return Settings(config_file, values)
+
+
+def parse_overrides(arguments):
+    """ Converts command line arguments of the form 'Setting=value' into a dictionary """
+    overrides = {}
+    for argument in arguments:
+        key, separator, value = argument.partition('=')
+        if not separator:
+            raise ValueError("Setting override '{}' is not of the form Setting=value".format(argument))
+        overrides[key.strip()] = value.strip()
+    return overrides
+
+
+def _convert(raw_value, setting_type):
+    """ Converts a setting value to its type, numbers can be arithmetic expressions """
+    if setting_type is str:
+        return raw_value
+    if setting_type is bool:
+        if raw_value.lower() not in _BOOLEANS:
+            raise ValueError("'{}' is not a boolean".format(raw_value))
+        return _BOOLEANS[raw_value.lower()]
+
+    number = evaluate_arithmetic(raw_value)
+    if setting_type is int:
+        if number != int(number):
+            raise ValueError("'{}' is not a whole number".format(raw_value))
+        return int(number)
+    return float(number)
+
+
+def evaluate_arithmetic(expression):
+    """ Safely evaluates an arithmetic expression of numbers (+, -, *, /, //, % and **) """
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError:
+        raise ValueError("'{}' is not a number or arithmetic expression".format(expression))
+    return _evaluate_node(tree.body, expression)
+
+
+def _evaluate_node(node, expression):
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate_node(node.left, expression),
+                                         _evaluate_node(node.right, expression))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate_node(node.operand, expression))
+    raise ValueError("'{}' is not a number or arithmetic expression".format(expression))
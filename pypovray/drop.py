@@ -1,4 +1,4 @@
-import math
+from functools import lru_cache
 import numpy as np
 
 class Droplet:
@@ -71,28 +71,83 @@ class Droplet:
         return
 
 def droplet(radius, height, gamma, size=10, shift=0, offset=[0, 0, 0], apl=0.5, tag=""):
-    """Draw a line of a droplet on/in a membrane"""
+    """Draw a line of a droplet on/in a membrane
+
+    Returns an (N x 4) array with the x, y and z coordinates and the
+    angle (in degrees) of each lipid"""
+
+    parts, _ = _profile(radius, height, gamma, size, shift, apl)
+
+    x = np.concatenate([part[0] for part in parts])
+    z = np.concatenate([part[1] for part in parts])
+
+    # Each lipid is followed by its mirror image in the symmetry axis
+    coordinates = np.empty((2 * len(x), 4))
+    coordinates[0::2, 0] = x
+    coordinates[1::2, 0] = -x
+    coordinates[:, 1] = np.repeat(z, 2)
+    coordinates[:, 2] = 0
+    coordinates[0::2, 3] = np.concatenate([part[2] for part in parts])
+    coordinates[1::2, 3] = np.concatenate([part[3] for part in parts])
+
+    # Return the coordinates for all points in the line
+    coordinates[:, :3] += offset
+    return coordinates
+
+def droplet3d(radius, height, gamma, size=10, shift=0, offset=[0, 0, 0], apl=0.5):
+    """Draw the surface of a droplet on/in a membrane by revolving the
+    droplet line around the symmetry (y) axis
+
+    Each point of the line becomes a ring of lipids; the number of lipids
+    on a ring follows its circumference so the lipids keep the same spacing
+    (area per lipid) as along the line. Returns two (N x 3) arrays with the
+    positions and the (unit) normals of the lipids"""
+
+    parts, spacing = _profile(radius, height, gamma, size, shift, apl)
+
+    r = np.concatenate([part[0] for part in parts])
+    z = np.concatenate([part[1] for part in parts])
+    normal_r = np.concatenate([part[4] for part in parts])
+    normal_z = np.concatenate([part[5] for part in parts])
+
+    # Lipids per ring, at least one (on the axis)
+    counts = np.maximum(np.rint(2*np.pi*r / spacing).astype(int), 1)
+    ring = np.repeat(np.arange(len(r)), counts)
+    # Index of each lipid on its ring, every other ring is staggered
+    index = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    phi = (index + 0.5*(ring % 2)) * 2*np.pi / counts[ring]
+
+    cos, sin = np.cos(phi), np.sin(phi)
+    positions = np.column_stack((r[ring]*cos, z[ring], r[ring]*sin)) + offset
+    normals = np.column_stack((normal_r[ring]*cos, normal_z[ring], normal_r[ring]*sin))
+    return positions, normals
+
+def _profile(radius, height, gamma, size, shift, apl):
+    """Calculates the right half of the droplet line. Returns a list with for
+    each part of the line the x and z coordinates, the angles of the lipids
+    and their mirror images and the x and z components of the normals,
+    followed by the spacing between the lipids"""
 
     drop = Droplet(radius, height+shift, gamma, size)
 
-    alpha = drop.alpha
-    (x, z) = drop.p
     c = drop.B
     a = drop.p
 
     w = size - drop.linelen
 
-    lipids = []
+    parts = []
     total = drop.linelen + drop.arclen1 + drop.arclen2
     dots = int(total / apl)
     apl = total / dots
 
+    # Flat membrane, the normal is the direction of the lipids (angle 180)
     linedots = int(drop.linelen / apl)
-    line  = w+(np.arange(linedots) + 0.5)*apl
-    lipids += [u for i in line for u in [i, 0, shift, math.degrees(np.pi),
-                                         -i, 0, shift, -(math.degrees(-np.pi))]]
+    line = w+(np.arange(linedots) + 0.5)*apl
+    parts.append((line, np.full(linedots, float(shift)),
+                  np.full(linedots, np.degrees(np.pi)), np.full(linedots, -np.degrees(-np.pi)),
+                  np.zeros(linedots), np.full(linedots, -1.0)))
 
-    # Circle B (sides)
+    # Circle B (sides), only when the droplet is connected to the membrane
     if drop.arclen2:
         arc2dots = int(drop.beta * drop.gamma / apl + 0.5)
         if arc2dots:
@@ -101,12 +156,13 @@ def droplet(radius, height, gamma, size=10, shift=0, offset=[0, 0, 0], apl=0.5,
             arc2x = np.cos(arc2)*drop.gamma + c[0]
             arc2z = np.sin(arc2)*drop.gamma + c[1] + shift
             mask = arc2x >= 0
-            l = [u for i, j in zip(arc2x[mask,], arc2z[mask,])
-                 for u in [i, 0, j, math.degrees(math.atan2(c[1]-j, c[0]-i)) + 90,
-                           -i, 0, j, -(math.degrees(math.atan2(c[1]-j, c[0]-i)) + 90)]]
-            lipids += l
+            arc2x, arc2z = arc2x[mask], arc2z[mask]
+            angles = np.degrees(np.arctan2(c[1]-arc2z, c[0]-arc2x)) + 90
+            # Pointing away from the center of circle B
+            parts.append((arc2x, arc2z, angles, -angles,
+                          np.cos(arc2[mask]), np.sin(arc2[mask])))
 
-    # Main circle ('drop')
+    # Main circle ('drop'), connected or (fully immersed) detached
     if drop.arclen1:
         arc1dots = int(drop.arclen1 / apl + 0.5)
         if arc1dots:
@@ -114,10 +170,9 @@ def droplet(radius, height, gamma, size=10, shift=0, offset=[0, 0, 0], apl=0.5,
             arc1 = -0.5*np.pi+(np.arange(arc1dots)+0.5)*angle1
             arc1x = np.cos(arc1) * drop.radius
             arc1z = np.sin(arc1) * drop.radius - height
-            l = [u for i, j in zip(arc1x,arc1z)
-                 for u in [i, 0, j, math.degrees(math.atan2(a[1]-j, -i)) + 90,
-                           -i, 0, j, -(math.degrees(math.atan2(a[1]-j, -i)) + 90)]]
-            lipids += l
+            angles = np.degrees(np.arctan2(a[1]-arc1z, -arc1x)) + 90
+            # Pointing away from the center of the droplet
+            parts.append((arc1x, arc1z, angles, -angles, np.cos(arc1), np.sin(arc1)))
 
     ''' Circles (B and p) center points
     lipids += [c[0], 0, c[1] + shift, 0]
@@ -125,12 +180,7 @@ def droplet(radius, height, gamma, size=10, shift=0, offset=[0, 0, 0], apl=0.5,
     lipids += [a[0], 0, a[1] + shift, 0]
     '''
 
-    # Return the coordinates for all points in the line
-    coordinates = []
-    for l in chunks(lipids, 4):
-        # Coordinates
-        coordinates.append([l[0] + offset[0], l[2] + offset[1], l[1] + offset[2], l[3]])
-    return coordinates
+    return parts, apl
 
 def chunks(l, n):
     """Yield successive n-sized chunks from l."""
@@ -138,13 +188,39 @@ def chunks(l, n):
         yield l[i:i + n]
 
 def membrane(step, radius, gamma, start, stop, nframes, offset, size, apl):
-    """ Creates a list of coordinates for a membrane involved in pinocytosis """
+    """ Creates an (N x 4) array of coordinates for a membrane involved in pinocytosis.
+    The coordinates of all frames are calculated on the first call and cached """
+    if 0 <= step < nframes and step == int(step):
+        return membrane_frames(radius, gamma, start, stop, nframes, offset, size, apl)[int(step)]
+    return droplet(radius, _membrane_height(step, start, stop, nframes), gamma,
+                   offset=offset, size=size, apl=apl)
+
+
+def membrane_frames(radius, gamma, start, stop, nframes, offset, size, apl):
+    """ Creates the membrane coordinates for all `nframes` steps in one call.
+    Returns a tuple with an (N x 4) array for each step; the results are cached
+    so the arrays are read-only """
+    return _membrane_frames(float(radius), float(gamma), float(start), float(stop),
+                            int(nframes), tuple(offset), float(size), float(apl))
+
+
+@lru_cache(maxsize=16)
+def _membrane_frames(radius, gamma, start, stop, nframes, offset, size, apl):
+    frames = []
+    for step in range(nframes):
+        coordinates = droplet(radius, _membrane_height(step, start, stop, nframes), gamma,
+                              offset=offset, size=size, apl=apl)
+        coordinates.flags.writeable = False
+        frames.append(coordinates)
+    return tuple(frames)
+
+
+def _membrane_height(step, start, stop, nframes):
+    """ Height of the droplet at the given step """
     start = float(start)
     stop = float(stop)
     delta = stop - start
     stepsize = abs(delta / float(nframes))
     nsteps = abs(int(delta/stepsize))
     s = delta / nsteps
-    x = -start-step*s
-    coordinates = droplet(radius, x, gamma, offset=offset, size=size, apl=apl)
-    return coordinates
+    return -start-step*s
@@ -0,0 +1,90 @@
+"""
+Module for rendering lipid membranes from the coordinates created by the
+`drop` module (an N x 4 array with x, y, z and the angle of each lipid).
+
+The lipid model is declared once and every lipid is an instance of it with
+its own rotation and translation, which keeps the scene small. For shots
+from a distance all lipids can be merged into a single low-poly mesh2.
+"""
+
+import numpy as np
+from vapory.vapory import Sphere, Cylinder, Union
+from pypovray.models import lipid_head_model, lipid_tail_model
+
+
+def lipid_model(head_radius=0.25, tail_length=1.0, tail_radius=0.06):
+    """ Creates the default lipid: a head at the origin with two tails along the y-axis """
+    tail_offset = head_radius / 2
+    return Union(Sphere([0, 0, 0], head_radius, lipid_head_model),
+                 Cylinder([-tail_offset, 0, 0], [-tail_offset, tail_length, 0], tail_radius, lipid_tail_model),
+                 Cylinder([tail_offset, 0, 0], [tail_offset, tail_length, 0], tail_radius, lipid_tail_model))
+
+
+class LipidMembrane(object):
+    """ A membrane of lipids that can be added to the objects of a vapory Scene """
+
+    def __init__(self, coordinates, name='Lipid', lipid=None, mesh=False,
+                 head_radius=0.25, tail_length=1.0, texture=lipid_tail_model):
+        """ Places a lipid at each of the `coordinates`, rotated around the z-axis by the
+            angle (degrees) in the fourth column. `name` is the POV-Ray identifier of the
+            declared lipid and must be unique in the scene. With `mesh` all lipids are
+            merged in a single mesh2 of low-poly lipids using the given `texture`. """
+        self.coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 4)
+        self.name = name
+        self.lipid = lipid if lipid is not None else lipid_model(head_radius, tail_length)
+        self.mesh = mesh
+        self.head_radius = head_radius
+        self.tail_length = tail_length
+        self.texture = texture
+
+    def __str__(self):
+        if self.mesh:
+            return self.mesh2()
+        return self.instances()
+
+    def instances(self):
+        """ Declares the lipid model once and places an instance for each lipid """
+        declare = '#declare {} = {};\n'.format(self.name, self.lipid)
+        instance = 'object {{ {} rotate <0,0,%.3f> translate <%.4f,%.4f,%.4f> }}\n'.format(self.name)
+        # Angle first, followed by the position
+        values = self.coordinates[:, [3, 0, 1, 2]].ravel()
+        return declare + (instance * len(self.coordinates)) % tuple(values)
+
+    def mesh2(self):
+        """ Merges all lipids into a single mesh2 object, each lipid is a diamond
+            shape from the bottom of the head to the end of the tails """
+        vertices, faces = self._lipid_mesh()
+        nlipids = len(self.coordinates)
+
+        # Rotate the template around the z-axis for every lipid and move it in place
+        angles = np.radians(self.coordinates[:, 3])
+        cos, sin = np.cos(angles)[:, None], np.sin(angles)[:, None]
+        mesh_vertices = np.empty((nlipids, len(vertices), 3))
+        mesh_vertices[..., 0] = cos * vertices[:, 0] - sin * vertices[:, 1]
+        mesh_vertices[..., 1] = sin * vertices[:, 0] + cos * vertices[:, 1]
+        mesh_vertices[..., 2] = vertices[:, 2]
+        mesh_vertices += self.coordinates[:, None, :3]
+
+        # The faces of each lipid index its own vertices
+        mesh_faces = faces[None, :, :] + (np.arange(nlipids) * len(vertices))[:, None, None]
+
+        vertex_text = ('<%.4f,%.4f,%.4f>,' * (nlipids * len(vertices))) % tuple(mesh_vertices.ravel())
+        face_text = ('<%d,%d,%d>,' * (nlipids * len(faces))) % tuple(mesh_faces.ravel())
+        return 'mesh2 {{\nvertex_vectors {{ {}, {} }}\nface_indices {{ {}, {} }}\n{}\n}}\n'.format(
+            nlipids * len(vertices), vertex_text.rstrip(','),
+            nlipids * len(faces), face_text.rstrip(','),
+            self.texture)
+
+    def _lipid_mesh(self):
+        """ Vertices and faces of the low-poly lipid: a ring of four vertices around the
+            head, a point below the head and a point at the end of the tails """
+        r = self.head_radius
+        vertices = np.array([[0, -r, 0],
+                             [r, 0, 0], [0, 0, r], [-r, 0, 0], [0, 0, -r],
+                             [0, self.tail_length, 0]], dtype=float)
+        faces = []
+        for i in range(4):
+            ring, next_ring = 1 + i, 1 + (i + 1) % 4
+            faces.append([0, ring, next_ring])
+            faces.append([5, next_ring, ring])
+        return vertices, np.array(faces)
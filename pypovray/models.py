@@ -25,6 +25,10 @@ default_sphere_model = Texture(Pigment('color', [0.9, 0.05, 0.05], 'filter', 0.7
                                Finish('phong', 0.6, 'reflection', 0.4))
 text_model           = Texture(Pigment('color', [1, 1, 1]),
                                Finish('phong', 0.6, 'reflection', 0.4))
+lipid_head_model     = Texture(Pigment('color', [0.9, 0.6, 0.2]),
+                               Finish('phong', 0.4, 'reflection', 0.05))
+lipid_tail_model     = Texture(Pigment('color', [0.95, 0.9, 0.7]),
+                               Finish('phong', 0.2))
 
 # Static atom definitions
 # See the 'color.inc' povray file for more color examples and names.
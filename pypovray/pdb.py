@@ -8,7 +8,6 @@ import numpy as np
 from vapory.vapory import Sphere, Cylinder, Text, Pigment, Texture, Finish, Intersection
 from pypovray import SETTINGS, logger
 from pypovray.models import atom_colors, atom_sizes, text_model
-from scipy.linalg import expm, norm
 
 
 class PDBMolecule(object):
@@ -19,7 +18,7 @@ class PDBMolecule(object):
 
         # If a list of atoms is provided, use these instead of a PDB file
         # This allows dividing the molecule in segments, see divide()
-        if atoms:
+        if atoms is not False:
             self.atoms = atoms
         else:
             self._parse_pdb(pdb_file)
@@ -109,6 +108,9 @@ class PDBMolecule(object):
         """ Calculates the 'center of mass' for the molecule
         Note: assumes equal weights, not the true center of mass """
         x, y, z = 0, 0, 0
+        # A molecule without atoms (i.e. all joined into another molecule) stays at the origin
+        if not self.atoms:
+            return np.array([0.0, 0.0, 0.0])
         for atom in self.atoms:
             x += atom.x
             y += atom.y
@@ -123,6 +125,27 @@ class PDBMolecule(object):
             atom.y -= curr_center[1]
             atom.z -= curr_center[2]
 
+    def get_coordinates(self):
+        """ Returns the atom coordinates as a (number of atoms x 3) array """
+        return np.array([[atom.x, atom.y, atom.z] for atom in self.atoms], dtype=float)
+
+    def set_coordinates(self, coordinates, center=None):
+        """ Places the atoms on the given (number of atoms x 3) coordinates and regenerates
+            the molecule, optionally the center is set as well """
+        for atom, (x, y, z) in zip(self.atoms, np.asarray(coordinates, dtype=float).tolist()):
+            atom.x, atom.y, atom.z = x, y, z
+        if center is not None:
+            self.center = np.array(center, dtype=float)
+        self.render_molecule()
+
+    @classmethod
+    def from_arrays(cls, name, coordinates, elements, names, center=False):
+        """ Creates a molecule from arrays with the coordinates, elements and names of
+            the atoms (i.e. shared by another process) instead of parsing a PDB file """
+        atoms = [PDBAtom.from_values(str(atom_name), str(element), xyz)
+                 for atom_name, element, xyz in zip(names, elements, coordinates)]
+        return cls(name, center=center, atoms=atoms)
+
     def set_model(self, model):
         """ Set render specific options for the atoms (i.e. reflection) """
         self.model = model
@@ -174,7 +197,7 @@ class PDBMolecule(object):
 
         # If step is in seconds, divide by the FrameTime to get the integer (actual) step
         if time:
-            step = int(step/eval(SETTINGS.FrameTime))
+            step = int(step/SETTINGS.FrameTime)
 
         step = step - s_frame
 
@@ -337,8 +360,15 @@ class PDBMolecule(object):
             theta: rotation in radians
             v:     vector, original object coordinates
         """
-        # Compute the matrix exponential using Taylor series
-        M0 = expm(np.cross(np.eye(3), axis/norm(axis)*theta))
+        # The rotation vector, its length is the angle to rotate
+        w = np.asarray(axis, dtype=float) / np.linalg.norm(axis) * theta
+        angle = np.linalg.norm(w)
+        if angle == 0:
+            return np.asarray(v, dtype=float)
+
+        # Rodrigues' formula, equal to the matrix exponential of the cross product matrix of w
+        K = np.cross(np.eye(3), w / angle)
+        M0 = np.eye(3) + np.sin(angle) * K + (1 - np.cos(angle)) * np.dot(K, K)
         # Multiply the rotation matrix with the vector v
         return np.dot(M0, v)
 
@@ -384,3 +414,14 @@ class PDBAtom(object):
             self.element = string[76:78].strip()
         # List of bonded atoms
         self.bonds = []
+
+    @classmethod
+    def from_values(cls, name, element, coordinates):
+        """ Creates an atom from its name, element and coordinates instead of an ATOM line """
+        atom = cls.__new__(cls)
+        atom.name = name
+        atom.element = element
+        atom.x, atom.y, atom.z = (float(coord) for coord in coordinates)
+        atom.warnings = []
+        atom.bonds = []
+        return atom
@@ -0,0 +1,154 @@
+"""
+Renders a movie using an asyncio driven pipeline of three overlapping stages:
+
+- building the scenes (Python) for the upcoming frames,
+- rendering the scenes using multiple POV-Ray processes and
+- encoding segments of finished frames using ffmpeg.
+
+The stages are connected by bounded queues; scene building waits when the
+renderers can not keep up, so no more scenes are kept in memory than needed.
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import mkdtemp
+from pypovray import SETTINGS, logger
+from pypovray.pypovray import (_create_frame_file_name, _povray_command, _scene_string,
+                               _frame_segments, _segment_file_names, _encode_segment,
+                               _concat_segments)
+
+# Marks the end of the frames in a queue
+_DONE = None
+
+
+def render_scene_to_mp4(scene, frame_ids):
+    """ Builds, renders and encodes the frames given by `frame_ids` concurrently,
+    the `scene` function is called in the order of the frame numbers """
+    asyncio.run(_run_pipeline(scene, list(frame_ids)))
+
+
+async def _run_pipeline(scene, frame_ids):
+    """ Connects the three stages and waits until the movie is created """
+    workers = SETTINGS.Workers
+    encode_workers = SETTINGS.EncodeWorkers or os.cpu_count()
+    gop_size = SETTINGS.GOPSize
+
+    # Bounded queues give backpressure between the stages
+    render_queue = asyncio.Queue(maxsize=SETTINGS.QueueSize)
+    encode_queue = asyncio.Queue()
+
+    tmp_folder = mkdtemp()
+    # Segments of a single GOP so that encoding starts as soon as possible
+    segments = _frame_segments(sorted(frame_ids), gop_size, len(frame_ids))
+    segment_files = _segment_file_names(tmp_folder, len(segments))
+    logger.info('["%s"] - pipeline rendering %d frames using %d POV-Ray processes',
+                sys._getframe().f_code.co_name, len(frame_ids), workers)
+
+    # A single thread builds the scenes so that frames are created in order
+    with ThreadPoolExecutor(max_workers=1) as scene_executor, \
+            ThreadPoolExecutor(max_workers=encode_workers) as encode_executor:
+        # The stages run together, when one fails the others are cancelled (a failing
+        # renderer would otherwise leave the builder waiting on the full render queue)
+        stages = [asyncio.create_task(_build_scenes(scene, frame_ids, render_queue, scene_executor, workers)),
+                  asyncio.create_task(_render_stage(render_queue, encode_queue, workers)),
+                  asyncio.create_task(_encode_frames(encode_queue, segments, segment_files,
+                                                     gop_size, encode_executor))]
+        await _run_stages(stages)
+
+    _concat_segments(segment_files, tmp_folder)
+
+
+async def _run_stages(stages):
+    """ Waits for all stages, raises the error of the first failing stage after
+    cancelling the other stages """
+    done, pending = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+    failed = [task for task in done if task.exception() is not None]
+    if failed:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        raise failed[0].exception()
+
+
+async def _render_stage(render_queue, encode_queue, workers):
+    """ Runs the renderers and tells the encoder when all frames are rendered """
+    renderers = [asyncio.create_task(_render_frames(render_queue, encode_queue))
+                 for _ in range(workers)]
+    try:
+        await asyncio.gather(*renderers)
+    except BaseException:
+        for renderer in renderers:
+            renderer.cancel()
+        await asyncio.gather(*renderers, return_exceptions=True)
+        raise
+    await encode_queue.put(_DONE)
+
+
+async def _build_scenes(scene, frame_ids, render_queue, executor, workers):
+    """ Stage 1: creates the POV-Ray code for each frame """
+    loop = asyncio.get_running_loop()
+    for frame_id in frame_ids:
+        scene_string = await loop.run_in_executor(executor, _build_scene, scene, frame_id)
+        # Waits when the renderers are behind
+        await render_queue.put((frame_id, scene_string))
+
+    # Tell every renderer there are no frames left
+    for _ in range(workers):
+        await render_queue.put(_DONE)
+
+
+def _build_scene(scene, frame_id):
+    """ Calls the scene function and converts the result to POV-Ray code """
+    return _scene_string(scene(frame_id))
+
+
+async def _render_frames(render_queue, encode_queue):
+    """ Stage 2: renders the scenes using a POV-Ray subprocess each, the scene
+    is passed on stdin and the PNG image is read from stdout """
+    while True:
+        item = await render_queue.get()
+        if item is _DONE:
+            return
+        frame_id, scene_string = item
+
+        process = await asyncio.create_subprocess_exec(*_povray_command(),
+                                                       stdin=asyncio.subprocess.PIPE,
+                                                       stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.PIPE)
+        try:
+            image, err = await process.communicate(scene_string.encode('ascii'))
+        except asyncio.CancelledError:
+            # A cancelled pipeline does not leave POV-Ray running
+            process.kill()
+            await process.wait()
+            raise
+        if process.returncode:
+            raise IOError("POVRay rendering failed with the following error: " + err.decode('ascii', errors='replace'))
+
+        with open(_create_frame_file_name(frame_id), 'wb') as frame_png:
+            frame_png.write(image)
+        await encode_queue.put(frame_id)
+
+
+async def _encode_frames(encode_queue, segments, segment_files, gop_size, executor):
+    """ Stage 3: encodes a segment as soon as all of its frames are rendered """
+    loop = asyncio.get_running_loop()
+    # Number of frames still to be rendered for each segment
+    remaining = [len(segment) for segment in segments]
+    segment_of_frame = {frame: index for index, segment in enumerate(segments) for frame in segment}
+    encoders = []
+
+    while True:
+        frame_id = await encode_queue.get()
+        if frame_id is _DONE:
+            break
+        index = segment_of_frame[frame_id]
+        remaining[index] -= 1
+        if not remaining[index]:
+            logger.debug('["%s"] - segment %d complete, encoding', sys._getframe().f_code.co_name, index)
+            encoders.append(loop.run_in_executor(executor, _encode_segment,
+                                                 segments[index], segment_files[index], gop_size))
+
+    await asyncio.gather(*encoders)
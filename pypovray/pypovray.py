@@ -3,34 +3,47 @@ This module offers functionality to render a frame or movie given a
 Vapory 'Scene' object.
 """
 
+import hashlib
+import re
 import shutil
+import subprocess
 import sys
 import os
-from tempfile import mkdtemp
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import mkdtemp, gettempdir
 from glob import glob
-from distutils import util
 from math import ceil
-from moviepy.editor import ImageSequenceClip
-from pathos.multiprocessing import ProcessingPool as Pool
-import ffmpy
-from pypovray import SETTINGS, logger
+from multiprocessing import Pool
+from pypovray import SETTINGS, logger, get_settings, use_config
+# What to do with existing output (OnExisting setting, checked when the settings are loaded)
+from pypovray.config import ON_EXISTING
+
+# Name of the POV-Ray executable (the same as used by vapory)
+POVRAY_BINARY = 'povray.exe' if os.name == 'nt' else 'povray'
+
+# The include files made by this process (see create_include_file)
+_INCLUDE_FILES = set()
+
+# The scene function of a pool worker, set once when the worker starts
+_WORKER_SCENE = None
+
+# Minimal width of the (zero padded) frame number in the image file names
+FRAME_DIGITS = 6
 
 
 def render_scene_to_png(frame, frame_id=0):
     """ Renders one or more frames given the `frame` function object and  a
     frame number (int, list or range) which is passed to the `frame` function """
-    tmp_folder = _create_tmp_folder()
-
     if isinstance(frame_id, int):
-        if frame_id < 0 or frame_id > eval(SETTINGS.NumberFrames):
+        if frame_id < 0 or frame_id > SETTINGS.NumberFrames:
             logger.warning('["%s"] - Frame number(s) outside of range(0, %d)',
-                           sys._getframe().f_code.co_name, eval(SETTINGS.NumberFrames))
+                           sys._getframe().f_code.co_name, SETTINGS.NumberFrames)
         _render_frame(frame(frame_id), frame_id)
 
     elif isinstance(frame_id, (list, range)):
-        if min(frame_id) < 0 or max(frame_id) > eval(SETTINGS.NumberFrames):
+        if min(frame_id) < 0 or max(frame_id) > SETTINGS.NumberFrames:
             logger.warning('["%s"] - Frame number(s) outside of range(0, %d)',
-                           sys._getframe().f_code.co_name, eval(SETTINGS.NumberFrames))
+                           sys._getframe().f_code.co_name, SETTINGS.NumberFrames)
 
         for id in frame_id:
             _render_frame(frame(id), id)
@@ -39,9 +52,58 @@ def render_scene_to_png(frame, frame_id=0):
                      sys._getframe().f_code.co_name)
         return
 
-    # Remove temporary files after rendering, if set
-    if SETTINGS.LogLevel != "DEBUG" or util.strtobool(SETTINGS.RemoveTempFiles):
-        shutil.rmtree(tmp_folder, "ignore_errors")
+
+def render_scene_to_bytes(scene):
+    """ Renders a Vapory 'Scene' object and returns the PNG image as bytes. The scene
+    is passed to POV-Ray on stdin and the image is read from stdout, no temporary files
+    are used which makes this safe to use from multiple threads. """
+    process = subprocess.run(_povray_command(), input=_scene_string(scene).encode('ascii'),
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode:
+        raise IOError("POVRay rendering failed with the following error: " + process.stderr.decode('ascii', errors='replace'))
+    return process.stdout
+
+
+def create_include_file(objects, declares=None):
+    """ Writes POV-Ray code that is the same for every frame (i.e. static objects, lights)
+    to an include file that can be used by each frame with Scene(..., included=[file]).
+    The `declares` dictionary maps identifiers to objects that are declared in the file.
+    Files are named by the hash of their contents; an unchanged include is only written
+    once and reused by all frames, workers and following renders. Include files of the
+    same prefix written by earlier renders are removed (see _remove_stale_include_files). """
+    declares = declares or {}
+    lines = ['#declare {} = {};'.format(name, value) for name, value in declares.items()]
+    lines += [str(obj) for obj in objects]
+    content = '\n'.join(lines) + '\n'
+
+    digest = hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+    include_folder = os.path.join(gettempdir(), 'pypovray')
+    os.makedirs(include_folder, exist_ok=True)
+    include_file = os.path.join(include_folder, '{}_{}.inc'.format(SETTINGS.OutputPrefix, digest))
+
+    if not os.path.exists(include_file):
+        # Write to a temporary file first so that parallel renders never read a partial file
+        tmp_file = '{}.{}'.format(include_file, os.getpid())
+        with open(tmp_file, 'w') as include:
+            include.write(content)
+        os.replace(tmp_file, include_file)
+    _INCLUDE_FILES.add(include_file)
+    _remove_stale_include_files(include_folder)
+    logger.debug('["%s"] - include file: %s', sys._getframe().f_code.co_name, include_file)
+    return include_file
+
+
+def _remove_stale_include_files(include_folder):
+    """ Removes the include files of the prefix that were not made by this process,
+    the include files of (other engines of) this process are still in use """
+    name = re.compile(r'{}_[0-9a-f]{{16}}\.inc$'.format(re.escape(SETTINGS.OutputPrefix)))
+    for file_name in os.listdir(include_folder):
+        include_file = os.path.join(include_folder, file_name)
+        if name.match(file_name) and include_file not in _INCLUDE_FILES:
+            try:
+                os.remove(include_file)
+            except OSError:
+                pass
 
 
 def render_scene_to_gif(scene, frame_ids=None):
@@ -54,7 +116,7 @@ def render_scene_to_gif(scene, frame_ids=None):
                      sys._getframe().f_code.co_name)
         return
 
-    if _check_rendered_images():
+    if _check_rendered_images(frame_ids):
         logger.error('["%s"] - Not simulating; output image file(s) already exist.',
                      sys._getframe().f_code.co_name)
         return
@@ -62,65 +124,124 @@ def render_scene_to_gif(scene, frame_ids=None):
     # Render the scenes (creates PNG images in the SETTINGS.OutputImageDir folder)
     _render_scene(scene, frame_ids)
 
-    # Get a list of all rendered images (these are ordered by default)
-    image_files = glob('{}/{}_*.png'.format(SETTINGS.OutputImageDir, SETTINGS.OutputPrefix))
+    # moviepy is only needed (and slow to import) for GIF output
+    from moviepy.editor import ImageSequenceClip
+
+    # Get a list of all rendered images ordered by frame number
+    image_files = _sorted_frame_files()
     # Combine images into GIF file using moviepy
-    ImageSequenceClip(sorted(image_files),
+    ImageSequenceClip(image_files,
                       fps=SETTINGS.RenderFPS).write_gif('{}/{}.gif'.format(SETTINGS.OutputMovieDir,
                                                                            SETTINGS.OutputPrefix))
 
 
-def render_scene_to_mp4(scene, frame_ids=None):
-    """ Creates an MP4 movie using 'ffmpeg' from n > 1 rendered images"""
+def render_scene_to_mp4(scene, frame_ids=None, worker_init=None, worker_args=(), encode=True):
+    """ Creates an MP4 movie using 'ffmpeg' from n > 1 rendered images.
+    When rendering with a pool, `worker_init(*worker_args)` is called once in each
+    worker before it renders its first frame (i.e. to attach to shared data).
+    With `encode=False` only the images are rendered (i.e. a part of the frames),
+    encode_mp4() combines them into the movie afterwards.
+    Returns False if existing output stops the render. """
 
-    if _check_output_file_exists("mp4"):
+    if encode and _check_output_file_exists("mp4"):
         logger.error('["%s"] - Not simulating; output mp4 file already exists.',
                      sys._getframe().f_code.co_name)
-        return
+        return False
 
-    if _check_rendered_images():
+    if _check_rendered_images(frame_ids):
         logger.error('["%s"] - Not simulating; output image file(s) already exist.',
                      sys._getframe().f_code.co_name)
-        return
+        return False
+
+    if _uses_pipeline(encode):
+        # Build, render and encode the frames concurrently
+        from pypovray import pipeline
+        pipeline.render_scene_to_mp4(scene, _frame_id_list(frame_ids))
+        return True
 
     # Render the scenes (creates PNG images in the SETTINGS.OutputImageDir folder)
-    _render_scene(scene, frame_ids)
+    _render_scene(scene, frame_ids, worker_init, worker_args)
 
     # Combine the frames into a movie
+    if encode:
+        _run_ffmpeg()
+    return True
+
+
+def encode_mp4():
+    """ Combines the rendered images into an MP4 movie using 'ffmpeg', i.e. after the
+    frames were rendered in parts with render_scene_to_mp4(..., encode=False).
+    Returns False if the existing movie stops the encoding. """
+    if _check_output_file_exists("mp4"):
+        logger.error('["%s"] - Not encoding; output mp4 file already exists.',
+                     sys._getframe().f_code.co_name)
+        return False
     _run_ffmpeg()
+    return True
 
 
-def _render_scene(scene, frame_ids=None):
-    """ Renders the scene to multiple output PNG files for use in animations """
+def renders_with_pool(encode=True):
+    """ Returns True if render_scene_to_mp4(..., encode=`encode`) renders the frames with
+    a pool of workers (and runs its worker_init) using the current settings """
+    return bool(SETTINGS.UsePool) and not _uses_pipeline(encode)
 
-    # Clear 'images' folder containing previously rendered frames
-    _remove_folder_contents(SETTINGS.OutputImageDir)
 
-    # Calculate the time per frame (i.e. evaluate expression from config file)
-    if frame_ids:
-        logger.debug('["%s"] - Specific frames given, rendering part of the simulation..',
-                     sys._getframe().f_code.co_name)
-        nframes = len(frame_ids)
-        id_list = frame_ids
-    else:
-        logger.debug('["%s"] - No specific frames given, rendering complete simulation..',
-                     sys._getframe().f_code.co_name)
-        nframes = ceil(eval(SETTINGS.NumberFrames))
-        id_list = range(nframes)
+def _uses_pipeline(encode):
+    """ Returns True if render_scene_to_mp4 builds, renders and encodes the frames in the pipeline """
+    # A resumed render only encodes the new frames in the pipeline, encode all images afterwards
+    return bool(SETTINGS.UsePipeline) and encode and not _sorted_frame_files()
 
-    # Render each scene using a thread pool or single-threaded
-    if util.strtobool(SETTINGS.UsePool):
-        scene_flist = [scene] * nframes
 
-        # Render each scene, using a thread pool
-        with Pool(int(SETTINGS.workers)) as p:
-            p.map(render_scene_to_png, scene_flist, id_list)
+def _render_scene(scene, frame_ids=None, worker_init=None, worker_args=()):
+    """ Renders the scene to multiple output PNG files for use in animations """
+
+    # Previously rendered frames are removed or kept by _check_rendered_images
+    id_list = _frame_id_list(frame_ids)
+    if _on_existing() == 'resume':
+        id_list = [frame_id for frame_id in id_list
+                   if not os.path.exists(_create_frame_file_name(frame_id))]
+        logger.info('["%s"] - resuming, %d frames left to render',
+                    sys._getframe().f_code.co_name, len(id_list))
+
+    # Render each scene using a process pool or single-threaded
+    if SETTINGS.UsePool:
+        # The scene function is handed to each worker once, tasks are only frame numbers
+        with Pool(SETTINGS.Workers, initializer=_init_pool_worker,
+                  initargs=(scene, get_settings(), worker_init, worker_args)) as p:
+            p.map(_render_pool_frame, id_list, chunksize=1)
 
     else:
         for frame_id in id_list:
             render_scene_to_png(scene, frame_id)
 
 
+def _init_pool_worker(scene, settings, worker_init, worker_args):
+    """ Stores the scene function and settings in the worker and runs the optional worker_init """
+    global _WORKER_SCENE
+    _WORKER_SCENE = scene
+    use_config(settings)
+    if worker_init:
+        worker_init(*worker_args)
+
+
+def _render_pool_frame(frame_id):
+    """ Renders a single frame in a pool worker """
+    render_scene_to_png(_WORKER_SCENE, frame_id)
+
+
+def _frame_id_list(frame_ids=None):
+    """ Returns the frame numbers to render, all frames if none are given """
+    # Calculate the time per frame (i.e. evaluate expression from config file)
+    if frame_ids:
+        logger.debug('["%s"] - Specific frames given, rendering part of the simulation..',
+                     sys._getframe().f_code.co_name)
+        return frame_ids
+
+    logger.debug('["%s"] - No specific frames given, rendering complete simulation..',
+                 sys._getframe().f_code.co_name)
+    return range(ceil(SETTINGS.NumberFrames))
+
+
 def _remove_folder_contents(folder, match=None):
     """ Cleans up folder contents """
     for the_file in os.listdir(folder):
@@ -138,73 +259,214 @@ def _remove_folder_contents(folder, match=None):
 
 def _render_frame(scene, frame_id):
     """ Renders a single frame """
-    #logger.debug("Step %d, in seconds: %f.", frame_id, frame_id / eval(SETTINGS.NumberFrames))
+    #logger.debug("Step %d, in seconds: %f.", frame_id, frame_id / SETTINGS.NumberFrames)
     frame_file = _create_frame_file_name(frame_id)
-    scene.render(frame_file,
-                 width=SETTINGS.ImageWidth,
-                 height=SETTINGS.ImageHeight,
-                 antialiasing=SETTINGS.AntiAlias,
-                 #show_window=util.strtobool(SETTINGS.ShowWindow),
-                 quality=SETTINGS.Quality,
-                 remove_temp=util.strtobool(SETTINGS.RemoveTempFiles)
-                 )
+    with open(frame_file, 'wb') as frame_png:
+        frame_png.write(render_scene_to_bytes(scene))
 
 
-def _create_tmp_folder():
-    tmp_folder = mkdtemp()
-    os.chdir(tmp_folder)
-    logger.debug('["%s"] - tmp_folder: %s', sys._getframe().f_code.co_name, tmp_folder)
-    return tmp_folder
+def _povray_command(pov_file='-', frame_file='-'):
+    """ Builds the POV-Ray command line rendering `pov_file` to the PNG `frame_file`
+    using the same options as the vapory renderer. By default the scene is read from
+    stdin and the image is written to stdout. """
+    return [POVRAY_BINARY, '+I{}'.format(pov_file),
+            '+H{}'.format(SETTINGS.ImageHeight),
+            '+W{}'.format(SETTINGS.ImageWidth),
+            '+Q{}'.format(SETTINGS.Quality),
+            '+A{}'.format(SETTINGS.AntiAlias),
+            '-D', 'Output_File_Type=N', '+O{}'.format(frame_file)]
+
+
+def _scene_string(scene):
+    """ Returns the POV-Ray code for the scene, the camera is corrected for the
+    aspect ratio of the image like vapory does when rendering """
+    scene.camera = scene.camera.add_args(['right', [1.0 * SETTINGS.ImageWidth / SETTINGS.ImageHeight, 0, 0]])
+    return str(scene)
 
 
 def _create_frame_file_name(frame):
     output_file = '{}/{}_{}.png'.format(SETTINGS.OutputImageDir,
-                                        SETTINGS.OutputPrefix, str(round(frame, 2)).zfill(3))
+                                        SETTINGS.OutputPrefix, str(round(frame, 2)).zfill(FRAME_DIGITS))
     logger.debug('["%s"] - output file: %s', sys._getframe().f_code.co_name, output_file)
     return output_file
 
 
+def _frame_number(frame_file):
+    """ Returns the frame number encoded in a file name created by _create_frame_file_name """
+    number = os.path.basename(frame_file)[len(SETTINGS.OutputPrefix) + 1:-len('.png')]
+    return float(number)
+
+
+def _sorted_frame_files():
+    """ Lists all rendered images ordered by their (numeric) frame number, this
+    ordering is independent of the amount of digits in the file names """
+    image_files = glob('{}/{}_*.png'.format(SETTINGS.OutputImageDir, SETTINGS.OutputPrefix))
+    return sorted(image_files, key=_frame_number)
+
+
+def _on_existing():
+    """ Returns the OnExisting setting (one of ON_EXISTING, see load_settings) """
+    return SETTINGS.OnExisting
+
+
+def _existing_output_action(message):
+    """ Returns what to do with existing output (see ON_EXISTING). With OnExisting = ask
+    the user is asked to overwrite, without a terminal to ask the output is kept. """
+    action = _on_existing()
+    if action != 'ask':
+        return action
+    if not sys.stdin or not sys.stdin.isatty():
+        logger.warning('["%s"] - %s and there is no terminal to ask to overwrite',
+                       sys._getframe().f_code.co_name, message)
+        return 'fail'
+    overwrite = str(input("{}, do you want to overwrite? (y/n): ".format(message)))
+    return 'overwrite' if overwrite.lower() == "y" else 'fail'
+
+
 def _check_output_file_exists(extension):
-    """ Informs about existing output file before creating a new one
-    and offers to overwrite the existing file. """
+    """ Informs about existing output file before creating a new one and depending on
+    the OnExisting setting offers to overwrite, removes or keeps the existing file.
+    A resumed render replaces the file. """
     output_file = '{}/{}.{}'.format(SETTINGS.OutputMovieDir,
                                     SETTINGS.OutputPrefix, extension)
-    remove_file = "n"
     if os.path.exists(output_file):
-        remove_file = str(input("The file '%s' already exists, do you want to overwrite? (y/n): " % output_file))
-    if remove_file.lower() == "y":
-        os.remove(output_file)
+        if _existing_output_action("The file '{}' already exists".format(output_file)) != 'fail':
+            os.remove(output_file)
 
     return os.path.exists(output_file)
 
 
-def _check_rendered_images():
-    """ Informs about existing output image files before rendering
-    and offers to overwrite the existing file. """
-    remove_files = "n"
-    if os.listdir(SETTINGS.OutputImageDir):
-        if any(SETTINGS.OutputPrefix in fname for fname in os.listdir(SETTINGS.OutputImageDir)):
-            remove_files = str(input("Image files already exists in %s, " % SETTINGS.OutputImageDir +
-                                     "do you want to overwrite? (y/n): "))
-    if remove_files.lower() == "y":
+def _check_rendered_images(frame_ids=None):
+    """ Informs about existing output image files before rendering and depending on the
+    OnExisting setting offers to overwrite, removes or keeps (resume) the existing files.
+    When a part of the frames is rendered only the images of these frames are checked
+    (so chunks can be rendered into the same folder) and overwriting only removes them.
+    Returns True if the existing images stop the render. """
+    if frame_ids is None:
+        existing = any(SETTINGS.OutputPrefix in fname for fname in os.listdir(SETTINGS.OutputImageDir))
+    else:
+        existing = any(os.path.exists(_create_frame_file_name(frame_id)) for frame_id in frame_ids)
+    if not existing:
+        return False
+
+    action = _existing_output_action("Image files already exists in {}".format(SETTINGS.OutputImageDir))
+    if action == 'overwrite' and frame_ids is None:
         _remove_folder_contents(SETTINGS.OutputImageDir, match=SETTINGS.OutputPrefix)
+    elif action == 'overwrite':
+        for frame_id in frame_ids:
+            if os.path.exists(_create_frame_file_name(frame_id)):
+                os.unlink(_create_frame_file_name(frame_id))
+
+    return action == 'fail'
+
+
+def _frame_segments(frame_numbers, gop_size, workers):
+    """ Splits the (sorted) frame numbers in segments for parallel encoding. The segments
+    follow the order of the frames, not their numbering, so frames with gaps (i.e. every
+    5th frame) are encoded in the same segments as consecutive frames. Each segment (except
+    the last one) is a whole number of GOPs long so that the keyframes of the joined movie
+    are placed at a regular interval. """
+    if not len(frame_numbers):
+        return []
+    # Divide the frames evenly over the workers, rounded up to whole GOPs
+    gops = ceil(len(frame_numbers) / gop_size)
+    segment_size = ceil(gops / max(workers, 1)) * gop_size
+    return [list(frame_numbers[start:start + segment_size])
+            for start in range(0, len(frame_numbers), segment_size)]
+
+
+def _segment_input(segment, segment_file):
+    """ Returns the image sequence pattern and start number of the images of a segment.
+    The images of a segment with gaps in its numbering are linked (or copied) in order
+    to a folder next to the segment file, ffmpeg reads them as consecutive images. """
+    pattern = '{}_%0{}d.png'.format(SETTINGS.OutputPrefix, FRAME_DIGITS)
+    if segment[-1] - segment[0] == len(segment) - 1:
+        return os.path.join(SETTINGS.OutputImageDir, pattern), int(segment[0])
+
+    folder = os.path.splitext(segment_file)[0]
+    os.makedirs(folder, exist_ok=True)
+    for index, frame in enumerate(segment):
+        image = os.path.abspath(_create_frame_file_name(frame))
+        link = os.path.join(folder, pattern % index)
+        try:
+            os.symlink(image, link)
+        except OSError:
+            shutil.copyfile(image, link)
+    return os.path.join(folder, pattern), 0
+
 
-    return any(SETTINGS.OutputPrefix in fname for fname in os.listdir(SETTINGS.OutputImageDir))
+def _encode_segment(segment, segment_file, gop_size):
+    """ Encodes one segment of frames to an MP4 file using the
+    h.x264 codec, every GOP starts with a keyframe """
+    # Keyframe interval expressed in output frames
+    import ffmpy
+
+    keyint = max(int(round(gop_size * SETTINGS.MovieFPS / SETTINGS.RenderFPS)), 1)
+    images, start_number = _segment_input(segment, segment_file)
+    ff = ffmpy.FFmpeg(
+        global_options='-y -loglevel warning',
+        # Input is the numbered image sequence starting at the first frame of the segment
+        inputs={images: '-framerate {} -start_number {}'.format(SETTINGS.RenderFPS, start_number)},
+        outputs={segment_file:
+                     '-t {} -c:v libx264 -r {} -crf 2 -g {} -keyint_min {} -sc_threshold 0 '
+                     '-pix_fmt yuv420p'.format(len(segment) / SETTINGS.RenderFPS,
+                                               SETTINGS.MovieFPS, keyint, keyint)}
+    )
+    logger.debug('["%s"] - ffmpeg command: "%s"', sys._getframe().f_code.co_name, ff.cmd)
+    ff.run()
+    return segment_file
 
 
 def _run_ffmpeg():
-    """ Builds the ffmpeg command to render an MP4 movie file using the
-    h.x264 codex and yuv420p format """
+    """ Builds the ffmpeg commands to render an MP4 movie file using the
+    h.x264 codex and yuv420p format. The frames are encoded as separate
+    segments in parallel ffmpeg processes which are joined afterwards using
+    the concat demuxer without re-encoding. """
+    frame_numbers = [int(_frame_number(frame_file)) for frame_file in _sorted_frame_files()]
+    if not frame_numbers:
+        logger.error('["%s"] - Not encoding; no rendered images found in %s',
+                     sys._getframe().f_code.co_name, SETTINGS.OutputImageDir)
+        return
+
+    gop_size = SETTINGS.GOPSize
+    workers = SETTINGS.EncodeWorkers or os.cpu_count()
+    segments = _frame_segments(frame_numbers, gop_size, workers)
+
+    tmp_folder = mkdtemp()
+    segment_files = _segment_file_names(tmp_folder, len(segments))
+    logger.info('["%s"] - encoding %d frames in %d segments using %d workers',
+                sys._getframe().f_code.co_name, len(frame_numbers), len(segments), workers)
+
+    # Each segment runs in its own ffmpeg process, the threads only wait for them
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_encode_segment, segments, segment_files, [gop_size] * len(segments)))
+
+    _concat_segments(segment_files, tmp_folder)
+
+
+def _segment_file_names(tmp_folder, nsegments):
+    """ Creates the (ordered) file names for the encoded segments """
+    return [os.path.join(tmp_folder, 'segment_{}.mp4'.format(str(index).zfill(FRAME_DIGITS)))
+            for index in range(nsegments)]
+
+
+def _concat_segments(segment_files, tmp_folder):
+    """ Joins the encoded segments into the output movie using the concat
+    demuxer (stream copy, no re-encoding) and removes the temporary folder """
+    import ffmpy
+
+    concat_list = os.path.join(tmp_folder, 'segments.txt')
+    with open(concat_list, 'w') as segment_list:
+        segment_list.writelines("file '{}'\n".format(segment_file) for segment_file in segment_files)
+
     ff = ffmpy.FFmpeg(
-        # Input is a pattern for all image files ordered by number (padded)
-        inputs={'': '-framerate {} -pattern_type glob -i {}/{}_*.png'.format(
-            SETTINGS.RenderFPS,
-            SETTINGS.OutputImageDir,
-            SETTINGS.OutputPrefix)},
+        inputs={concat_list: '-f concat -safe 0'},
         outputs={'{}/{}.mp4'.format(SETTINGS.OutputMovieDir,
-                                    SETTINGS.OutputPrefix):
-                     '-c:v libx264 -r {} -crf 2 -pix_fmt yuv420p -loglevel warning'.format(SETTINGS.MovieFPS)}
+                                    SETTINGS.OutputPrefix): '-c copy -loglevel warning'}
     )
     # Run ffmpeg and create output movie file
     logger.info('["%s"] - ffmpeg command: "%s"', sys._getframe().f_code.co_name, ff.cmd)
     ff.run()
+
+    if SETTINGS.RemoveTempFiles:
+        shutil.rmtree(tmp_folder, "ignore_errors")
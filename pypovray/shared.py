@@ -0,0 +1,77 @@
+"""
+Module for sharing NumPy arrays between the render process and its pool
+workers using shared memory. The owning process publishes the arrays once,
+workers attach to them using the (small) manifest without copying the data.
+"""
+
+from multiprocessing import shared_memory
+import numpy as np
+from pypovray import logger
+
+
+class SharedArrays(object):
+    """ A named collection of NumPy arrays stored in shared memory blocks """
+
+    def __init__(self):
+        """ Creates an empty collection owned by the current process """
+        self.arrays = {}
+        self.blocks = {}
+        self.owner = True
+
+    def publish(self, name, array):
+        """ Copies `array` into a new shared memory block and returns the shared view """
+        array = np.ascontiguousarray(array)
+        # Zero sized blocks are not allowed
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        shared[...] = array
+
+        self.blocks[name] = block
+        self.arrays[name] = shared
+        return shared
+
+    @property
+    def manifest(self):
+        """ Describes the shared arrays, this is all a worker needs to attach to them """
+        return {name: (self.blocks[name].name, array.shape, array.dtype.str)
+                for name, array in self.arrays.items()}
+
+    @classmethod
+    def attach(cls, manifest):
+        """ Attaches to the arrays described by the `manifest` of the owning process """
+        shared = cls()
+        shared.owner = False
+        for name, (block_name, shape, dtype) in manifest.items():
+            # Workers share the resource tracker of the owner, which removes the blocks
+            block = shared_memory.SharedMemory(name=block_name)
+            shared.blocks[name] = block
+            shared.arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        logger.debug('Attached to %d shared arrays', len(shared.arrays))
+        return shared
+
+    def close(self):
+        """ Detaches from all blocks, the arrays can not be used afterwards """
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+
+    def unlink(self):
+        """ Detaches and removes the blocks (only done by the owner) """
+        blocks = list(self.blocks.values())
+        self.close()
+        if self.owner:
+            for block in blocks:
+                block.unlink()
+        self.blocks = {}
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.unlink()
@@ -0,0 +1,54 @@
+"""
+Shared fixtures of the tests: the tests run from the project folder (the pdb files are read from
+there) with the settings of the default configuration file.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import os
+import re
+import sys
+import hashlib
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pypovray import DEFAULT_CONFIG, use_config
+from pypovray.config import load_settings
+
+# Frames of the ethanol animation
+ANIMATION_FRAMES = 700
+
+# The include file of the static objects is written to the temporary folder of the system
+INCLUDE_FOLDER = re.compile(r'#include "[^"]*[\\/]')
+
+# Used instead of POV-Ray, the image of the echo is the scene it reads from stdin
+POVRAY_ECHO = [sys.executable, "-c", "import sys; sys.stdout.buffer.write(sys.stdin.buffer.read())"]
+
+
+# Functions
+def scene_hash(scene):
+    """ Returns the sha1 of the POV-Ray code of a scene without the folder of its include file """
+    text = INCLUDE_FOLDER.sub('#include "', str(scene))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+@pytest.fixture(autouse=True)
+def project_folder(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def settings():
+    return use_config(load_settings(os.path.join(ROOT, DEFAULT_CONFIG), environ={}))
+
+
+@pytest.fixture(scope="session")
+def reference_hashes():
+    """ The hashes of the frames of the ethanol animation made in order (tests/data/frames.sha1) """
+    with open(os.path.join(ROOT, "tests", "data", "frames.sha1")) as hashes:
+        return [line.split()[1] for line in hashes if line.strip()]
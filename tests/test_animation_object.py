@@ -0,0 +1,39 @@
+"""
+Tests of the sorted keyframe tracks of the animation objects (see animation_object.Track).
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+from animation_object import Track
+
+
+# Functions
+def test_keyframes_sorted_by_frame():
+    track = Track([(10, "b"), (0, "a"), (10, "c")])
+    track.add([(5, "d"), (10, "e")])
+    # Keyframes with the same frame keep the order they were added in
+    assert list(track) == [(0, "a"), (5, "d"), (10, "b"), (10, "c"), (10, "e")]
+    assert len(track) == 5 and track[1] == (5, "d")
+
+
+def test_lookup():
+    track = Track([(0, "a"), (5, "b"), (10, "c"), (10, "d")])
+    # The keyframe that ends the segment of the step
+    assert [track.index(step) for step in (-1, 0, 3, 5, 7, 10, 11)] == [0, 0, 1, 1, 2, 2, 4]
+    # The last keyframe at or before the step, the first keyframe before the track starts
+    assert [track.value(step) for step in (-1, 0, 3, 5, 10, 11)] == ["a", "a", "a", "b", "d", "d"]
+
+
+def test_events_and_cumulative():
+    track = Track([(0, [0, 0, 0]), (20, [1, 2, 3, True, "partner"]), (10, [1, 0, 0]), (30, [0, 0, 1])])
+    # Keyframes with data behind the position (i.e. joins)
+    assert list(track.events) == [2]
+    assert list(track.events_before(2)) == [] and list(track.events_before(3)) == [2]
+    assert track.cumulative(2) == [2, 2, 3] and track.cumulative(3) == [2, 2, 4]
+    # Adding keyframes updates the events and sums
+    track.add([(5, [0, 0, 1, False, "partner"])])
+    assert list(track.events) == [1, 3]
+    assert track.cumulative(3) == [2, 2, 4]
@@ -0,0 +1,54 @@
+"""
+Tests of the command line: the frames, chunks and render qualities of the arguments.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import argparse
+import pytest
+from project_cli import QUALITIES, parse_arguments, parse_chunk, parse_frames, select_frames
+
+
+# Functions
+def test_parse_frames():
+    assert parse_frames("3") == [3]
+    assert parse_frames("0:5,8,20:30:4") == [0, 1, 2, 3, 4, 8, 20, 24, 28]
+    for text in ("", "a:5", "1:2:3:4"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_frames(text)
+
+
+def test_parse_chunk():
+    assert parse_chunk("2/4") == (2, 4)
+    for text in ("0/4", "5/4", "2", "a/b"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_chunk(text)
+
+
+def test_select_frames():
+    steps = range(700)
+    args = parse_arguments(["--frames", "10:20,0:5,12", "--stride", "3"])
+    # Sorted and without doubles before the stride is taken
+    assert select_frames(args, steps) == [0, 3, 11, 14, 17]
+    assert select_frames(parse_arguments([]), steps) == list(steps)
+    with pytest.raises(ValueError, match="not in the animation"):
+        select_frames(parse_arguments(["--frames", "690:710"]), steps)
+
+
+def test_settings_of_arguments():
+    args = parse_arguments(["--quality", "preview", "--workers", "1", "--chunk", "2/3", "--resume",
+                            "--set", "ImageWidth=640"])
+    assert args.chunk == (2, 3)
+    # The other options override the quality, the values of --set are converted with the settings
+    assert args.overrides == dict(QUALITIES["preview"], ImageWidth="640", Workers=1, UsePool=False,
+                                  OnExisting="resume")
+
+
+@pytest.mark.parametrize("arguments", [["--chunk", "3/2"], ["--overwrite", "--resume"],
+                                       ["--workers", "0"], ["--quality", "best"]])
+def test_invalid_arguments(arguments):
+    with pytest.raises(SystemExit):
+        parse_arguments(arguments)
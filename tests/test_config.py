@@ -0,0 +1,86 @@
+"""
+Tests of load_settings: configuration files of the first version load with the defaults of the
+newer settings, invalid and missing settings are rejected.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import pytest
+from pypovray.config import SETTING_DEFAULTS, load_settings
+
+# The settings of the first version of the configuration file
+CONFIG = """[GENERAL]
+AppLocation = {location}
+OutputPrefix = simulation
+OutputImageDir = %(AppLocation)s/images
+OutputMovieDir = %(AppLocation)s/movies
+LogLevel = INFO
+
+[SCENE]
+ImageWidth = 800
+ImageHeight = 600
+Quality = 9
+AntiAlias = 0.01
+
+[MULTIPROCESSING]
+UsePool = True
+Workers = 4
+
+[ANIMATION]
+Duration = 10
+RenderFPS = 24
+FrameTime = 0.04
+NumberFrames = 240
+MovieFPS = 30
+
+[POVRAY]
+ShowWindow = False
+RemoveTempFiles = True
+"""
+
+
+# Functions
+@pytest.fixture()
+def config_file(tmp_path):
+    file_name = tmp_path / "default.ini"
+    file_name.write_text(CONFIG.format(location=tmp_path))
+    return str(file_name)
+
+
+def test_defaults_of_newer_settings(config_file, tmp_path):
+    settings = load_settings(config_file, environ={})
+    assert settings.Workers == 4 and settings.UsePool is True
+    assert settings.OnExisting == "ask"
+    assert settings.GOPSize == 20 and settings.CheckpointInterval == 50
+    assert settings.UsePipeline is False and settings.TraceCategories == ""
+    # Defaults refer to the other settings of their section
+    assert settings.ProfileDir == "{}/profiles".format(tmp_path)
+    assert set(SETTING_DEFAULTS) <= set(settings.as_dict())
+
+
+def test_overrides_of_newer_settings(config_file):
+    settings = load_settings(config_file, overrides={"GOPSize": "10"}, environ={"PYPOVRAY_ONEXISTING": "resume"})
+    assert settings.GOPSize == 10
+    assert settings.OnExisting == "resume"
+
+
+def test_invalid_on_existing(config_file):
+    with pytest.raises(ValueError, match="OnExisting"):
+        load_settings(config_file, overrides={"OnExisting": "keep"}, environ={})
+
+
+def test_invalid_value(config_file):
+    with pytest.raises(ValueError, match="Workers"):
+        load_settings(config_file, overrides={"Workers": "four"}, environ={})
+
+
+def test_missing_setting(config_file):
+    with open(config_file) as config:
+        text = config.read()
+    with open(config_file, "w") as config:
+        config.write(text.replace("MovieFPS = 30\n", ""))
+    with pytest.raises(KeyError, match="MovieFPS"):
+        load_settings(config_file, environ={})
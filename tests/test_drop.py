@@ -0,0 +1,46 @@
+"""
+Tests of the droplet surface revolved from the droplet line (see pypovray.drop.droplet3d).
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import numpy as np
+import pytest
+from pypovray.drop import _profile, droplet, droplet3d
+
+
+# Functions
+@pytest.mark.parametrize("radius, height, gamma", [(3, 2, 1), (2, 1.5, 0.5)])
+def test_ring_spacing(radius, height, gamma):
+    positions, normals = droplet3d(radius, height, gamma, size=10, apl=0.5)
+    _, spacing = _profile(radius, height, gamma, 10, 0, 0.5)
+
+    # Every point of the right half of the droplet line is a ring around the y-axis
+    line = droplet(radius, height, gamma, size=10, apl=0.5)[0::2]
+    distance = np.hypot(positions[:, 0], positions[:, 2])
+    rings = np.unique(np.column_stack((np.round(distance, 6), np.round(positions[:, 1], 6))), axis=0,
+                      return_inverse=True, return_counts=True)
+    assert len(rings[0]) == len(line)
+    assert np.allclose(np.sort(rings[0][:, 0]), np.sort(np.round(line[:, 0], 6)))
+
+    # The number of lipids follows the circumference, so the lipids on a ring keep the spacing of the line
+    ring_radius, counts = rings[0][:, 0], rings[2]
+    assert np.array_equal(counts, np.maximum(np.rint(2 * np.pi * ring_radius / spacing), 1))
+    for ring in np.flatnonzero(counts >= 10):
+        lipids = positions[rings[1].ravel() == ring]
+        gaps = np.linalg.norm(lipids[1:] - lipids[:-1], axis=1)
+        assert np.allclose(gaps, spacing, rtol=0.05)
+
+    assert np.allclose(np.linalg.norm(normals, axis=1), 1)
+
+
+def test_flat_membrane():
+    positions, normals = droplet3d(3, 2, 1, size=10, shift=1.5, offset=[1, 2, 3], apl=0.5)
+    # The lipids of the membrane outside the droplet point down
+    flat = np.hypot(positions[:, 0] - 1, positions[:, 2] - 3) > 5
+    assert flat.any()
+    assert np.allclose(positions[flat, 1], 3.5)
+    assert np.allclose(normals[flat], [0, -1, 0])
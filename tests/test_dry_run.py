@@ -0,0 +1,57 @@
+"""
+Tests of the dry run: frames after a gap have the figures of the frames made in order, the frames
+are divided in chunks with about the same render time.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import numpy as np
+import pytest
+from conftest import ANIMATION_FRAMES
+from project_main import get_animation_data
+from project_engine import AnimationEngine
+from project_dry_run import FIELDS, DryRunReport, dry_run
+
+
+# Functions
+def make_report(spheres):
+    """ Returns a report of frames with the number of spheres (the other figures are 0) """
+    figures = np.zeros((len(spheres), len(FIELDS)), dtype=np.int64)
+    figures[:, FIELDS.index("step")] = np.arange(len(spheres))
+    figures[:, FIELDS.index("spheres")] = spheres
+    return DryRunReport(figures, [], 0)
+
+
+def test_frames_after_gaps():
+    frames = list(range(0, 250, 7))
+    in_order = dry_run(AnimationEngine(get_animation_data(False), ANIMATION_FRAMES), range(250))
+    engine = AnimationEngine(get_animation_data(False), ANIMATION_FRAMES)
+    report = dry_run(engine, frames, checkpoint_interval=50)
+
+    assert np.array_equal(report.figures, in_order.figures[frames])
+    # The checkpoints are made first, the frames are not counted by the tracer of the engine
+    assert engine.checkpoints is not None
+    assert engine.tracer.counters()[0].size == 0
+
+
+@pytest.mark.parametrize("chunks", [1, 3, 7])
+def test_plan(chunks):
+    spheres = np.random.default_rng(1).integers(0, 400, 300)
+    spheres[100:120] = 5000
+    plan = make_report(spheres).plan(chunks)
+
+    # Following frames, every frame in one chunk
+    assert len(plan) == chunks
+    assert [step for chunk in plan for step in chunk] == list(range(len(spheres)))
+    weights = spheres + 1.0
+    chunk_weights = [weights[chunk].sum() for chunk in plan]
+    assert max(chunk_weights) - min(chunk_weights) <= 2 * weights.max()
+
+
+def test_plan_without_frames():
+    assert make_report(np.zeros(0, dtype=int)).plan(3) == [[], [], []]
+    # Fewer frames than chunks give fewer chunks
+    assert make_report([10, 10]).plan(4) == [[0], [1]]
@@ -0,0 +1,111 @@
+"""
+Regression tests of the frames of the AnimationEngine: frames made in order, from a cleared scene
+cache, by engines side by side and in any order (with and without checkpoints) are byte-identical
+to the reference frames.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import os
+import pickle
+import random
+import pytest
+from conftest import ANIMATION_FRAMES, ROOT, scene_hash
+from pypovray import DEFAULT_CONFIG, pypovray, use_config
+from pypovray.config import load_settings
+from project_main import get_animation_data
+from project_engine import AnimationEngine
+from project_checkpoints import CheckpointStore
+from project_trace import COUNTERS
+
+# Steps around the splits and joins of the animation and a few steps in between
+STEPS = [0, 74, 75, 76, 89, 90, 91, 150, 189, 204, 300, 345, 360, 425, 490, 555, 640, 699]
+
+
+# Functions
+def test_frames_in_order(reference_hashes):
+    engine = AnimationEngine(get_animation_data(False), ANIMATION_FRAMES)
+    hashes = [scene_hash(engine.frame(step)) for step in range(ANIMATION_FRAMES)]
+    assert hashes == reference_hashes
+
+
+def test_frames_without_scene_cache(reference_hashes):
+    engine = AnimationEngine(get_animation_data(False), ANIMATION_FRAMES)
+    for step in range(STEPS[-1] + 1):
+        # The code of every object is made again at the steps, the other frames use the cache
+        if step in STEPS:
+            engine.scene_cache.clear()
+        assert scene_hash(engine.frame(step)) == reference_hashes[step], step
+
+
+def test_engines_side_by_side(reference_hashes):
+    animation_objects = get_animation_data(False)
+    first = AnimationEngine(animation_objects, ANIMATION_FRAMES)
+    second = AnimationEngine(animation_objects, ANIMATION_FRAMES)
+    for step in range(ANIMATION_FRAMES):
+        assert scene_hash(first.frame(step)) == reference_hashes[step], step
+        # Engines made from the same animation data do not share their state
+        if step == 300:
+            second.make_checkpoints(50)
+        if step % 100 == 50:
+            second.reset()
+
+
+def test_frames_stateless(reference_hashes):
+    engine = AnimationEngine(get_animation_data(False), ANIMATION_FRAMES)
+    for step in reversed(STEPS):
+        assert scene_hash(engine.frame_stateless(step)) == reference_hashes[step], step
+
+
+def test_frames_from_checkpoints(reference_hashes):
+    engine = AnimationEngine(get_animation_data(False), ANIMATION_FRAMES)
+    store = engine.make_checkpoints(50)
+    engine.checkpoints = CheckpointStore.from_array(store.to_array().copy())
+
+    steps = STEPS + random.Random(1).sample(range(ANIMATION_FRAMES), 20)
+    random.Random(2).shuffle(steps)
+    for step in steps:
+        assert scene_hash(engine.make_scene(step)) == reference_hashes[step], step
+
+
+def test_replayed_frames_are_not_counted():
+    engine = AnimationEngine(get_animation_data(False), ANIMATION_FRAMES)
+    engine.make_checkpoints(50)
+    for step in (300, 120, 455):
+        engine.make_scene(step)
+    steps, counts = engine.tracer.counters()
+    assert steps.tolist() == [300, 120, 455]
+    assert counts.shape == (3, len(COUNTERS))
+
+
+def test_worker_of_shared_state(reference_hashes):
+    engine = AnimationEngine(get_animation_data(False), ANIMATION_FRAMES)
+    engine.make_checkpoints(50)
+    with engine.share_state() as shared_state:
+        # The worker gets the engine without its timeline and attaches to the shared arrays
+        worker = pickle.loads(pickle.dumps(engine))
+        assert worker.timeline is None and worker.checkpoints is None
+        worker.init_worker(shared_state.manifest)
+        for step in STEPS:
+            assert scene_hash(worker.make_scene(step)) == reference_hashes[step], step
+        worker.shared_state.close()
+
+
+@pytest.mark.parametrize("use_pool, shared", [("True", True), ("False", False)])
+def test_render_shares_state_with_pool(settings, monkeypatch, use_pool, shared):
+    manifests = []
+    monkeypatch.setattr(pypovray, "render_scene_to_mp4",
+                        lambda scene, frames, worker_init, worker_args, encode: manifests.extend(worker_args))
+    render_settings = load_settings(os.path.join(ROOT, DEFAULT_CONFIG), environ={},
+                                    overrides={"UsePool": use_pool, "UsePipeline": "False"})
+    try:
+        engine = AnimationEngine(get_animation_data(False), ANIMATION_FRAMES)
+        engine.render([0, 1], render_settings)
+    finally:
+        use_config(settings)
+    # Serial renders make the frames in this process, without shared memory
+    assert (manifests[0] is not None) == shared
+    assert engine.shared_state is None
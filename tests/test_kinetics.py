@@ -0,0 +1,51 @@
+"""
+Tests of the stochastic timing of the enzymes: the turnovers follow the Michaelis-Menten rate and
+the substrate is served in order of arrival.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import numpy as np
+import pytest
+from project_kinetics import METHODS, schedule_reactions, simulate_enzyme
+
+
+# Functions
+@pytest.mark.parametrize("method", METHODS)
+def test_michaelis_menten_rate(method):
+    vmax, km, count = 1.0, 10.0, 200
+    # All substrate arrives at once, turning over the molecule w of w waiting takes (km + w) / (vmax * w)
+    expected = sum((km + waiting) / (vmax * waiting) for waiting in range(1, count + 1))
+    generator = np.random.default_rng(1)
+    durations = [simulate_enzyme(np.zeros(count), vmax, km, method=method, tau=0.25, generator=generator).max()
+                 for _ in range(50)]
+    assert np.mean(durations) == pytest.approx(expected, rel=0.05)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_served_in_order_of_arrival(method):
+    generator = np.random.default_rng(2)
+    arrivals = generator.integers(0, 300, 500).astype(float)
+    turnovers = simulate_enzyme(arrivals, 0.5, 20.0, method=method, generator=generator)
+
+    assert np.all(turnovers >= arrivals)
+    order = np.argsort(arrivals, kind="stable")
+    assert np.all(np.diff(turnovers[order]) >= 0)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError, match="unknown method"):
+        simulate_enzyme([0, 1], 1.0, 1.0, method="euler")
+
+
+def test_schedule_reactions():
+    start_frames = np.arange(0, 300, 3)
+    timing = schedule_reactions(start_frames, seed=3)
+    assert timing.shape == (len(start_frames), 4)
+    assert np.array_equal(timing[:, 0], start_frames)
+    # The waits are never negative and the same seed gives the same timing
+    assert np.all(timing[:, 1:] >= 0)
+    assert np.array_equal(timing, schedule_reactions(start_frames, seed=3))
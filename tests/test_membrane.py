@@ -0,0 +1,47 @@
+"""
+Tests of the lipid membrane (see pypovray.membrane): the lipids as instances of one declared
+model and merged into a single mesh2.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import re
+import numpy as np
+from pypovray.membrane import LipidMembrane
+
+COORDINATES = [[1, 2, 3, 90], [-4, 0.5, 0, 0], [0, 0, 0, 180]]
+
+
+# Functions
+def vectors(text, name):
+    """ Returns the count and the vectors of a list (i.e. vertex_vectors) of a mesh2 """
+    count, values = re.search(r"{} {{ (\d+), (.*?) }}".format(name), text).groups()
+    return int(count), np.array([[float(value) for value in vector.split(",")]
+                                 for vector in re.findall(r"<([^>]*)>", values)])
+
+
+def test_instances():
+    text = str(LipidMembrane(COORDINATES, name="Lipid1"))
+    # The model is declared once, every lipid is rotated around the z-axis and moved in place
+    assert text.count("#declare Lipid1 =") == 1
+    assert re.findall(r"object \{ Lipid1 rotate <0,0,([-\d.]+)> translate <([^>]*)> \}", text) == [
+        ("90.000", "1.0000,2.0000,3.0000"), ("0.000", "-4.0000,0.5000,0.0000"), ("180.000", "0.0000,0.0000,0.0000")]
+
+
+def test_mesh2():
+    membrane = LipidMembrane(COORDINATES, mesh=True, head_radius=0.5, tail_length=2.0)
+    text = str(membrane)
+    vertex_count, vertices = vectors(text, "vertex_vectors")
+    face_count, faces = vectors(text, "face_indices")
+    assert vertex_count == len(vertices) == 6 * len(COORDINATES)
+    assert face_count == len(faces) == 8 * len(COORDINATES)
+    # The faces of every lipid only use its own vertices
+    assert np.array_equal(faces // 6, np.repeat(np.arange(len(COORDINATES)), 8)[:, None] * np.ones((1, 3)))
+
+    # The first lipid is rotated by 90 degrees: the tails point along -x
+    lipid = vertices[:6]
+    assert np.allclose(lipid[0], [1.5, 2, 3])
+    assert np.allclose(lipid[5], [-1, 2, 3])
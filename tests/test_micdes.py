@@ -0,0 +1,76 @@
+"""
+Tests of the .micdes animation files: the frames of the ethanol animation file (compiled and from
+the cache) are the frames of the Python animation data, invalid files are rejected.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import os
+import copy
+import json
+import shutil
+import pytest
+from conftest import ANIMATION_FRAMES, ROOT, scene_hash
+from project_main import get_animation_data
+from project_engine import AnimationEngine
+from project_micdes import CACHE_FOLDER, MicdesError, make_document, validate_document
+
+ANIMATION_FILE = os.path.join(ROOT, "animations", "ethanol_2_acetic_acid.micdes")
+
+
+# Functions
+@pytest.fixture()
+def animation_file(tmp_path):
+    """ A copy of the animation file, so the cache is written to the temporary folder """
+    file_name = str(tmp_path / os.path.basename(ANIMATION_FILE))
+    shutil.copy(ANIMATION_FILE, file_name)
+    return file_name
+
+
+def add_split_partner(objects):
+    """ Adds a molecule split from NAD0_1 (that does not join at a keyframe) as proximity join partner """
+    objects["hydrogen"] = dict(objects["h_movement_nad0_1"])
+    objects["water0_1"]["proximity_joins"] = [["hydrogen", 13.0]]
+
+
+@pytest.fixture(scope="module")
+def document():
+    return make_document(get_animation_data(False), ANIMATION_FRAMES)
+
+
+def test_frames_of_file(animation_file, reference_hashes):
+    for cached in (False, True):
+        engine = AnimationEngine.from_file(animation_file)
+        hashes = [scene_hash(engine.frame(step)) for step in range(ANIMATION_FRAMES)]
+        assert hashes == reference_hashes, "cached" if cached else "compiled"
+        assert os.listdir(os.path.join(os.path.dirname(animation_file), CACHE_FOLDER))
+
+
+def test_document_of_animation_data(document):
+    with open(ANIMATION_FILE) as animation_file:
+        assert json.load(animation_file) == json.loads(json.dumps(document))
+    validate_document(document)
+
+
+@pytest.mark.parametrize("change, message", [
+    (lambda document: document.update(version=2), "version 2 is not supported"),
+    (lambda document: document["objects"]["water0_1"].update(colour=1), "unknown fields: colour"),
+    (lambda document: document["objects"]["water0_1"].update(pdb="pdb/missing.pdb"), "not found"),
+    (lambda document: document["objects"]["hNAD0_1"]["split"].update({"from": "NAD9_9"}),
+     "split from unknown molecule"),
+    (lambda document: document["objects"]["water0_1"]["path"][0].append(1), "path keyframe"),
+    (lambda document: document["objects"]["water0_1"].update(proximity_joins=[["water0_2", 0]]),
+     "should be a molecule and a distance"),
+    # The partner of a proximity join is removed, it can not split or join at a keyframe later
+    (lambda document: document["objects"]["water0_1"].update(proximity_joins=[["NAD0_1", 13.0]]),
+     "splits or joins later"),
+    (lambda document: add_split_partner(document["objects"]), "split from another molecule"),
+])
+def test_invalid_documents(document, change, message):
+    document = copy.deepcopy(document)
+    change(document)
+    with pytest.raises(MicdesError, match=message):
+        validate_document(document)
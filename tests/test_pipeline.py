@@ -0,0 +1,73 @@
+"""
+Tests of the scene building and rendering stages of the pipeline (see pypovray.pipeline) with a
+stand-in for POV-Ray that writes the scene it reads back as the image (see conftest.POVRAY_ECHO).
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import os
+import sys
+import asyncio
+import pytest
+from conftest import POVRAY_ECHO, ROOT
+from vapory import Camera, Scene, Sphere
+from pypovray import DEFAULT_CONFIG, pipeline, use_config
+from pypovray.config import load_settings
+from pypovray.pypovray import _create_frame_file_name
+
+# Used instead of POV-Ray to stop the pipeline
+FAILING = [sys.executable, "-c", "import sys; sys.stderr.write('Parse Error'); sys.exit(1)"]
+
+
+# Functions
+@pytest.fixture()
+def image_folder(settings, tmp_path):
+    use_config(load_settings(os.path.join(ROOT, DEFAULT_CONFIG), environ={},
+                             overrides={"OutputImageDir": str(tmp_path)}))
+    yield tmp_path
+    use_config(settings)
+
+
+def scene(frame_id):
+    return Scene(Camera("location", [0, 0, -10], "look_at", [0, 0, 0]), objects=[Sphere([0, 0, 0], frame_id + 1)])
+
+
+def render(frame_ids, workers):
+    """ Builds and renders the frames, returns the frames in the order they were rendered """
+    async def run():
+        render_queue, encode_queue = asyncio.Queue(maxsize=2), asyncio.Queue()
+        rendered = []
+
+        async def collect():
+            while True:
+                frame_id = await encode_queue.get()
+                if frame_id is pipeline._DONE:
+                    return
+                rendered.append(frame_id)
+
+        with pipeline.ThreadPoolExecutor(max_workers=1) as executor:
+            await pipeline._run_stages([
+                asyncio.ensure_future(pipeline._build_scenes(scene, frame_ids, render_queue, executor, workers)),
+                asyncio.ensure_future(pipeline._render_stage(render_queue, encode_queue, workers)),
+                asyncio.ensure_future(collect())])
+        return rendered
+    return asyncio.run(run())
+
+
+def test_render_stages(image_folder, monkeypatch):
+    monkeypatch.setattr(pipeline, "_povray_command", lambda: POVRAY_ECHO)
+    frame_ids = list(range(12))
+    assert sorted(render(frame_ids, workers=3)) == frame_ids
+    for frame_id in frame_ids:
+        with open(_create_frame_file_name(frame_id)) as image:
+            assert image.read() == pipeline._build_scene(scene, frame_id)
+
+
+def test_failing_renderer_stops_the_stages(image_folder, monkeypatch):
+    monkeypatch.setattr(pipeline, "_povray_command", lambda: FAILING)
+    # The builder waits on the full render queue, it is cancelled instead of waiting forever
+    with pytest.raises(IOError, match="Parse Error"):
+        render(list(range(50)), workers=2)
@@ -0,0 +1,59 @@
+"""
+Tests of the reactions made from the reaction template: every reaction has the keyframes the
+reaction function gives for its number and timing, moved by its offset.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import numpy as np
+import pytest
+from project_animation_data_ethanol_2_acetic_acid import get_animation_data as ethanol_2_acetic_acid
+from project_population import FRAME_KEYS, TIMING, ReactionTemplate, random_population
+
+
+# Functions
+@pytest.fixture(scope="module")
+def template():
+    return ReactionTemplate()
+
+
+@pytest.mark.parametrize("timing", [(0, 0, 0, 0), (25, 10, 40, 0), (300, 120, 0, 7)])
+def test_reaction_of_template(template, timing):
+    offset = np.array([10.0, -5.0, 2.5])
+    reaction = template.make_reactions([3], [offset], [timing])
+    expected = ethanol_2_acetic_acid(num=3, **dict(zip(TIMING, timing)))
+
+    assert set(reaction) == set(expected)
+    for obj, data in expected.items():
+        for key in FRAME_KEYS:
+            assert reaction[obj].get(key) == data.get(key), (obj, key)
+        assert reaction[obj]["molecule"] == data["molecule"], obj
+
+        # Whole molecules are moved by the offset, split molecules move with their mother
+        moved = data["molecule"][0] and not data["molecule"][1]
+        for value, expected_value in zip(reaction[obj]["keyframe_endpos"], data["keyframe_endpos"]):
+            if moved:
+                assert np.allclose(value[:3], np.add(expected_value[:3], offset)), obj
+                assert list(value[3:]) == list(expected_value[3:]), obj
+            else:
+                assert list(value) == list(expected_value), obj
+
+
+def test_reactions_have_own_keyframes(template):
+    offsets, timing = random_population(2, seed=1)
+    reactions = template.make_reactions([1, 2], offsets, timing)
+    for obj in ("water1_1", "ethanol1_1"):
+        other = obj.replace("1_1", "2_1")
+        assert reactions[obj]["keyframe_endpos"] is not reactions[other]["keyframe_endpos"]
+        for value, other_value in zip(reactions[obj]["keyframe_endpos"], reactions[other]["keyframe_endpos"]):
+            assert value is not other_value
+
+
+def test_invalid_shapes(template):
+    with pytest.raises(ValueError):
+        template.make_reactions([1, 2], offsets=np.zeros((3, 3)))
+    with pytest.raises(ValueError):
+        template.make_reactions([1], timing=np.zeros((1, 2)))
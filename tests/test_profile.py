@@ -0,0 +1,53 @@
+"""
+Tests of the profiling of frames: the selected frames are profiled to files and the time of a
+function is divided over its callers in the collapsed stacks.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import os
+from types import SimpleNamespace
+from pypovray.pypovray import FRAME_DIGITS
+from project_profile import FrameProfiler, write_collapsed
+
+ROOT_FUNCTION = ("main.py", 1, "main")
+FIRST = ("main.py", 10, "first")
+SECOND = ("main.py", 20, "second")
+SHARED = ("~", 0, "<built-in method sum>")
+
+
+# Functions
+def test_write_collapsed(tmp_path):
+    # pstats entries: (calls, primitive calls, own time, cumulative time, callers)
+    stats = SimpleNamespace(stats={
+        ROOT_FUNCTION: (1, 1, 0.001, 0.010, {}),
+        FIRST: (1, 1, 0.001, 0.004, {ROOT_FUNCTION: (1, 1, 0.001, 0.004)}),
+        SECOND: (1, 1, 0.001, 0.005, {ROOT_FUNCTION: (1, 1, 0.001, 0.005)}),
+        # A quarter of the time of the shared function is spent for the first caller
+        SHARED: (2, 2, 0.004, 0.004, {FIRST: (1, 1, 0.001, 0.001), SECOND: (1, 1, 0.003, 0.003)}),
+    })
+    file_name = str(tmp_path / "frame.collapsed")
+    write_collapsed(stats, file_name)
+    with open(file_name) as collapsed:
+        assert collapsed.read().splitlines() == [
+            "main.py:main:1 1000",
+            "main.py:main:1;main.py:first:10 1000",
+            "main.py:main:1;main.py:first:10;<built-in method sum> 1000",
+            "main.py:main:1;main.py:second:20 1000",
+            "main.py:main:1;main.py:second:20;<built-in method sum> 3000"]
+
+
+def test_profiled_frames(tmp_path):
+    profiler = FrameProfiler(str(tmp_path), "test", frames=[3], every=10, memory=True)
+    results = [profiler.profile(step, lambda step: [step] * 1000, step) for step in range(12)]
+
+    assert results == [[step] * 1000 for step in range(12)]
+    # The files of a frame are numbered like the images
+    assert sorted(os.listdir(str(tmp_path))) == sorted(
+        "test_frame{}{}".format(str(step).zfill(FRAME_DIGITS), extension) for step in (0, 3, 10)
+        for extension in (".prof", ".collapsed", ".alloc.txt"))
+    with open(str(tmp_path / "test_frame{}.alloc.txt".format(str(3).zfill(FRAME_DIGITS)))) as allocations:
+        assert allocations.readline().startswith("peak traced memory:")
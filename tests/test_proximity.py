@@ -0,0 +1,76 @@
+"""
+Tests of the spatial hash (queries against a brute force search) and of the proximity joins.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import numpy as np
+import pytest
+from project_main import get_animation_data
+from project_proximity import SpatialHash, make_proximity_monitor
+
+
+# Functions
+def brute_force(molecules, points, radius):
+    """ Returns the molecules with an atom within the radius of any of the points """
+    return {name for name, coordinates in molecules.items()
+            if np.linalg.norm(points[:, None] - coordinates[None], axis=-1).min() <= radius}
+
+
+@pytest.mark.parametrize("cell_size, radius", [(1.0, 2.5), (4.0, 4.0), (10.0, 1.5)])
+def test_query(cell_size, radius):
+    generator = np.random.default_rng(1)
+    molecules = {"mol{}".format(number): generator.uniform(-20, 20, (generator.integers(1, 12), 3))
+                 for number in range(60)}
+    grid = SpatialHash(cell_size)
+    for name, coordinates in molecules.items():
+        grid.update(name, coordinates, token=name)
+
+    for _ in range(20):
+        points = generator.uniform(-25, 25, (generator.integers(1, 4), 3))
+        assert grid.query(points, radius) == brute_force(molecules, points, radius)
+
+
+def test_update_and_remove():
+    grid = SpatialHash(2.0)
+    grid.update("a", [[0, 0, 0]], token=1)
+    grid.update("b", [[1, 0, 0]], token=1)
+    assert grid.neighbors("a", 1.5) == {"b"}
+
+    # The same token is not hashed again, another token moves the molecule
+    assert not grid.update("b", [[9, 0, 0]], token=1)
+    assert grid.update("b", [[9, 0, 0]], token=2)
+    assert grid.neighbors("a", 1.5) == set()
+
+    grid.remove("b")
+    assert "b" not in grid and len(grid) == 1
+    assert grid.query(np.zeros((0, 3)), 1.0) == set()
+
+
+def test_invalid_cell_size():
+    with pytest.raises(ValueError):
+        SpatialHash(0)
+
+
+@pytest.mark.parametrize("partner, message", [("enzyme1", "is not a molecule"),
+                                              ("NAD0_1", "is split later"),
+                                              ("waterstof5_2", "joins at a keyframe"),
+                                              ("hydrogen", "is split from a molecule")])
+def test_invalid_proximity_joins(partner, message):
+    animation_objects = get_animation_data(False)
+    # A molecule split from NAD0_1 that does not join at a keyframe
+    animation_objects["hydrogen"] = dict(animation_objects["h_movement_nad0_1"], name="hydrogen")
+    animation_objects["water0_1"]["proximity_joins"] = [[partner, 13.0]]
+    with pytest.raises(ValueError, match=message):
+        make_proximity_monitor(animation_objects)
+
+
+def test_proximity_join():
+    animation_objects = get_animation_data(False)
+    animation_objects["water0_1"]["proximity_joins"] = [["water0_2", 13.0]]
+    monitor = make_proximity_monitor(animation_objects)
+    assert monitor.rules == [("water0_1", "water0_2", 13.0)]
+    assert make_proximity_monitor(get_animation_data(False)) is None
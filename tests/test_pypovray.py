@@ -0,0 +1,71 @@
+"""
+Tests of the rendering through stdin and stdout, the segments of the parallel encoding (see
+pypovray._frame_segments) and of the arrays shared with the pool workers (see pypovray.shared).
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import sys
+import numpy as np
+import pytest
+from conftest import POVRAY_ECHO
+from vapory import Camera, Scene, Sphere
+from pypovray import pypovray
+from pypovray.pypovray import _frame_segments
+from pypovray.shared import SharedArrays
+
+
+# Functions
+def test_render_through_stdin_and_stdout(monkeypatch):
+    # POV-Ray reads the scene from stdin and writes the image to stdout
+    assert pypovray._povray_command()[1] == "+I-" and pypovray._povray_command()[-1] == "+O-"
+    monkeypatch.setattr(pypovray, "_povray_command", lambda: POVRAY_ECHO)
+    scene = Scene(Camera("location", [0, 0, -10], "look_at", [0, 0, 0]), objects=[Sphere([0, 0, 0], 1)])
+    image = pypovray.render_scene_to_bytes(scene)
+    assert image.decode("ascii") == str(scene) and "right" in str(scene)
+
+
+def test_render_error(monkeypatch):
+    # Errors with non-ASCII bytes (i.e. in a path) are still reported
+    failing = [sys.executable, "-c", "import sys; sys.stderr.buffer.write(b'Parse Error in caf\\xe9.pov'); sys.exit(1)"]
+    monkeypatch.setattr(pypovray, "_povray_command", lambda: failing)
+    scene = Scene(Camera("location", [0, 0, -10], "look_at", [0, 0, 0]), objects=[])
+    with pytest.raises(IOError, match="Parse Error in caf.*pov"):
+        pypovray.render_scene_to_bytes(scene)
+
+
+@pytest.mark.parametrize("frames", [list(range(200)), list(range(0, 1000, 5)), list(range(37, 237))])
+def test_segments_by_position(frames):
+    segments = _frame_segments(frames, 20, 3)
+    # 200 frames are 10 GOPs, 4 GOPs per worker
+    assert [len(segment) for segment in segments] == [80, 80, 40]
+    assert [frame for segment in segments for frame in segment] == frames
+
+
+def test_segments_of_few_frames():
+    assert _frame_segments([3, 9, 12], 20, 4) == [[3, 9, 12]]
+    assert _frame_segments([], 20, 4) == []
+
+
+def test_segments_without_workers():
+    assert _frame_segments(list(range(50)), 20, 0) == [list(range(50))]
+
+
+def test_shared_arrays():
+    arrays = {"coordinates": np.arange(12.0).reshape(4, 3), "names": np.array(["C1", "O2"]),
+              "empty": np.zeros((0, 3))}
+    with SharedArrays() as owner:
+        for name, array in arrays.items():
+            owner.publish(name, array)
+        worker = SharedArrays.attach(owner.manifest)
+        for name, array in arrays.items():
+            assert np.array_equal(worker[name], array) and worker[name].dtype == array.dtype, name
+        # The worker sees the memory of the owner, not a copy
+        owner["coordinates"][0, 0] = -1
+        assert worker["coordinates"][0, 0] == -1
+        worker.unlink()
+        assert "coordinates" in owner and "coordinates" not in worker
+    assert not owner.blocks
@@ -0,0 +1,77 @@
+"""
+Tests of the compiled Timeline: positions, offsets, rotations, visibility and camera evaluated
+between the keyframes, and the timeline made again from its arrays.
+"""
+
+__author__ = "Micha Beens"
+
+__version__ = "1.0.0"
+
+# Imports
+import pickle
+import numpy as np
+import pytest
+from project_timeline import Timeline, compile_timeline
+
+
+# Functions
+@pytest.fixture(scope="module")
+def timeline():
+    animation_objects = {
+        "water": {"molecule": [True, False, "pdb/water.pdb"],
+                  "keyframe_endpos_frames": [20, 0, 10],
+                  "keyframe_endpos": [[10, 20, 0], [0, 0, 0], [10, 0, 0]],
+                  "keyframe_rotation_frames": [0, 10],
+                  "keyframe_rotation": [[[0, 0, 0], [0, 0, 0]], [[1, 1, 1], [np.pi, np.pi, np.pi]]]},
+        "hydrogen": {"molecule": [True, True, "water"],
+                     "keyframe_endpos_frames": [4, 8],
+                     "keyframe_endpos": [[1, 0, 0], [0, 4, 0]]},
+        "light": {"molecule": [False], "keyframe_shown_frames": [15], "keyframe_shown": [False]},
+        "camera": {"molecule": [False], "keyframe_endpos_frames": [0, 30],
+                   "keyframe_endpos": [[[0, 0, -30], [0, 0, 0]], [[0, 30, -30], [0, 0, 30]]]},
+    }
+    return compile_timeline(animation_objects, 30)
+
+
+def test_positions(timeline):
+    assert np.allclose(timeline.position_at("water", 5), [5, 0, 0])
+    assert np.allclose(timeline.position_at("water", 15), [10, 10, 0])
+    assert np.allclose(timeline.position_at("water", 25), [10, 20, 0])
+    assert np.isnan(timeline.position_at("light", 5)).all()
+
+
+def test_offsets_of_split_molecule(timeline):
+    # Split molecules move by the sum of their offsets, from their first keyframe on
+    assert np.allclose(timeline.position_at("hydrogen", 2), [0, 0, 0])
+    assert np.allclose(timeline.position_at("hydrogen", 6), [1, 2, 0])
+    assert np.allclose(timeline.position_at("hydrogen", 12), [1, 4, 0])
+    assert not timeline.visible_at("hydrogen", 3) and timeline.visible_at("hydrogen", 4)
+
+
+def test_rotations(timeline):
+    axis = np.ones(3) / np.sqrt(3)
+    halfway = timeline.orientation_at("water", 5).copy()
+    # A constant speed around [1, 1, 1] and the final orientation after the last keyframe
+    assert np.allclose(np.dot(halfway, axis), axis)
+    assert np.allclose(np.dot(halfway, halfway.T), np.eye(3))
+    assert np.allclose(timeline.orientation_at("water", 10), np.dot(halfway, halfway))
+    assert np.allclose(timeline.orientation_at("water", 20), timeline.orientation_at("water", 10))
+    assert np.allclose(timeline.orientation_at("hydrogen", 5), np.eye(3))
+
+
+def test_visibility_and_camera(timeline):
+    assert timeline.visible_at("light", 15) and not timeline.visible_at("light", 16)
+    location, look_at = timeline.camera_at(10)
+    assert np.allclose(location, [0, 10, -30]) and np.allclose(look_at, [0, 0, 10])
+    with pytest.raises(IndexError):
+        timeline.evaluate(30)
+
+
+def test_from_arrays(timeline):
+    copy = Timeline.from_arrays(timeline.to_arrays())
+    for step in timeline.steps:
+        for value, copied in zip(timeline.evaluate(step)[:2], copy.evaluate(step)[:2]):
+            assert np.array_equal(value, copied, equal_nan=True), step
+        assert np.array_equal(timeline.camera_at(step), copy.camera_at(step)), step
+    # The last evaluated row is not pickled
+    assert pickle.loads(pickle.dumps(timeline)).cached_row is None